@@ -2,23 +2,44 @@ from flask import Flask
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from .jobs import JobQueue
+from .metrics import Metrics
+from .events import EventBroker
+from .config import config_profile, apply_secrets, engine_options, apply_sqlite_pragmas
 
 db = SQLAlchemy()
 jwt = JWTManager()
+job_queue = JobQueue()
+metrics = Metrics()
+events = EventBroker()
 
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
 
-    # Config for SQLite (change later if PostgreSQL/MySQL)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///timetable.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    # Secrets (replace with env vars in production)
-    app.config['SECRET_KEY'] = 'change-this-secret'
-    app.config['JWT_SECRET_KEY'] = app.config['SECRET_KEY']
+    # The TIMETABLE_CONFIG profile from config.py, then FLASK_* environment overrides
+    app.config.from_object(config_profile())
+    app.config.from_prefixed_env()
+    # Overrides for tests and the load-test harness (e.g. a scratch database)
+    if test_config:
+        app.config.update(test_config)
+    apply_secrets(app.config)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    from .engine import calendar_from_config
+    app.extensions["calendar"] = calendar_from_config(app.config)
 
     db.init_app(app)
+    # WAL journal, busy timeout etc. on every SQLite connection
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config.get("SQLITE_PRAGMAS"))
     jwt.init_app(app)
+    # Background workers for timetable generation (in-process queue)
+    job_queue.init_app(app)
+    # Opt-in per-request timing/SQL counters at /metrics (METRICS_ENABLED)
+    metrics.init_app(app)
+    # Live slot changes for the Server-Sent Event streams (in-process)
+    events.init_app(app)
 
     # Enable CORS for frontend (adjust origins if needed)
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
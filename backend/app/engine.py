@@ -0,0 +1,306 @@
+"""
+Bridge between the API and the scheduling engine in backend/auto.
+
+The engine modules are plain scripts importing each other by bare name
+(`from state import ...`), so the auto directory is put on sys.path here
+rather than turning it into a package.
+"""
+import os
+import random
+import sys
+
+from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from .models import db, Teacher, Classroom, SlotAssignment, build_grid, current_calendar
+from .occupancy import touch_teachers, touch_cells, changed_cells, lock_classrooms, booking_clashes
+
+AUTO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "auto")
+if AUTO_DIR not in sys.path:
+    sys.path.insert(0, AUTO_DIR)
+
+from main import init_teachers, init_classroom, run_attempt, MAX_ATTEMPTS  # noqa: E402
+from solver import Solver, SOLVED  # noqa: E402
+from state import ScheduleState, Calendar, EMPTY  # noqa: E402
+from stats import RunStats  # noqa: E402
+from feasibility import check_feasibility  # noqa: E402
+from repair import repair, diff  # noqa: E402
+from optimize import optimize, Objective, DEFAULT_OBJECTIVE  # noqa: E402
+
+GENERATION_MODES = ("random", "joint", "solver")
+
+
+class GenerationError(Exception):
+    """Raised when the engine cannot produce a timetable for the request."""
+
+
+def calendar_from_config(config):
+    """
+    The week described by config["TIMETABLE_CALENDAR"] ({"days",
+    "periods_per_day", "blocked"}) as a Calendar. Raises ValueError on a bad
+    setting, so a misconfigured app fails at startup.
+    """
+    return Calendar.from_dict(config.get("TIMETABLE_CALENDAR"))
+
+
+def _solver_budget():
+    """Solver keyword arguments for the SOLVER_MAX_NODES / SOLVER_TIME_LIMIT_S budget (None: no limit)."""
+    config = current_app.config
+    return {"max_nodes": config.get("SOLVER_MAX_NODES"), "time_limit": config.get("SOLVER_TIME_LIMIT_S")}
+
+
+def load_engine_input(classroom_ids=None, with_allocations=False):
+    """
+    Reads teachers and the given classrooms (default: every classroom) from
+    the DB in the engine's JSON input format (the same shape as
+    auto/teacher.json and auto/sample.json). With `with_allocations`, each
+    classroom also carries its stored "allocation" grid, as repair reads it.
+    """
+    teacher_data = {}
+    for t in Teacher.query.options(selectinload(Teacher.subjects)).order_by(Teacher.id):
+        teacher_data[str(t.id)] = {
+            "teacher_id": t.id,
+            "name": t.teachername,
+            "subject": [s.name for s in t.subjects],
+        }
+    query = Classroom.query.order_by(Classroom.classroom_id)
+    if classroom_ids is not None:
+        query = query.filter(Classroom.classroom_id.in_(classroom_ids))
+    classroom_data = {}
+    for c in query:
+        classroom_data[str(c.classroom_id)] = {
+            "classroom_id": c.classroom_id,
+            "classroom": c.classroom,
+            "subject_details": {k: int(v) for k, v in (c.subject_details or {}).items()},
+        }
+    if with_allocations:
+        rows = {}
+        for row in SlotAssignment.query.filter(
+                SlotAssignment.classroom_id.in_([data["classroom_id"] for data in classroom_data.values()])
+        ).order_by(SlotAssignment.id):
+            rows.setdefault(row.classroom_id, []).append(row)
+        for data in classroom_data.values():
+            data["allocation"] = build_grid(rows.get(data["classroom_id"], ()))
+    return teacher_data, classroom_data
+
+
+def build_state(teacher_data, classroom_data):
+    """
+    Builds a ScheduleState for the given input. Teacher slots already used by
+    classrooms outside the run are blocked, so results never clash with them.
+    """
+    calendar = current_calendar()
+    teachers_map, subject_index = init_teachers(teacher_data, calendar)
+    classroom_map = init_classroom(classroom_data, calendar)
+    state = ScheduleState(teachers_map, classroom_map, subject_index, calendar)
+
+    booked = db.session.query(SlotAssignment.teacher_id, SlotAssignment.day, SlotAssignment.period).filter(
+        SlotAssignment.classroom_id.notin_(list(classroom_map)),
+        SlotAssignment.teacher_id.isnot(None))
+    for teacher_id, day, period in booked:
+        t = state.teacher_pos.get(teacher_id)
+        if t is not None and calendar.in_range(day, period):
+            state.block_teacher(t, calendar.slot_index(day, period))
+    return state
+
+
+def check_clashes(bookings, exclude_classroom_ids=()):
+    """
+    Re-checks a job's (classroom_id, day, period, teacher_id) bookings against
+    the stored ones just before they are written, with the teachers locked: the
+    engine read the DB when the job started, and slot edits made since may have
+    booked the same teachers. Raises GenerationError naming the clashes, so the
+    job fails instead of committing them.
+    """
+    clashes = booking_clashes(bookings, exclude_classroom_ids)
+    if clashes:
+        raise GenerationError("Teacher clash with changes made during the job: " + "; ".join(
+            f"teacher {c['teacher_id']} at day {c['dayIndex']}, period {c['periodIndex']} "
+            f"is booked in classroom {c['other_classroom_id']}" for c in clashes))
+
+
+def allocation_grid(state, class_idx):
+    """Converts one class of the state into the API's days x periods allocation grid."""
+    calendar = state.calendar
+    num_slots = calendar.num_slots
+    grid = calendar.empty_grid()
+    for slot in range(num_slots):
+        s = state.grid_subject[class_idx * num_slots + slot]
+        if s == EMPTY:
+            continue
+        teacher_obj = state.teachers[state.grid_teacher[class_idx * num_slots + slot]]
+        day, period = divmod(slot, calendar.periods_per_day)
+        grid[day][period] = [{"subject": state.subjects[s], "teacher_id": int(teacher_obj.teacher_id)}]
+    return grid
+
+
+def save_allocations(state):
+    """
+    Replaces the stored timetables of every class in `state` with the state's
+    placements: one bulk DELETE of their slot rows, one multi-row INSERT, one
+    schedule-version bump for the teachers on either side and one classroom
+    version bump recording the cells that actually changed. Runs in the
+    caller's transaction. Returns the number of rows written; raises
+    GenerationError if another classroom booked one of the teachers meanwhile
+    (check_clashes).
+    """
+    calendar = state.calendar
+    num_slots = calendar.num_slots
+    classroom_ids = [classroom_obj.classroom_id for classroom_obj in state.classrooms]
+    lock_classrooms(classroom_ids)
+
+    rows = []
+    for c, classroom_id in enumerate(classroom_ids):
+        for slot in range(num_slots):
+            s = state.grid_subject[c * num_slots + slot]
+            if s == EMPTY:
+                continue
+            day, period = divmod(slot, calendar.periods_per_day)
+            teacher_id = int(state.teachers[state.grid_teacher[c * num_slots + slot]].teacher_id)
+            rows.append({"classroom_id": classroom_id, "day": day, "period": period,
+                         "subject": state.subjects[s], "teacher_id": teacher_id})
+    check_clashes([(row["classroom_id"], row["day"], row["period"], row["teacher_id"]) for row in rows],
+                  classroom_ids)
+
+    cells = SlotAssignment.query.filter(SlotAssignment.classroom_id.in_(classroom_ids))
+    before = cells.with_entities(SlotAssignment.classroom_id, SlotAssignment.day, SlotAssignment.period,
+                                 SlotAssignment.subject, SlotAssignment.teacher_id).order_by(SlotAssignment.id).all()
+    touched = {teacher_id for *_, teacher_id in before} | {row["teacher_id"] for row in rows}
+    cells.delete(synchronize_session=False)
+    if rows:
+        db.session.execute(db.insert(SlotAssignment), rows)
+    touch_teachers(touched)
+    touch_cells(changed_cells(before, [(row["classroom_id"], row["day"], row["period"], row["subject"],
+                                        row["teacher_id"]) for row in rows]))
+    return len(rows)
+
+
+def apply_changes(changes):
+    """
+    Writes the slots repair's diff() lists as changed, and nothing else: the
+    rows of each changed cell are deleted and the new main assignments inserted
+    in one multi-row INSERT, and their classrooms' versions are bumped.
+    Runs in the caller's transaction; raises GenerationError if a new
+    assignment's teacher was booked elsewhere meanwhile (check_clashes).
+    """
+    lock_classrooms(change["classroom_id"] for change in changes)
+    touched = set()
+    rows = []
+    for change in changes:
+        cell = SlotAssignment.query.filter_by(
+            classroom_id=change["classroom_id"], day=change["day"], period=change["period"])
+        touched.update(teacher_id for (teacher_id,) in cell.with_entities(SlotAssignment.teacher_id))
+        cell.delete(synchronize_session=False)
+        after = change["after"]
+        if after:
+            rows.append({"classroom_id": change["classroom_id"], "day": change["day"], "period": change["period"],
+                         "subject": after["subject"], "teacher_id": after["teacher_id"]})
+            touched.add(after["teacher_id"])
+    # The changed cells are deleted by now, so any booking left at their time is in another cell
+    check_clashes((row["classroom_id"], row["day"], row["period"], row["teacher_id"]) for row in rows)
+    if rows:
+        db.session.execute(db.insert(SlotAssignment), rows)
+    touch_teachers(touched)
+    touch_cells((change["classroom_id"], change["day"], change["period"]) for change in changes)
+
+
+def _generate(classroom_ids, mode, seed, report, optimize_s, objective):
+    """
+    Runs the engine on the given classrooms together (against the teachers'
+    bookings in every other classroom) and returns the solved state.
+    Raises GenerationError if no timetable is found, naming the most frequent
+    failure causes (subjects, busy teachers) from the run's RunStats. The
+    solver mode stops with NODE_LIMIT once the configured budget is spent.
+    """
+    teacher_data, classroom_data = load_engine_input(classroom_ids)
+    if not classroom_data:
+        raise GenerationError("Classroom not found")
+    state = build_state(teacher_data, classroom_data)
+    problems = check_feasibility(state)
+    if problems:
+        raise GenerationError("; ".join(problem.message for problem in problems))
+    classes = range(len(state.classrooms))
+    slots_total = sum(state.remaining_total(c) for c in classes)
+    report = report or (lambda **progress: None)
+    report(attempts=0, slots_placed=0, slots_total=slots_total)
+    stats = RunStats()
+
+    if mode == "solver":
+        solver = Solver(state, stats=stats, **_solver_budget())
+        status, detail = solver.solve()
+        report(attempts=1, slots_placed=slots_total - sum(state.remaining_total(c) for c in classes),
+               slots_total=slots_total, decisions=solver.nodes)
+        if status != SOLVED:
+            bottlenecks = stats.bottlenecks()
+            raise GenerationError(f"{status}: {detail}" + (f" ({bottlenecks})" if bottlenecks else ""))
+    else:
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        best_placed = 0
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            success = run_attempt(state, random.Random(seed + attempt - 1), stats, joint=mode == "joint")
+            best_placed = max(best_placed, slots_total - sum(state.remaining_total(c) for c in classes))
+            report(attempts=attempt, slots_placed=best_placed, slots_total=slots_total, seed=seed)
+            if success:
+                break
+        else:
+            raise GenerationError(
+                f"Could not find a feasible timetable within {MAX_ATTEMPTS} attempts ({stats.bottlenecks()})")
+
+    if optimize_s:
+        result = optimize(state, objective or DEFAULT_OBJECTIVE, time_budget=optimize_s, rng=random.Random(seed))
+        report(cost_before=result.before["total"], cost=result.after["total"], moves=result.moves)
+    return state
+
+
+def generate_classroom(classroom_id, mode="random", seed=None, report=None, optimize_s=0, objective=None):
+    """
+    Generates a full timetable for one classroom against the teachers' bookings
+    in every other classroom, and returns its allocation grid.
+    With `optimize_s`, the timetable found is then improved for that many
+    seconds against `objective` (an optimize.Objective, default weights).
+    `report(**progress)` is called with attempts made and slots placed.
+    """
+    return allocation_grid(_generate([classroom_id], mode, seed, report, optimize_s, objective), 0)
+
+
+def generate_classrooms(classroom_ids=None, mode="random", seed=None, report=None, optimize_s=0, objective=None):
+    """
+    Generates the timetables of several classrooms (default: every classroom)
+    in one engine run, so they share teachers without clashes, and stores them
+    with save_allocations(). Nothing is committed here.
+    Returns {"classroom_ids", "slots"}: the classrooms written and their row count.
+    """
+    state = _generate(classroom_ids, mode, seed, report, optimize_s, objective)
+    slots = save_allocations(state)
+    return {"classroom_ids": [classroom_obj.classroom_id for classroom_obj in state.classrooms], "slots": slots}
+
+
+def repair_classrooms(classroom_ids=None, report=None):
+    """
+    Repairs the stored timetables of the given classrooms (default: every
+    classroom) after teachers or subject_details changed: assignments that are
+    still valid stay where they are and only the rest is re-solved (see
+    auto/repair.py). Classrooms outside the run stay fixed, as in generation.
+    Returns {"stage", "dropped", "changes"}; `changes` lists every slot whose
+    assignment differs from the stored one. Nothing is written here.
+    """
+    teacher_data, classroom_data = load_engine_input(classroom_ids, with_allocations=True)
+    if not classroom_data:
+        raise GenerationError("Classroom not found")
+    state = build_state(teacher_data, classroom_data)
+    problems = check_feasibility(state)
+    if problems:
+        raise GenerationError("; ".join(problem.message for problem in problems))
+    allocations = [classroom_data[str(c.classroom_id)]["allocation"] for c in state.classrooms]
+
+    report = report or (lambda **progress: None)
+    report(classrooms=len(state.classrooms))
+    stats = RunStats()
+    budget = _solver_budget()
+    result = repair(state, allocations, stats=stats, time_limit=budget["time_limit"])
+    report(classrooms=len(state.classrooms), stage=result.stage, decisions=stats.nodes)
+    if result.status != SOLVED:
+        bottlenecks = stats.bottlenecks()
+        raise GenerationError(f"{result.status}: {result.detail}" + (f" ({bottlenecks})" if bottlenecks else ""))
+    return {"stage": result.stage, "dropped": result.dropped, "changes": diff(state, allocations)}
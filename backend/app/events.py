@@ -0,0 +1,223 @@
+import contextlib
+import json
+import queue
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# session.info keys: changes noted by slot writes, and the events built from them at commit
+PENDING_KEY = "live_changes"
+READY_KEY = "live_events"
+
+
+def classroom_channel(classroom_id):
+    return f"classroom:{int(classroom_id)}"
+
+
+def teacher_channel(teacher_id):
+    return f"teacher:{int(teacher_id)}"
+
+
+def note_changes(session, cells=(), versions=None, teacher_ids=(), schedule_teacher_ids=()):
+    """
+    Records on the session that (classroom_id, day, period) cells changed (with
+    their classrooms' new versions) or that teachers' schedules did, for the
+    live events published when the transaction commits. The whole schedule of
+    the `schedule_teacher_ids` is resent, as their change is not confined to
+    the changed cells.
+    """
+    pending = session.info.setdefault(PENDING_KEY, {"cells": set(), "versions": {}, "teachers": set(),
+                                                    "schedules": set()})
+    pending["cells"].update(cells)
+    pending["versions"].update(versions or {})
+    pending["teachers"].update(teacher_ids)
+    pending["schedules"].update(schedule_teacher_ids)
+
+
+def format_event(name, event_id, data):
+    """One Server-Sent Event in wire format."""
+    lines = [f"event: {name}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+def _broker():
+    return current_app.extensions.get("events") if has_app_context() else None
+
+
+def _collect(session):
+    """before_commit: builds the events of the noted changes while the new rows can still be read."""
+    pending = session.info.pop(PENDING_KEY, None)
+    broker = _broker()
+    if not pending or broker is None:
+        return
+    from .models import Teacher
+    from .occupancy import cell_changes, teacher_slots, teacher_grid
+
+    events = []
+    by_classroom = {}
+    for classroom_id, day, period in pending["cells"]:
+        by_classroom.setdefault(classroom_id, set()).add((day, period))
+    for classroom_id, cells in sorted(by_classroom.items()):
+        channel = classroom_channel(classroom_id)
+        version = pending["versions"].get(classroom_id)
+        if broker.has_subscribers(channel):
+            events.append((channel, "cells", version, {"classroom_id": classroom_id, "version": version,
+                                                       "changes": cell_changes(classroom_id, cells)}))
+
+    # A teacher's slots can only have changed at the (day, period) of a changed cell; a
+    # teacher touched without one (or as a whole, by a classroom rename) gets the whole schedule
+    slots = {(day, period) for _, day, period in pending["cells"]}
+    teacher_ids = sorted(t for t in pending["teachers"] if broker.has_subscribers(teacher_channel(t)))
+    if teacher_ids:
+        versions = dict(session.query(Teacher.id, Teacher.schedule_version).filter(Teacher.id.in_(teacher_ids)))
+        for teacher_id in teacher_ids:
+            if teacher_id not in versions:
+                continue
+            version = versions[teacher_id]
+            if slots and teacher_id not in pending["schedules"]:
+                booked = teacher_slots(teacher_id, slots)
+                changes = [{"dayIndex": day, "periodIndex": period, "slot": booked.get((day, period))}
+                           for day, period in sorted(slots)]
+                events.append((teacher_channel(teacher_id), "cells", version,
+                               {"teacher_id": teacher_id, "version": version, "changes": changes}))
+            else:
+                events.append((teacher_channel(teacher_id), "schedule", version,
+                               {"teacher_id": teacher_id, "version": version, "grid": teacher_grid(teacher_id)}))
+    if events:
+        session.info.setdefault(READY_KEY, []).extend(events)
+
+
+def _publish(session):
+    """after_commit: the changes are durable, hand their events to the subscribers."""
+    events = session.info.pop(READY_KEY, None)
+    broker = _broker()
+    if events and broker is not None:
+        for channel, name, event_id, data in events:
+            broker.publish(channel, name, event_id, data)
+
+
+def _discard(session):
+    """after_rollback: nothing noted in the transaction happened."""
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(READY_KEY, None)
+
+
+class Subscription:
+    __slots__ = ("channels", "queue", "keepalive", "registry")
+
+    def __init__(self, channels, size, keepalive, registry):
+        self.channels = tuple(channels)
+        self.queue = queue.Queue(maxsize=size)
+        self.keepalive = keepalive
+        self.registry = registry  # the subscribing app's channel -> set of Subscription
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe for live timetable updates, served to clients
+    as Server-Sent Events.
+
+    Slot writes note the cells and teachers they change on the SQLAlchemy
+    session (note_changes). When the transaction commits, one "cells" event is
+    published per changed classroom and teacher that has a subscriber (or a
+    "schedule" event for a teacher whose change is not confined to changed
+    cells); nothing is published if it rolls back. Each subscriber has a bounded queue
+    (EVENTS_QUEUE_SIZE): one that falls that far behind is sent a "resync"
+    event and dropped, so a stalled client never holds memory. Events do not
+    leave the process, like the job queue: with several server processes a
+    stream only carries the writes handled by its own process. Subscribers and
+    settings are kept per app, so a stream only carries its own app's writes.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("EVENTS_QUEUE_SIZE", 256)
+        app.config.setdefault("EVENTS_KEEPALIVE_S", 15)
+        app.extensions["events"] = self
+        app.extensions["event_subscribers"] = {}  # channel -> set of Subscription
+        if not event.contains(Session, "before_commit", _collect):
+            event.listen(Session, "before_commit", _collect)
+            event.listen(Session, "after_commit", _publish)
+            event.listen(Session, "after_rollback", _discard)
+
+    @staticmethod
+    def _subscribers():
+        return current_app.extensions["event_subscribers"]
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels, current_app.config["EVENTS_QUEUE_SIZE"],
+                                    current_app.config["EVENTS_KEEPALIVE_S"], self._subscribers())
+        with self._lock:
+            for channel in subscription.channels:
+                subscription.registry.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = subscription.registry.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del subscription.registry[channel]
+
+    def has_subscribers(self, channel):
+        return channel in self._subscribers()
+
+    def publish(self, channel, name, event_id, data):
+        with self._lock:
+            subscribers = list(self._subscribers().get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait((name, event_id, data))
+            except queue.Full:
+                self._overflow(subscription)
+
+    def _overflow(self, subscription):
+        """Replaces a full queue's backlog with a "resync" event and ends the subscriber's stream."""
+        self.unsubscribe(subscription)
+        while True:
+            try:
+                subscription.queue.get_nowait()
+            except queue.Empty:
+                break
+        for item in (("resync", None, {"reason": "too many pending events"}), None):
+            while True:
+                try:
+                    subscription.queue.put_nowait(item)
+                    break
+                except queue.Full:  # a publish that started before the unsubscribe got in first
+                    with contextlib.suppress(queue.Empty):
+                        subscription.queue.get_nowait()
+
+    def stream(self, subscription, initial=()):
+        """
+        Yields the SSE text of the `initial` (name, id, data) events, then of
+        every event published to the subscription, with a comment line every
+        EVENTS_KEEPALIVE_S seconds so idle connections stay open (and a gone
+        client is noticed). Unsubscribes when the client disconnects.
+        """
+        keepalive = subscription.keepalive
+        try:
+            for item in initial:
+                yield format_event(*item)
+            while True:
+                try:
+                    item = subscription.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield format_event(*item)
+        finally:
+            self.unsubscribe(subscription)
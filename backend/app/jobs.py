@@ -0,0 +1,106 @@
+import queue
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+# Job lifecycle
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    In-process background job runner.
+
+    Jobs are put on a queue.Queue and executed by daemon worker threads, each
+    inside the context of the app that submitted it, so long-running work (timetable generation) never
+    holds a request thread. A job's function receives a `report(**progress)`
+    callback; progress and the final result are kept in memory and read back
+    through get(). Only the most recent JOB_HISTORY jobs are retained.
+    """
+
+    def __init__(self, app=None):
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JOB_WORKERS", 1)
+        app.config.setdefault("JOB_HISTORY", 200)
+        app.extensions["job_queue"] = self
+
+    def submit(self, kind, func, *args, **meta):
+        """
+        Queues func(report, *args) and returns the new job's public dict. Must
+        be called inside an app context: the job runs in that app's context.
+        """
+        app = current_app._get_current_object()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "progress": {},
+            "error": None,
+            "result": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            **meta,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._prune(app.config["JOB_HISTORY"])
+        self._start_workers(app.config["JOB_WORKERS"])
+        self._queue.put((job["id"], app, func, args))
+        return self.get(job["id"])
+
+    def get(self, job_id, with_result=False):
+        """Returns a snapshot of the job, or None if unknown (or pruned)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job, progress=dict(job["progress"]))
+        if not with_result:
+            snapshot.pop("result")
+        return snapshot
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _report(self, job_id, **progress):
+        with self._lock:
+            self._jobs[job_id]["progress"].update(progress)
+
+    def _prune(self, history):
+        finished = [j for j in self._jobs.values() if j["status"] in (SUCCEEDED, FAILED)]
+        for job in sorted(finished, key=lambda j: j["created_at"])[:max(0, len(self._jobs) - history)]:
+            del self._jobs[job["id"]]
+
+    def _start_workers(self, count):
+        with self._lock:
+            while len(self._workers) < count:
+                worker = threading.Thread(target=self._run, name=f"job-worker-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _run(self):
+        while True:
+            job_id, app, func, args = self._queue.get()
+            self._update(job_id, status=RUNNING, started_at=time.time())
+            try:
+                with app.app_context():
+                    result = func(lambda **progress: self._report(job_id, **progress), *args)
+                self._update(job_id, status=SUCCEEDED, result=result, finished_at=time.time())
+            except Exception as exc:  # the job failed, the worker must keep going
+                self._update(job_id, status=FAILED, error=str(exc), finished_at=time.time())
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,234 @@
+import cProfile
+import os
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request, Response
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Histogram buckets: request wall time (seconds) and SQL statements per request
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+def _request_stats():
+    """The current request's counters, or None outside an instrumented request."""
+    if has_request_context():
+        return g.get("_metrics")
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats()
+    if stats is not None:
+        stats["sql_start"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats()
+    if stats is not None and "sql_start" in stats:
+        stats["sql_queries"] += 1
+        stats["sql_seconds"] += time.perf_counter() - stats.pop("sql_start")
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, adding the time spent in dumps/loads to the request's stats."""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            stats = _request_stats()
+            if stats is not None:
+                stats["json_seconds"] += time.perf_counter() - start
+
+    def loads(self, s, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().loads(s, **kwargs)
+        finally:
+            stats = _request_stats()
+            if stats is not None:
+                stats["json_seconds"] += time.perf_counter() - start
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class _EndpointStats:
+    __slots__ = ("duration", "sql_queries", "sql_seconds", "json_seconds",
+                 "request_bytes", "response_bytes", "statuses")
+
+    def __init__(self):
+        self.duration = _Histogram(DURATION_BUCKETS)
+        self.sql_queries = _Histogram(QUERY_BUCKETS)
+        self.sql_seconds = 0.0
+        self.json_seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Opt-in per-request instrumentation (METRICS_ENABLED, or METRICS_ENABLED=1
+    in the environment).
+
+    For every request it records wall time, SQL statements and SQL time (via
+    SQLAlchemy cursor events), JSON encode/decode time (via a timing JSON
+    provider) and request/response body sizes, aggregated per endpoint (URL
+    rule + method) and served in Prometheus text format at METRICS_PATH.
+
+    With METRICS_PROFILE_DIR set, a METRICS_PROFILE_RATE fraction of requests
+    also runs under cProfile and is dumped there as a .prof file (pstats
+    format; e.g. `python -m pstats <file>` or snakeviz).
+    """
+
+    def __init__(self, app=None):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        # cProfile can't run in two threads at once (3.12+); others just skip
+        self._profile_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("METRICS_ENABLED", os.environ.get("METRICS_ENABLED", "") in ("1", "true", "yes"))
+        app.config.setdefault("METRICS_PATH", "/metrics")
+        app.config.setdefault("METRICS_PROFILE_DIR", os.environ.get("METRICS_PROFILE_DIR"))
+        app.config.setdefault("METRICS_PROFILE_RATE", float(os.environ.get("METRICS_PROFILE_RATE", "0.01")))
+        app.extensions["metrics"] = self
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        app.json = TimedJSONProvider(app)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._stop_profile)
+        app.add_url_rule(app.config["METRICS_PATH"], "metrics", self.render)
+
+    # --- PER REQUEST ---
+
+    def _start(self):
+        if request.path == current_app.config["METRICS_PATH"]:
+            return
+        g._metrics = {"start": time.perf_counter(), "sql_queries": 0, "sql_seconds": 0.0, "json_seconds": 0.0}
+        profile_dir = current_app.config["METRICS_PROFILE_DIR"]
+        if profile_dir and random.random() < current_app.config["METRICS_PROFILE_RATE"]:
+            if self._profile_lock.acquire(blocking=False):
+                g._metrics_profile = cProfile.Profile()
+                g._metrics_profile.enable()
+
+    def _finish(self, response):
+        stats = g.pop("_metrics", None)
+        if stats is None:
+            return response
+        profile = self._stop_profile()
+        duration = time.perf_counter() - stats["start"]
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        key = (request.method, rule)
+        response_bytes = response.content_length
+        if response_bytes is None and not response.is_streamed:
+            response_bytes = len(response.get_data())
+
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = self._endpoints[key] = _EndpointStats()
+            endpoint.duration.observe(duration)
+            endpoint.sql_queries.observe(stats["sql_queries"])
+            endpoint.sql_seconds += stats["sql_seconds"]
+            endpoint.json_seconds += stats["json_seconds"]
+            endpoint.request_bytes += request.content_length or 0
+            endpoint.response_bytes += response_bytes or 0
+            endpoint.statuses[response.status_code] = endpoint.statuses.get(response.status_code, 0) + 1
+
+        if profile is not None:
+            self._dump_profile(profile, key, duration)
+        return response
+
+    def _stop_profile(self, exc=None):
+        profile = g.pop("_metrics_profile", None)
+        if profile is not None:
+            profile.disable()
+            self._profile_lock.release()
+        return profile
+
+    def _dump_profile(self, profile, key, duration):
+        method, rule = key
+        directory = current_app.config["METRICS_PROFILE_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        slug = "".join(ch if ch.isalnum() else "_" for ch in rule).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method}-{slug}-{duration * 1000:.0f}ms-{os.getpid()}-{threading.get_ident()}.prof"
+        profile.dump_stats(os.path.join(directory, name))
+
+    # --- EXPOSITION ---
+
+    def render(self):
+        """GET /metrics: everything recorded so far, Prometheus text format 0.0.4."""
+        with self._lock:
+            snapshot = sorted(self._endpoints.items())
+            lines = []
+
+            def family(name, kind, help_text):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            def histogram(name, key_labels, hist):
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{name}_bucket{{{key_labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{key_labels},le="+Inf"}} {hist.count}')
+                lines.append(f"{name}_sum{{{key_labels}}} {hist.total}")
+                lines.append(f"{name}_count{{{key_labels}}} {hist.count}")
+
+            labels = {key: f'method="{_label(key[0])}",endpoint="{_label(key[1])}"' for key, _ in snapshot}
+
+            family("timetable_requests_total", "counter", "Requests handled, by endpoint and status code.")
+            for key, stats in snapshot:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'timetable_requests_total{{{labels[key]},status="{status}"}} {count}')
+
+            family("timetable_request_duration_seconds", "histogram", "Wall time per request.")
+            for key, stats in snapshot:
+                histogram("timetable_request_duration_seconds", labels[key], stats.duration)
+
+            family("timetable_request_sql_queries", "histogram", "SQL statements executed per request.")
+            for key, stats in snapshot:
+                histogram("timetable_request_sql_queries", labels[key], stats.sql_queries)
+
+            for name, attr, help_text in (
+                ("timetable_request_sql_seconds_total", "sql_seconds", "Time spent executing SQL."),
+                ("timetable_request_json_seconds_total", "json_seconds", "Time spent encoding and decoding JSON."),
+                ("timetable_request_bytes_total", "request_bytes", "Request body bytes received."),
+                ("timetable_response_bytes_total", "response_bytes", "Response body bytes sent."),
+            ):
+                family(name, "counter", help_text)
+                for key, stats in snapshot:
+                    lines.append(f"{name}{{{labels[key]}}} {getattr(stats, attr)}")
+
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
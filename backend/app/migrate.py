@@ -0,0 +1,85 @@
+from .models import db, Classroom, SlotAssignment, iter_grid_assignments
+
+# Columns added to existing tables after their first release: (table, column, DDL type)
+ADDED_COLUMNS = [
+    ("teacher", "schedule_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("classroom", "version", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def add_missing_columns():
+    """db.create_all() never alters existing tables; add the newer columns by hand."""
+    inspector = db.inspect(db.engine)
+    for table, column, ddl in ADDED_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        if column not in {c["name"] for c in inspector.get_columns(table)}:
+            db.session.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    db.session.commit()
+
+
+# Tables of earlier releases that no model maps any more
+DROPPED_TABLES = [
+    "teacher_slot",  # teacher occupancy index, replaced by the indexed SlotAssignment rows
+]
+
+
+def drop_obsolete_tables():
+    """db.create_all() never drops tables; remove the ones left behind by earlier releases."""
+    for table in DROPPED_TABLES:
+        db.session.execute(db.text(f"DROP TABLE IF EXISTS {table}"))
+    db.session.commit()
+
+
+# JSON columns stored as JSONB on PostgreSQL: (table, column)
+JSONB_COLUMNS = [
+    ("classroom", "subject_details"),
+    ("classroom", "allocation"),
+]
+
+
+def convert_json_columns():
+    """PostgreSQL tables created before the JSONB variant still have json columns; convert them in place."""
+    if db.engine.dialect.name != "postgresql":
+        return
+    inspector = db.inspect(db.engine)
+    for table, column in JSONB_COLUMNS:
+        if not inspector.has_table(table):
+            continue
+        types = {c["name"]: c["type"] for c in inspector.get_columns(table)}
+        if column in types and type(types[column]).__name__ == "JSON":
+            db.session.execute(db.text(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"))
+    db.session.commit()
+
+
+def add_missing_indexes():
+    """Creates indexes declared on the models that existing tables don't have yet."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def migrate_allocations():
+    """
+    Moves allocations from the old JSON `allocation` column into SlotAssignment
+    rows. Classrooms that already have rows are left alone, and the JSON
+    column is emptied once copied, so running this again is a no-op.
+    """
+    migrated = 0
+    for classroom in Classroom.query.filter(Classroom.legacy_allocation.isnot(None)).all():
+        legacy = classroom.legacy_allocation
+        if not legacy:
+            continue
+        has_rows = db.session.query(
+            SlotAssignment.query.filter_by(classroom_id=classroom.classroom_id).exists()).scalar()
+        if not has_rows:
+            db.session.add_all(
+                SlotAssignment(classroom_id=classroom.classroom_id, day=day, period=period,
+                               subject=subject, teacher_id=teacher_id)
+                for day, period, subject, teacher_id in iter_grid_assignments(legacy)
+            )
+        classroom.legacy_allocation = []
+        migrated += 1
+    db.session.commit()
+    return migrated
@@ -1,16 +1,88 @@
+from flask import current_app
 from . import db
-from sqlalchemy.dialects.postgresql import JSON 
+from sqlalchemy.dialects.postgresql import JSONB
+
+# JSON columns: plain JSON text on SQLite, binary JSONB on PostgreSQL
+JSON = db.JSON().with_variant(JSONB(), "postgresql")
 # Teacher Table
 class Teacher(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    teachername = db.Column(db.String(100), nullable=False)
+    teachername = db.Column(db.String(100), nullable=False, index=True)
     mailid = db.Column(db.String(120), unique=True, nullable=False)
+    # Bumped whenever a slot with this teacher changes; drives the schedule ETag
+    schedule_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     subjects = db.relationship("Subject", backref="teacher", lazy=True)
 # Subject Table
 class Subject(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    teacher_id = db.Column(db.Integer, db.ForeignKey("teacher.id"), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("teacher.id"), nullable=False, index=True)
+
+
+def current_calendar():
+    """The app's week (days, periods per day, blocked slots) as an engine Calendar, built by create_app."""
+    return current_app.extensions["calendar"]
+
+
+def _as_teacher_id(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None  # non-numeric ids (e.g. "T001" in imported JSON) are not DB teachers
+
+
+def iter_grid_assignments(grid):
+    """Yields (day, period, subject, teacher_id) for every assignment in a days x periods allocation grid."""
+    calendar = current_calendar()
+    for day, row in enumerate((grid or [])[:calendar.num_days]):
+        for period, cell in enumerate((row or [])[:calendar.periods_per_day]):
+            if not cell:
+                continue
+            for item in (cell if isinstance(cell, list) else [cell]):
+                if not item:
+                    continue
+                subject = item.get("subject") or None
+                teacher_id = _as_teacher_id(item.get("teacher_id"))
+                if subject is None and teacher_id is None:
+                    continue
+                yield day, period, subject, teacher_id
+
+
+def build_grid(assignments):
+    """Builds the days x periods allocation grid (cells: null or a list of assignments) from SlotAssignment rows."""
+    calendar = current_calendar()
+    grid = calendar.empty_grid()
+    for a in assignments:
+        if not calendar.in_range(a.day, a.period):
+            continue
+        if grid[a.day][a.period] is None:
+            grid[a.day][a.period] = []
+        grid[a.day][a.period].append(a.to_dict())
+    return grid
+
+
+# Slot Assignment Table: one row per (subject, teacher) placed in a classroom cell.
+# A cell with several rows is a multi-teacher slot; rows keep insertion order.
+class SlotAssignment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    classroom_id = db.Column(db.Integer, db.ForeignKey("classroom.classroom_id"), nullable=False)
+    day = db.Column(db.Integer, nullable=False)
+    period = db.Column(db.Integer, nullable=False)
+    subject = db.Column(db.String(100), nullable=True)
+    teacher_id = db.Column(db.Integer, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_slot_assignment_cell", "classroom_id", "day", "period"),
+        db.Index("ix_slot_assignment_teacher", "teacher_id", "day", "period"),
+        db.Index("ix_slot_assignment_slot", "day", "period"),
+    )
+
+    def to_dict(self):
+        item = {"subject": self.subject}
+        if self.teacher_id is not None:
+            item["teacher_id"] = self.teacher_id
+        return item
+
 # Classroom Table
 class Classroom(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,11 +90,30 @@ class Classroom(db.Model):
     classroom = db.Column(db.String(100), nullable=False)
     admin_email = db.Column(db.String(120), nullable=False)
     subject_details = db.Column(JSON, nullable=True)  # {"Math": 5, "Physics": 3, ...}
-    allocation = db.Column(
-        JSON,
-        nullable=False,
-        default=lambda: [[None for _ in range(6)] for _ in range(5)]
-    )      # full 5x6 grid default
+    # Pre-SlotAssignment JSON grid; only read by migrate.py, emptied once migrated
+    legacy_allocation = db.Column("allocation", JSON, nullable=True, default=list)
+    # Bumped whenever a slot of this classroom changes; its ETag and ?since= deltas follow it
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    slots = db.relationship(
+        "SlotAssignment",
+        backref="classroom_ref",
+        lazy=True,
+        order_by=SlotAssignment.id,
+        cascade="all, delete-orphan",
+    )
+
+    @property
+    def allocation(self):
+        """Full days x periods grid of the calendar, built from the slot rows (same shape as the old JSON column)."""
+        return build_grid(self.slots)
+
+    @allocation.setter
+    def allocation(self, grid):
+        """Replaces every slot row with the assignments of a days x periods grid."""
+        self.slots = [
+            SlotAssignment(day=day, period=period, subject=subject, teacher_id=teacher_id)
+            for day, period, subject, teacher_id in iter_grid_assignments(grid)
+        ]
 
     def to_dict(self):
         return {
@@ -30,9 +121,26 @@ class Classroom(db.Model):
             "classroom": self.classroom,
             "subject_details": self.subject_details,
             "admin_email": self.admin_email,
+            "version": self.version,
             "allocation": self.allocation,
         }
 
+
+# Cell Version Table: the classroom version at which each cell last changed, so
+# clients can fetch just the cells changed since the version they hold. Cells
+# not changed since versioning began have no row (they date from version 0).
+class CellVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    classroom_id = db.Column(db.Integer, db.ForeignKey("classroom.classroom_id"), nullable=False)
+    day = db.Column(db.Integer, nullable=False)
+    period = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("classroom_id", "day", "period", name="uq_cell_version_cell"),
+        db.Index("ix_cell_version_since", "classroom_id", "version"),
+    )
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -0,0 +1,224 @@
+from .models import db, SlotAssignment, Teacher, Classroom, CellVersion, current_calendar
+from .events import note_changes
+
+
+class VersionConflict(Exception):
+    """A write was based on a classroom version that is no longer the current one."""
+
+    def __init__(self, classroom_id, base_version):
+        super().__init__(f"Classroom {classroom_id} has changed since version {base_version}")
+        self.classroom_id = classroom_id
+        self.base_version = base_version
+
+
+def _lock_rows(model, column, ids):
+    """
+    Locks the rows of `model` whose `column` is in `ids` until the transaction
+    ends, in id order so concurrent lockers queue instead of deadlocking
+    (SELECT ... FOR UPDATE). SQLite has no row locks: a no-op UPDATE claims its
+    database write lock instead. Returns the locked rows' ids.
+    """
+    ids = sorted({int(i) for i in ids if i is not None})
+    if not ids:
+        return []
+    if db.session.get_bind().dialect.name == "sqlite":
+        model.query.filter(column.in_(ids)).update({column: column}, synchronize_session=False)
+    return [row_id for (row_id,) in db.session.query(column).filter(column.in_(ids)).order_by(column).with_for_update()]
+
+
+def lock_classrooms(classroom_ids):
+    """
+    Locks the classrooms before a multi-classroom edit reads them, so their
+    versions and cells cannot change until it commits or rolls back.
+    Returns {classroom_id: version} of those that exist.
+    """
+    locked = _lock_rows(Classroom, Classroom.classroom_id, classroom_ids)
+    return dict(db.session.query(Classroom.classroom_id, Classroom.version).filter(
+        Classroom.classroom_id.in_(locked))) if locked else {}
+
+
+def lock_teachers(teacher_ids):
+    """
+    Locks the teachers before their bookings are checked for clashes: every slot
+    write bumps its teachers' schedule_version (touch_teachers), so a concurrent
+    write booking one of them waits until this transaction ends.
+    """
+    _lock_rows(Teacher, Teacher.id, teacher_ids)
+
+
+def touch_teachers(teacher_ids, whole_schedule=False):
+    """
+    Bumps the schedule version of every teacher whose slots changed, so cached
+    schedules and ETags for them are invalidated. Runs in the caller's transaction.
+    With `whole_schedule` (a change outside the edited cells, like a classroom
+    rename), live streams get the teachers' whole schedules.
+    """
+    ids = {int(i) for i in teacher_ids if i is not None}
+    if ids:
+        Teacher.query.filter(Teacher.id.in_(ids)).update(
+            {Teacher.schedule_version: Teacher.schedule_version + 1}, synchronize_session=False)
+        note_changes(db.session, teacher_ids=ids, schedule_teacher_ids=ids if whole_schedule else ())
+
+
+def touch_cells(cells, base_versions=None):
+    """
+    Bumps the version of every classroom with a changed (classroom_id, day,
+    period) cell by one and records that version against each of its changed
+    cells (and notes them for live events). With `base_versions` ({classroom_id: version}), a classroom whose
+    version is no longer the given one raises VersionConflict; the check and
+    the bump are one UPDATE, so concurrent writers cannot both pass it.
+    Runs in the caller's transaction. Returns {classroom_id: new version}.
+    """
+    by_classroom = {}
+    for classroom_id, day, period in cells:
+        by_classroom.setdefault(int(classroom_id), set()).add((day, period))
+    versions = {}
+    for classroom_id, changed in sorted(by_classroom.items()):
+        query = Classroom.query.filter_by(classroom_id=classroom_id)
+        base_version = (base_versions or {}).get(classroom_id)
+        if base_version is not None:
+            query = query.filter_by(version=base_version)
+        if not query.update({Classroom.version: Classroom.version + 1}, synchronize_session=False):
+            raise VersionConflict(classroom_id, base_version)
+        version = db.session.query(Classroom.version).filter_by(classroom_id=classroom_id).scalar()
+        CellVersion.query.filter(
+            CellVersion.classroom_id == classroom_id,
+            db.tuple_(CellVersion.day, CellVersion.period).in_(sorted(changed)),
+        ).delete(synchronize_session=False)
+        db.session.execute(db.insert(CellVersion), [
+            {"classroom_id": classroom_id, "day": day, "period": period, "version": version}
+            for day, period in sorted(changed)])
+        versions[classroom_id] = version
+    note_changes(db.session, cells=[(classroom_id, day, period)
+                                    for classroom_id, changed in by_classroom.items() for day, period in changed],
+                 versions=versions)
+    return versions
+
+
+def changed_cells(before, after):
+    """
+    The (classroom_id, day, period) cells whose assignments differ between two
+    lists of (classroom_id, day, period, subject, teacher_id) rows.
+    """
+    def by_cell(rows):
+        cells = {}
+        for classroom_id, day, period, subject, teacher_id in rows:
+            cells.setdefault((classroom_id, day, period), []).append((subject, teacher_id))
+        return cells
+
+    old, new = by_cell(before), by_cell(after)
+    return {cell for cell in old.keys() | new.keys() if old.get(cell) != new.get(cell)}
+
+
+def cell_changes(classroom_id: int, cells):
+    """[{"dayIndex", "periodIndex", "assignments": [...] | null}] for (day, period) cells of a classroom, in one query."""
+    grouped = {(day, period): [] for day, period in sorted(cells)}
+    if grouped:
+        rows = (SlotAssignment.query
+                .filter(SlotAssignment.classroom_id == classroom_id,
+                        db.tuple_(SlotAssignment.day, SlotAssignment.period).in_(list(grouped)))
+                .order_by(SlotAssignment.id))
+        for row in rows:
+            grouped[(row.day, row.period)].append(row.to_dict())
+    return [{"dayIndex": day, "periodIndex": period, "assignments": items or None}
+            for (day, period), items in grouped.items()]
+
+
+def teacher_slots(teacher_id: int, cells=None):
+    """
+    {(day, period): {"classroomId", "classroomName", "subject"}} for the slots a
+    teacher is booked in (only the given (day, period) cells, if any), as the
+    teacher schedule grid shows them: the first assignment of a classroom cell
+    wins, and a later classroom overrides an earlier one.
+    """
+    calendar = current_calendar()
+    rows = (db.session.query(SlotAssignment.day, SlotAssignment.period, SlotAssignment.subject,
+                             Classroom.classroom_id, Classroom.classroom)
+            .join(Classroom, Classroom.classroom_id == SlotAssignment.classroom_id)
+            .filter(SlotAssignment.teacher_id == teacher_id))
+    if cells is not None:
+        rows = rows.filter(db.tuple_(SlotAssignment.day, SlotAssignment.period).in_(sorted(cells)))
+    slots = {}
+    seen = set()
+    for d, p, subject, classroom_id, classroom_name in rows.order_by(Classroom.id, SlotAssignment.id):
+        if (classroom_id, d, p) in seen or not calendar.in_range(d, p):
+            continue
+        seen.add((classroom_id, d, p))
+        slots[(d, p)] = {
+            "classroomId": classroom_id,
+            "classroomName": classroom_name,
+            "subject": subject,
+        }
+    return slots
+
+
+def teacher_grid(teacher_id: int):
+    """A teacher's schedule as a days x periods grid of teacher_slots() values (None when free)."""
+    grid = current_calendar().empty_grid()
+    for (d, p), slot in teacher_slots(teacher_id).items():
+        grid[d][p] = slot
+    return grid
+
+
+def is_teacher_busy(teacher_id: int, day: int, period: int, exclude_classroom_id: int | None = None) -> bool:
+    query = SlotAssignment.query.filter_by(teacher_id=int(teacher_id), day=day, period=period)
+    if exclude_classroom_id is not None:
+        query = query.filter(SlotAssignment.classroom_id != exclude_classroom_id)
+    return db.session.query(query.exists()).scalar()
+
+
+def busy_teacher_ids(day: int, period: int, exclude_classroom_id: int | None = None) -> set:
+    """All teachers booked at (day, period), in one query."""
+    query = db.session.query(SlotAssignment.teacher_id).filter(
+        SlotAssignment.day == day,
+        SlotAssignment.period == period,
+        SlotAssignment.teacher_id.isnot(None),
+    )
+    if exclude_classroom_id is not None:
+        query = query.filter(SlotAssignment.classroom_id != exclude_classroom_id)
+    return {teacher_id for (teacher_id,) in query}
+
+
+def busy_by_slot(exclude_classroom_id: int | None = None) -> dict:
+    """{(day, period): teacher ids booked then} for the whole week, in one query."""
+    query = db.session.query(SlotAssignment.day, SlotAssignment.period, SlotAssignment.teacher_id).filter(
+        SlotAssignment.teacher_id.isnot(None))
+    if exclude_classroom_id is not None:
+        query = query.filter(SlotAssignment.classroom_id != exclude_classroom_id)
+    busy = {}
+    for day, period, teacher_id in query:
+        busy.setdefault((day, period), set()).add(teacher_id)
+    return busy
+
+
+def booking_clashes(bookings, exclude_classroom_ids=()):
+    """
+    Locks the teachers of `bookings` ((classroom_id, day, period, teacher_id)
+    rows about to be written) and returns, in one query, those whose teacher is
+    already booked at that (day, period) in another classroom, ignoring the
+    stored cells of `exclude_classroom_ids` (which the write replaces), as
+    [{"classroom_id", "dayIndex", "periodIndex", "teacher_id", "other_classroom_id"}].
+    """
+    bookings = [(classroom_id, day, period, int(teacher_id))
+                for classroom_id, day, period, teacher_id in bookings if teacher_id is not None]
+    if not bookings:
+        return []
+    teacher_ids = {teacher_id for *_, teacher_id in bookings}
+    lock_teachers(teacher_ids)
+    query = (db.session.query(SlotAssignment.classroom_id, SlotAssignment.day, SlotAssignment.period,
+                              SlotAssignment.teacher_id)
+             .filter(SlotAssignment.teacher_id.in_(teacher_ids),
+                     SlotAssignment.day.in_({day for _, day, _, _ in bookings})))
+    exclude = {int(i) for i in exclude_classroom_ids}
+    if exclude:
+        query = query.filter(SlotAssignment.classroom_id.notin_(exclude))
+    booked = {}
+    for classroom_id, day, period, teacher_id in query:
+        booked.setdefault((teacher_id, day, period), set()).add(classroom_id)
+
+    clashes = []
+    for classroom_id, day, period, teacher_id in bookings:
+        for other in sorted(booked.get((teacher_id, day, period), set()) - {classroom_id}):
+            clashes.append({"classroom_id": classroom_id, "dayIndex": day, "periodIndex": period,
+                            "teacher_id": teacher_id, "other_classroom_id": other})
+    return clashes
@@ -1,5 +1,18 @@
-from flask import Blueprint, request, jsonify
-from .models import db, Teacher, Classroom,Subject
+import re
+import threading
+from collections import OrderedDict
+
+from flask import Blueprint, Response, current_app, request, jsonify, make_response
+from sqlalchemy.orm import selectinload
+from .models import db, Teacher, Classroom,Subject, SlotAssignment, CellVersion, current_calendar, iter_grid_assignments
+from . import job_queue, events
+from .events import classroom_channel, teacher_channel
+from .jobs import SUCCEEDED, FAILED
+from .engine import (generate_classroom, generate_classrooms, repair_classrooms, apply_changes, GenerationError,
+                     GENERATION_MODES, Objective, check_clashes)
+from .teacher_import import import_teachers, parse_records, ImportFormatError
+from .occupancy import (is_teacher_busy, busy_teacher_ids, busy_by_slot, touch_teachers, touch_cells, changed_cells,
+                        cell_changes, teacher_grid, lock_classrooms, lock_teachers, VersionConflict)
 timetable_bp = Blueprint("timetable", __name__)
 
 
@@ -20,6 +33,11 @@ timetable_bp = Blueprint("timetable", __name__)
 # 0. Get Teachers List
 # -----------------------------
 # GET /timetable/teachers
+# Optional query params:
+#   subject=Math          only teachers who teach this subject
+#   name=Al               only teachers whose name starts with this (case-sensitive)
+#   page=1&per_page=50    paginate (ordered by id); the response then also carries
+#                         "page", "per_page" and "total"
 # Response JSON:
 # {
 #   "teachers": [
@@ -32,19 +50,52 @@ timetable_bp = Blueprint("timetable", __name__)
 #     ...
 #   ]
 # }
+MAX_TEACHERS_PER_PAGE = 500
+
+
+def _teacher_to_dict(teacher):
+    return {
+        "id": teacher.id,
+        "teachername": teacher.teachername,
+        "mailid": teacher.mailid,
+        "subjects": [subject.name for subject in teacher.subjects]
+    }
+
+
+def _teachers_query(subject=None, name_prefix=None):
+    """
+    Teachers ordered by id with their subjects loaded up front (one extra
+    SELECT ... IN for the whole page instead of one per teacher).
+    """
+    query = Teacher.query.options(selectinload(Teacher.subjects)).order_by(Teacher.id)
+    if subject is not None:
+        query = query.filter(Teacher.id.in_(
+            db.select(Subject.teacher_id).where(Subject.name == subject)))
+    if name_prefix:
+        # A range instead of LIKE so the teachername index is used on every backend
+        query = query.filter(Teacher.teachername >= name_prefix,
+                             Teacher.teachername < name_prefix + "\U0010ffff")
+    return query
+
+
 @timetable_bp.route("/teachers", methods=["GET"])
 def get_teachers():
-    teachers = Teacher.query.all()
-    result = []
-    for teacher in teachers:
-        subject_names = [subject.name for subject in teacher.subjects]
-        result.append({
-            "id": teacher.id,
-            "teachername": teacher.teachername,
-            "mailid": teacher.mailid,
-            "subjects": subject_names
-        })
-    return jsonify({"teachers": result})
+    query = _teachers_query(request.args.get("subject"), request.args.get("name"))
+    if "page" not in request.args and "per_page" not in request.args:
+        return jsonify({"teachers": [_teacher_to_dict(t) for t in query]})
+
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", 50, type=int)
+    if page < 1 or per_page < 1:
+        return jsonify({"error": "page and per_page must be positive integers"}), 400
+    pagination = query.paginate(page=page, per_page=per_page, max_per_page=MAX_TEACHERS_PER_PAGE,
+                                error_out=False)
+    return jsonify({
+        "teachers": [_teacher_to_dict(t) for t in pagination.items],
+        "page": pagination.page,
+        "per_page": pagination.per_page,
+        "total": pagination.total,
+    })
 
 
 # 1. Add Teacher
@@ -65,7 +116,7 @@ def add_teacher():
     data = request.json
     teacher = Teacher(teachername=data["teachername"], mailid=data["mailid"])
     db.session.add(teacher)
-    db.session.commit()
+    db.session.flush()  # assigns teacher.id without a separate commit
 
     for subj in data["subjects"]:
         subject = Subject(name=subj, teacher_id=teacher.id)
@@ -74,6 +125,32 @@ def add_teacher():
     db.session.commit()
     return jsonify({"message": "Teacher added successfully"}), 201
 
+# 1b. Bulk Import Teachers
+# -----------------------------
+# POST /timetable/teachers/import
+# Accepted bodies (by Content-Type):
+# - application/json: [{"teachername": "Alice", "mailid": "alice@example.com", "subjects": ["Math"]}, ...]
+#   or the auto/teacher.json layout {"1": {"teacher_id": 1, "name": "Alice", "subject": ["Math"]}, ...}
+#   (mailid defaults to "<teacher_id>@gmail.com" there, as in the engine)
+# - text/csv: header "teachername,mailid,subjects", subjects separated by ";" or "|"
+# - application/x-ndjson: one teacher object per line, read as a stream
+# Teachers are upserted by mailid in one transaction, so re-importing is a no-op.
+# Response JSON:
+# {
+#   "message": "Teachers imported",
+#   "created": 120, "updated": 3, "unchanged": 10,
+#   "errors": [{"row": 7, "error": "a valid mailid is required"}]
+# }
+@timetable_bp.route("/teachers/import", methods=["POST"])
+def import_teachers_endpoint():
+    data = request.get_json(silent=True) if request.is_json else None
+    try:
+        summary = import_teachers(parse_records(request.mimetype, request.stream, data))
+    except ImportFormatError as exc:
+        return jsonify({"error": str(exc)}), 400
+    status = 201 if summary["created"] else 200
+    return jsonify({"message": "Teachers imported", **summary}), status
+
 # 2. Add Schedule
 # -----------------------------
 # POST /timetable/add_schedule
@@ -101,7 +178,7 @@ def add_teacher():
 # }
 # Notes:
 # - "subject_details" maps each subject to the number of weekly slots
-# - "allocation" is a 5x6 list representing 5 days and 6 periods per day
+# - "allocation" is a days x periods list following the timetable calendar (5 days of 6 periods by default)
 # - If classroom_id exists, the record will be updated; otherwise, a new classroom is created
 # Response JSON:
 # {
@@ -116,17 +193,24 @@ def add_schedule():
     if not data:
         return jsonify({"error": "Invalid JSON"}), 400
 
+    # Every classroom of the body in one query instead of one lookup each
+    existing = {c.classroom_id: c for c in Classroom.query.filter(
+        Classroom.classroom_id.in_([value["classroom_id"] for value in data.values()]))}
     created = []
     for key, value in data.items():
-        # Look for existing classroom by classroom_id
-        classroom = Classroom.query.filter_by(classroom_id=value["classroom_id"]).first()
+        classroom = existing.get(value["classroom_id"])
 
         if classroom:
             # Update existing classroom
-            classroom.classroom = value.get("classroom", classroom.classroom)
+            name = value.get("classroom", classroom.classroom)
+            if name != classroom.classroom:
+                # Teacher schedules show the classroom's name in every booked slot
+                touch_teachers([slot.teacher_id for slot in classroom.slots], whole_schedule=True)
+            classroom.classroom = name
             classroom.admin_email = value.get("admin_email", classroom.admin_email)
             classroom.subject_details = value.get("subject_details", classroom.subject_details)
-            classroom.allocation = value.get("allocation", classroom.allocation)
+            if "allocation" in value:
+                _set_allocation(classroom, value["allocation"])
         else:
             # Create new classroom
             classroom = Classroom(
@@ -137,6 +221,9 @@ def add_schedule():
                 allocation=value.get("allocation")
             )
             db.session.add(classroom)
+            existing[classroom.classroom_id] = classroom
+            touch_teachers([slot.teacher_id for slot in classroom.slots])
+            touch_cells((classroom.classroom_id, slot.day, slot.period) for slot in classroom.slots)
 
         created.append(classroom.classroom_id)
 
@@ -215,12 +302,80 @@ def list_classrooms():
     })
 
 # Get classroom by numeric classroom_id
+# Served with an ETag "classroom-<id>-v<version>": a matching If-None-Match gets
+# 304, and slot edits can send it back as If-Match (see "Versioned Slot Edits").
 @timetable_bp.route("/classrooms/<int:classroom_id>", methods=["GET"])
 def get_classroom_by_id(classroom_id: int):
     classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
     if not classroom:
         return jsonify({"error": "Classroom not found"}), 404
-    return jsonify(classroom.to_dict())
+    etag = _classroom_etag(classroom)
+    response = make_response("", 304) if request.if_none_match.contains(etag) else jsonify(classroom.to_dict())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# Get only the cells of a classroom changed since a version the client holds
+# GET /timetable/classrooms/<id>/changes?since=<version>
+# Response: {"classroom_id": 1, "version": 12,
+#            "changes": [{"dayIndex": 0, "periodIndex": 1, "assignments": [...] | null}, ...]}
+# Each changed cell is listed once with its current assignments (null: now empty);
+# applying them to the grid of version `since` gives the grid of `version`.
+@timetable_bp.route("/classrooms/<int:classroom_id>/changes", methods=["GET"])
+def get_classroom_changes(classroom_id: int):
+    since = request.args.get("since", type=int)
+    if since is None or since < 0:
+        return jsonify({"error": "since must be a non-negative integer"}), 400
+    version = db.session.query(Classroom.version).filter_by(classroom_id=classroom_id).scalar()
+    if version is None:
+        return jsonify({"error": "Classroom not found"}), 404
+    if since > version:
+        return jsonify({"error": f"since is ahead of the classroom's version ({version})"}), 400
+    response = jsonify({"classroom_id": classroom_id, "version": version,
+                        "changes": _changes_since(classroom_id, since)})
+    response.set_etag(f"classroom-{classroom_id}-v{version}")
+    return response
+
+# Live updates for one classroom, as Server-Sent Events (text/event-stream)
+# GET /timetable/classrooms/<id>/events?since=<version>
+# The first event brings the client up to date: the cells changed after `since`
+# (the version of the grid it holds; on reconnect, browsers send the last event
+# id back as Last-Event-ID), or no cells without it. Then one event per
+# committed change to the classroom, from any endpoint or job:
+#   event: cells
+#   id: 13
+#   data: {"classroom_id": 1, "version": 13, "changes": [{"dayIndex", "periodIndex", "assignments": [...] | null}]}
+# A client that falls too far behind gets "event: resync" and the stream ends;
+# it should refetch the classroom and reconnect.
+@timetable_bp.route("/classrooms/<int:classroom_id>/events", methods=["GET"])
+def stream_classroom_events(classroom_id: int):
+    since = _stream_since()
+    if since is not None and since < 0:
+        return jsonify({"error": "since must be a non-negative integer"}), 400
+    # Subscribe before reading, so no change committed in between is missed
+    subscription = events.subscribe([classroom_channel(classroom_id)])
+    version = db.session.query(Classroom.version).filter_by(classroom_id=classroom_id).scalar()
+    if version is None or (since is not None and since > version):
+        events.unsubscribe(subscription)
+        if version is None:
+            return jsonify({"error": "Classroom not found"}), 404
+        return jsonify({"error": f"since is ahead of the classroom's version ({version})"}), 400
+    changes = _changes_since(classroom_id, since) if since is not None else []
+    return _event_stream(subscription, [("cells", version, {"classroom_id": classroom_id, "version": version,
+                                                            "changes": changes})])
+
+
+def _stream_since():
+    """The version an event stream resumes from: ?since=, else the Last-Event-ID of a reconnect."""
+    since = request.args.get("since", type=int)
+    if since is None:
+        since = request.headers.get("Last-Event-ID", type=int)
+    return since
+
+
+def _event_stream(subscription, initial):
+    return Response(events.stream(subscription, initial), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # Get subjects for a classroom (derived from subject_details keys)
 @timetable_bp.route("/classrooms/<int:classroom_id>/subjects", methods=["GET"])
@@ -231,6 +386,124 @@ def get_subjects_for_classroom(classroom_id: int):
     subject_details = classroom.subject_details or {}
     return jsonify({"subjects": list(subject_details.keys())})
 
+# Get the teaching week every grid follows (TIMETABLE_CALENDAR)
+# Response: {"days": 5, "periods_per_day": 6, "blocked": [[day, period], ...]}
+@timetable_bp.route("/calendar", methods=["GET"])
+def get_calendar():
+    return jsonify(current_calendar().to_dict())
+
+def _slot_error(day_index, period_index):
+    """The 400 message for a slot edits can't target (outside the week or blocked), else None."""
+    calendar = current_calendar()
+    if not calendar.in_range(day_index, period_index):
+        return "dayIndex or periodIndex out of range"
+    if calendar.is_blocked(day_index, period_index):
+        return "slot is blocked in the timetable calendar"
+    return None
+
+
+def _cell_rows(classroom_id: int, day_index: int, period_index: int):
+    return (SlotAssignment.query
+            .filter_by(classroom_id=classroom_id, day=day_index, period=period_index)
+            .order_by(SlotAssignment.id)
+            .all())
+
+
+def _replace_cell(classroom_id: int, day_index: int, period_index: int, assignments):
+    """Replaces one cell's rows with (subject, teacher_id) pairs; only that cell is written."""
+    cell = SlotAssignment.query.filter_by(classroom_id=classroom_id, day=day_index, period=period_index)
+    touch_teachers([row.teacher_id for row in cell] + [teacher_id for _, teacher_id in assignments])
+    cell.delete()
+    for subject, teacher_id in assignments:
+        db.session.add(SlotAssignment(classroom_id=classroom_id, day=day_index, period=period_index,
+                                      subject=subject, teacher_id=teacher_id))
+
+
+def _set_allocation(classroom, grid):
+    """
+    Replaces a classroom's whole grid, invalidating the schedules of old and new
+    teachers and bumping the classroom's version for the cells that changed.
+    """
+    def cells():
+        return [(classroom.classroom_id, slot.day, slot.period, slot.subject, slot.teacher_id)
+                for slot in classroom.slots]
+
+    before = cells()
+    classroom.allocation = grid
+    after = cells()
+    touch_teachers([teacher_id for *_, teacher_id in before + after])
+    touch_cells(changed_cells(before, after))
+
+
+def _classroom_etag(classroom):
+    return f"classroom-{classroom.classroom_id}-v{classroom.version}"
+
+
+def _base_version(classroom_id: int, data):
+    """
+    The classroom version a slot edit is based on: the If-Match ETag
+    ("classroom-<id>-v<version>") or the body's "baseVersion". None when the
+    client sent neither (or If-Match: *). Raises ValueError if malformed.
+    """
+    if request.if_match and not request.if_match.star_tag:
+        for tag in request.if_match.as_set():
+            match = re.fullmatch(rf"classroom-{classroom_id}-v(\d+)", tag)
+            if match:
+                return int(match.group(1))
+        raise ValueError("If-Match does not name a version of this classroom")
+    base_version = data.get("baseVersion")
+    if base_version is not None and (isinstance(base_version, bool) or not isinstance(base_version, int)
+                                     or base_version < 0):
+        raise ValueError("baseVersion must be a non-negative integer")
+    return base_version
+
+
+def _changes_since(classroom_id: int, since: int):
+    cells = (db.session.query(CellVersion.day, CellVersion.period)
+             .filter(CellVersion.classroom_id == classroom_id, CellVersion.version > since))
+    return cell_changes(classroom_id, [tuple(cell) for cell in cells])
+
+
+def _version_conflict(classroom_id: int, base_version: int):
+    """Rolls back a stale edit; the 412 reply carries the current version and the cells changed since the client's."""
+    db.session.rollback()
+    version = db.session.query(Classroom.version).filter_by(classroom_id=classroom_id).scalar()
+    return jsonify({"error": "Classroom has changed", "classroom_id": classroom_id, "version": version,
+                    "changes": _changes_since(classroom_id, base_version)}), 412
+
+
+def _slot_edited(message, classroom, base_version, cells):
+    """
+    Bumps the classroom's version for the edited (day, period) cells (checking
+    it against `base_version` first) and commits. The reply carries the new
+    version and the edited cells; clients that sent no base version also get
+    the whole grid, as before versioning.
+    """
+    if base_version is not None and classroom.version != base_version:
+        return _version_conflict(classroom.classroom_id, base_version)
+    try:
+        touch_cells([(classroom.classroom_id, day, period) for day, period in cells],
+                    {classroom.classroom_id: base_version})
+    except VersionConflict:
+        return _version_conflict(classroom.classroom_id, base_version)
+    db.session.commit()
+    payload = {"message": message, "version": classroom.version,
+               "changes": cell_changes(classroom.classroom_id, cells)}
+    if base_version is None:
+        payload["allocation"] = classroom.allocation
+    response = jsonify(payload)
+    response.set_etag(_classroom_etag(classroom))
+    return response
+
+
+# Versioned slot edits: every single-slot endpoint below bumps the classroom's
+# version. A client can base an edit on the version it holds, by sending the
+# classroom's ETag as If-Match or "baseVersion" in the body; if the classroom has
+# moved on, nothing is written and the reply is 412 with the current "version"
+# and the "changes" since the client's. Responses carry the new "version" and the
+# edited cells as "changes"; the whole "allocation" is only added for clients
+# that sent no base version.
+#
 # Update a single time slot allocation (supports multiple teachers per slot)
 # Payload: {"dayIndex": 0-4, "periodIndex": 0-5, "assignments": [{"teacher_id": int, "subject": str}, ...]}
 @timetable_bp.route("/classrooms/<int:classroom_id>/slot", methods=["PATCH"])
@@ -242,21 +515,19 @@ def update_classroom_slot(classroom_id: int):
 
     if day_index is None or period_index is None or assignments is None:
         return jsonify({"error": "dayIndex, periodIndex and assignments are required"}), 400
+    error = _slot_error(day_index, period_index)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        base_version = _base_version(classroom_id, data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
     if not classroom:
         return jsonify({"error": "Classroom not found"}), 404
 
-    allocation = classroom.allocation or []
-    # Ensure 5x6 grid
-    while len(allocation) < 5:
-        allocation.append([None] * 6)
-    for i in range(5):
-        row = allocation[i]
-        while len(row) < 6:
-            row.append(None)
-        allocation[i] = row
-
     # Normalize assignments (store as list of {subject, teacher_id}) or None
     normalized = []
     for a in assignments:
@@ -266,13 +537,10 @@ def update_classroom_slot(classroom_id: int):
         teacher_id = a.get("teacher_id")
         if subject is None or teacher_id is None:
             continue
-        normalized.append({"subject": subject, "teacher_id": int(teacher_id)})
-
-    allocation[day_index][period_index] = normalized if normalized else None
-    classroom.allocation = allocation
-    db.session.commit()
+        normalized.append((subject, int(teacher_id)))
 
-    return jsonify({"message": "Slot updated", "allocation": classroom.allocation})
+    _replace_cell(classroom_id, day_index, period_index, normalized)
+    return _slot_edited("Slot updated", classroom, base_version, [(day_index, period_index)])
 
 # Update only the subject for a single time slot
 # Payload: {"dayIndex": 0-4, "periodIndex": 0-5, "subject": "Math"}
@@ -284,36 +552,24 @@ def update_classroom_slot_subject(classroom_id: int):
     subject = data.get("subject")
     if day_index is None or period_index is None:
         return jsonify({"error": "dayIndex and periodIndex are required"}), 400
+    error = _slot_error(day_index, period_index)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        base_version = _base_version(classroom_id, data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
     if not classroom:
         return jsonify({"error": "Classroom not found"}), 404
 
-    allocation = classroom.allocation or []
-    while len(allocation) < 5:
-        allocation.append([None] * 6)
-    for i in range(5):
-        row = allocation[i]
-        while len(row) < 6:
-            row.append(None)
-        allocation[i] = row
-
-    current_cell = allocation[day_index][period_index]
     # Normalize to list of one assignment for now
-    if isinstance(current_cell, list):
-        first = (current_cell[0] if current_cell else None) or {}
-    elif isinstance(current_cell, dict):
-        first = current_cell
-    else:
-        first = {}
-    teacher_id = first.get("teacher_id") or first.get("teacherId")
-    new_assignment = {"subject": subject or None}
-    if teacher_id is not None:
-        new_assignment["teacher_id"] = int(teacher_id)
-    allocation[day_index][period_index] = [new_assignment] if (subject or teacher_id is not None) else None
-    classroom.allocation = allocation
-    db.session.commit()
-    return jsonify({"message": "Subject updated", "allocation": classroom.allocation})
+    rows = _cell_rows(classroom_id, day_index, period_index)
+    teacher_id = rows[0].teacher_id if rows else None
+    _replace_cell(classroom_id, day_index, period_index,
+                  [(subject or None, teacher_id)] if (subject or teacher_id is not None) else [])
+    return _slot_edited("Subject updated", classroom, base_version, [(day_index, period_index)])
 
 # Update only the teacher for a single time slot
 # Payload: {"dayIndex": 0-4, "periodIndex": 0-5, "teacher_id": 123}
@@ -325,37 +581,24 @@ def update_classroom_slot_teacher(classroom_id: int):
     teacher_id = data.get("teacher_id")
     if day_index is None or period_index is None:
         return jsonify({"error": "dayIndex and periodIndex are required"}), 400
+    error = _slot_error(day_index, period_index)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        base_version = _base_version(classroom_id, data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
     if not classroom:
         return jsonify({"error": "Classroom not found"}), 404
 
-    allocation = classroom.allocation or []
-    while len(allocation) < 5:
-        allocation.append([None] * 6)
-    for i in range(5):
-        row = allocation[i]
-        while len(row) < 6:
-            row.append(None)
-        allocation[i] = row
-
-    current_cell = allocation[day_index][period_index]
-    if isinstance(current_cell, list):
-        first = (current_cell[0] if current_cell else None) or {}
-    elif isinstance(current_cell, dict):
-        first = current_cell
-    else:
-        first = {}
-    subject = first.get("subject")
-    new_assignment = {}
-    if subject is not None:
-        new_assignment["subject"] = subject
-    if teacher_id is not None and teacher_id != "":
-        new_assignment["teacher_id"] = int(teacher_id)
-    allocation[day_index][period_index] = [new_assignment] if (subject is not None or teacher_id not in (None, "")) else None
-    classroom.allocation = allocation
-    db.session.commit()
-    return jsonify({"message": "Teacher updated", "allocation": classroom.allocation})
+    rows = _cell_rows(classroom_id, day_index, period_index)
+    subject = rows[0].subject if rows else None
+    new_teacher_id = int(teacher_id) if teacher_id not in (None, "") else None
+    _replace_cell(classroom_id, day_index, period_index,
+                  [(subject, new_teacher_id)] if (subject is not None or new_teacher_id is not None) else [])
+    return _slot_edited("Teacher updated", classroom, base_version, [(day_index, period_index)])
 
 # Add a single assignment to a slot (multi-teacher support)
 # Payload: {"dayIndex": 0-4, "periodIndex": 0-5, "assignment": {"subject": str, "teacher_id": int}}
@@ -367,43 +610,35 @@ def add_assignment_to_slot(classroom_id: int):
     assignment = data.get("assignment") or {}
     if day_index is None or period_index is None:
         return jsonify({"error": "dayIndex and periodIndex are required"}), 400
+    error = _slot_error(day_index, period_index)
+    if error:
+        return jsonify({"error": error}), 400
     subject = assignment.get("subject")
     teacher_id = assignment.get("teacher_id")
     if subject is None and teacher_id is None:
         return jsonify({"error": "assignment must include subject or teacher_id"}), 400
+    try:
+        base_version = _base_version(classroom_id, data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
     if not classroom:
         return jsonify({"error": "Classroom not found"}), 404
 
-    allocation = classroom.allocation or []
-    while len(allocation) < 5:
-        allocation.append([None] * 6)
-    for i in range(5):
-        row = allocation[i]
-        while len(row) < 6:
-            row.append(None)
-        allocation[i] = row
-
-    cell = allocation[day_index][period_index]
-    if not isinstance(cell, list):
-        cell = ([] if not cell else [cell])
-    new_item = {}
-    if subject is not None:
-        new_item["subject"] = subject
-    if teacher_id is not None:
-        new_item["teacher_id"] = int(teacher_id)
+    teacher_id = int(teacher_id) if teacher_id is not None else None
     # Prevent duplicates (same teacher_id + subject)
-    if not any(
-        (int(x.get("teacher_id")) if x.get("teacher_id") is not None else None) == new_item.get("teacher_id") and
-        (x.get("subject") or None) == new_item.get("subject")
-        for x in cell
-    ):
-        cell.append(new_item)
-    allocation[day_index][period_index] = cell if cell else None
-    classroom.allocation = allocation
-    db.session.commit()
-    return jsonify({"message": "Assignment added", "allocation": classroom.allocation})
+    duplicate = SlotAssignment.query.filter_by(
+        classroom_id=classroom_id, day=day_index, period=period_index,
+        subject=subject or None, teacher_id=teacher_id,
+    )
+    cells = []
+    if not db.session.query(duplicate.exists()).scalar():
+        db.session.add(SlotAssignment(classroom_id=classroom_id, day=day_index, period=period_index,
+                                      subject=subject, teacher_id=teacher_id))
+        touch_teachers([teacher_id])
+        cells.append((day_index, period_index))
+    return _slot_edited("Assignment added", classroom, base_version, cells)
 
 # Remove a single assignment from a slot
 # Payload: {"dayIndex": 0-4, "periodIndex": 0-5, "teacher_id": int (optional), "subject": str (optional)}
@@ -416,83 +651,334 @@ def remove_assignment_from_slot(classroom_id: int):
     subject = data.get("subject")
     if day_index is None or period_index is None:
         return jsonify({"error": "dayIndex and periodIndex are required"}), 400
+    error = _slot_error(day_index, period_index)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        base_version = _base_version(classroom_id, data)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
 
     classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
     if not classroom:
         return jsonify({"error": "Classroom not found"}), 404
 
-    allocation = classroom.allocation or []
+    matches = SlotAssignment.query.filter_by(classroom_id=classroom_id, day=day_index, period=period_index)
+    if teacher_id is not None:
+        matches = matches.filter_by(teacher_id=int(teacher_id))
+    if subject is not None:
+        matches = matches.filter_by(subject=subject)
+    removed = [row.teacher_id for row in matches]
+    touch_teachers(removed)
+    matches.delete()
+    return _slot_edited("Assignment removed", classroom, base_version, [(day_index, period_index)] if removed else [])
+
+# Apply many slot edits across classrooms at once, all or nothing
+# Payload: {"operations": [
+#   {"op": "set", "classroom_id": 1, "dayIndex": 0, "periodIndex": 1, "assignments": [{"subject": str, "teacher_id": int}, ...]},
+#   {"op": "add", "classroom_id": 1, "dayIndex": 0, "periodIndex": 1, "assignment": {"subject": str, "teacher_id": int}},
+#   {"op": "remove", "classroom_id": 1, "dayIndex": 0, "periodIndex": 1, "teacher_id": int (optional), "subject": str (optional)},
+#   {"op": "swap" | "copy", "classroom_id": 1, "dayIndex": 0, "periodIndex": 1, "to": {"dayIndex": 2, "periodIndex": 3}}
+# ]}
+# Operations run in order on the batch's view of the cells (a "copy" sees earlier
+# edits). Teacher clashes are then checked once for the whole result: a teacher
+# new to a cell must not teach another classroom at that time, in the DB or in
+# the batch. Any invalid operation or clash rejects the whole batch.
+# Optional "baseVersions": {"1": 7, ...} bases the batch on those classroom
+# versions; if any has moved on, nothing is written (412, as for single-slot edits).
+# The batch locks every classroom it edits or names in baseVersions before
+# reading them, and the teachers it books before the clash check, so neither
+# can change between the checks and the commit.
+# Response 200: {"message": "Batch applied", "versions": {"1": 8, ...},
+#                "changes": [{"classroom_id", "dayIndex", "periodIndex", "assignments": [...] | null}]}
+# Response 409: {"error": "Teacher clash", "clashes": [{"classroom_id", "dayIndex", "periodIndex", "teacher_id", "other_classroom_id"}]}
+# Response 412: {"error": "Classroom has changed", "conflicts": [{"classroom_id", "version", "changes"}]}
+MAX_BATCH_OPERATIONS = 500
+BATCH_OPERATIONS = ("set", "add", "remove", "swap", "copy")
+
+
+def _parse_assignment(item):
+    """(subject, teacher_id) of one {"subject", "teacher_id"} object; raises ValueError if it has neither."""
+    if not isinstance(item, dict):
+        raise ValueError("an assignment must be an object")
+    subject = item.get("subject") or None
+    teacher_id = item.get("teacher_id")
+    if teacher_id is not None and (isinstance(teacher_id, bool) or not isinstance(teacher_id, int)):
+        raise ValueError("teacher_id must be an integer")
+    if subject is None and teacher_id is None:
+        raise ValueError("an assignment must include subject or teacher_id")
+    return subject, teacher_id
+
+
+def _parse_operation(op):
+    """
+    Validates one batch operation. Returns (kind, classroom_id, cells, args):
+    the cells it reads or writes as (classroom_id, day, period) and the
+    op-specific arguments. Raises ValueError with the reason.
+    """
+    if not isinstance(op, dict):
+        raise ValueError("an operation must be an object")
+    kind = op.get("op")
+    if kind not in BATCH_OPERATIONS:
+        raise ValueError(f"op must be one of {', '.join(BATCH_OPERATIONS)}")
+    classroom_id = op.get("classroom_id")
+    if not isinstance(classroom_id, int) or isinstance(classroom_id, bool):
+        raise ValueError("classroom_id must be an integer")
+
+    targets = [op] + ([op.get("to")] if kind in ("swap", "copy") else [])
+    cells = []
+    for target in targets:
+        if not isinstance(target, dict):
+            raise ValueError("to must be an object with dayIndex and periodIndex")
+        day_index, period_index = target.get("dayIndex"), target.get("periodIndex")
+        if not isinstance(day_index, int) or not isinstance(period_index, int):
+            raise ValueError("dayIndex and periodIndex must be integers")
+        error = _slot_error(day_index, period_index)
+        if error:
+            raise ValueError(error)
+        cells.append((classroom_id, day_index, period_index))
+
+    args = None
+    if kind == "set":
+        if not isinstance(op.get("assignments"), list):
+            raise ValueError("assignments must be a list")
+        args = [_parse_assignment(item) for item in op["assignments"] if item]
+    elif kind == "add":
+        args = _parse_assignment(op.get("assignment"))
+    elif kind == "remove":
+        teacher_id = op.get("teacher_id")
+        if teacher_id is not None and (isinstance(teacher_id, bool) or not isinstance(teacher_id, int)):
+            raise ValueError("teacher_id must be an integer")
+        args = (op.get("subject"), teacher_id)
+    return kind, classroom_id, cells, args
+
+
+def _parse_base_versions(value):
+    """{classroom_id: version} from a batch's "baseVersions" object; raises ValueError if malformed."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError("baseVersions must be an object of classroom_id: version")
+    base_versions = {}
+    for classroom_id, version in value.items():
+        if not str(classroom_id).isdigit():
+            raise ValueError("baseVersions keys must be classroom ids")
+        if isinstance(version, bool) or not isinstance(version, int) or version < 0:
+            raise ValueError("baseVersions values must be non-negative integers")
+        base_versions[int(classroom_id)] = version
+    return base_versions
+
+
+def _batch_conflicts(base_versions):
+    """Rolls back a stale batch; the 412 reply lists each moved-on classroom with the changes since its base."""
+    db.session.rollback()
+    current = dict(db.session.query(Classroom.classroom_id, Classroom.version).filter(
+        Classroom.classroom_id.in_(base_versions)))
+    conflicts = [{"classroom_id": classroom_id, "version": current.get(classroom_id),
+                  "changes": _changes_since(classroom_id, base_version)}
+                 for classroom_id, base_version in sorted(base_versions.items())
+                 if current.get(classroom_id) != base_version]
+    return jsonify({"error": "Classroom has changed", "conflicts": conflicts}), 412
+
+
+def _batch_clashes(before, after):
+    """
+    Teacher clashes in the batch result: for every teacher new to a changed
+    cell, the other classrooms teaching at the same time, from the batch's own
+    cells and (in one query) from every stored cell the batch does not touch.
+    Those teachers are locked first, so no other write can book them meanwhile.
+    """
+    new = []  # (cell, teacher_id)
+    for cell, items in after.items():
+        old_teachers = {teacher_id for _, teacher_id in before[cell]}
+        new.extend((cell, teacher_id) for _, teacher_id in items
+                   if teacher_id is not None and teacher_id not in old_teachers)
+    if not new:
+        return []
+    lock_teachers(teacher_id for _, teacher_id in new)
+
+    # Who teaches at each (teacher, day, period): the batch's cells, then the rest of the DB
+    booked = {}
+    for (classroom_id, day, period), items in after.items():
+        for _, teacher_id in items:
+            booked.setdefault((teacher_id, day, period), set()).add(classroom_id)
+    rows = (db.session.query(SlotAssignment.classroom_id, SlotAssignment.day, SlotAssignment.period,
+                             SlotAssignment.teacher_id)
+            .filter(SlotAssignment.teacher_id.in_({teacher_id for _, teacher_id in new}),
+                    SlotAssignment.day.in_({day for (_, day, _), _ in new})))
+    for classroom_id, day, period, teacher_id in rows:
+        if (classroom_id, day, period) not in after:
+            booked.setdefault((teacher_id, day, period), set()).add(classroom_id)
+
+    clashes = []
+    for (classroom_id, day, period), teacher_id in new:
+        for other in sorted(booked.get((teacher_id, day, period), set()) - {classroom_id}):
+            clashes.append({"classroom_id": classroom_id, "dayIndex": day, "periodIndex": period,
+                            "teacher_id": teacher_id, "other_classroom_id": other})
+    return clashes
+
+
+@timetable_bp.route("/slots/batch", methods=["POST"])
+def batch_update_slots():
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({"error": f"at most {MAX_BATCH_OPERATIONS} operations per batch"}), 400
+    parsed = []
+    for index, op in enumerate(operations):
+        try:
+            parsed.append(_parse_operation(op))
+        except ValueError as exc:
+            return jsonify({"error": f"operations[{index}]: {exc}"}), 400
     try:
-        cell = allocation[day_index][period_index]
-    except Exception:
-        cell = None
-    if not isinstance(cell, list):
-        cell = ([] if not cell else [cell])
-    def matches(x):
-        cond = True
-        if teacher_id is not None:
-            cond = cond and (x.get("teacher_id") == int(teacher_id))
-        if subject is not None:
-            cond = cond and ((x.get("subject") or None) == subject)
-        return cond
-    cell = [x for x in cell if not matches(x)]
-    allocation[day_index][period_index] = cell if cell else None
-    classroom.allocation = allocation
+        base_versions = _parse_base_versions(data.get("baseVersions"))
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    classroom_ids = {classroom_id for _, classroom_id, _, _ in parsed}
+    # Locked until commit: the versions checked here are the ones the batch is written over
+    found = lock_classrooms(classroom_ids | set(base_versions))
+    missing = sorted((classroom_ids | set(base_versions)) - set(found))
+    if missing:
+        db.session.rollback()
+        return jsonify({"error": f"Classroom not found: {', '.join(map(str, missing))}"}), 404
+    if any(found[classroom_id] != version for classroom_id, version in base_versions.items()):
+        return _batch_conflicts(base_versions)
+
+    # The current rows of every cell the batch reads or writes, in one query
+    touched = {cell for _, _, cells, _ in parsed for cell in cells}
+    before = {cell: [] for cell in touched}
+    for row in SlotAssignment.query.filter(SlotAssignment.classroom_id.in_(classroom_ids)).order_by(SlotAssignment.id):
+        cell = (row.classroom_id, row.day, row.period)
+        if cell in before:
+            before[cell].append((row.subject, row.teacher_id))
+
+    after = {cell: list(items) for cell, items in before.items()}
+    for kind, _, cells, args in parsed:
+        cell = cells[0]
+        if kind == "set":
+            after[cell] = list(args)
+        elif kind == "add":
+            if args not in after[cell]:
+                after[cell].append(args)
+        elif kind == "remove":
+            subject, teacher_id = args
+            after[cell] = [(s, t) for s, t in after[cell]
+                           if not ((teacher_id is None or t == teacher_id) and (subject is None or s == subject))]
+        elif kind == "swap":
+            after[cell], after[cells[1]] = after[cells[1]], after[cell]
+        else:  # copy
+            after[cells[1]] = list(after[cell])
+
+    changed = {cell: items for cell, items in after.items() if items != before[cell]}
+    clashes = _batch_clashes(before, changed)
+    if clashes:
+        db.session.rollback()
+        return jsonify({"error": "Teacher clash", "clashes": clashes}), 409
+
+    # One DELETE per changed cell, one multi-row INSERT and one version bump, committed together
+    rows, teacher_ids = [], []
+    for (classroom_id, day, period), items in sorted(changed.items()):
+        SlotAssignment.query.filter_by(classroom_id=classroom_id, day=day, period=period).delete(
+            synchronize_session=False)
+        teacher_ids.extend(t for _, t in before[(classroom_id, day, period)] + items)
+        rows.extend({"classroom_id": classroom_id, "day": day, "period": period, "subject": s, "teacher_id": t}
+                    for s, t in items)
+    if rows:
+        db.session.execute(db.insert(SlotAssignment), rows)
+    touch_teachers(teacher_ids)
+    try:
+        versions = touch_cells(changed, base_versions)
+    except VersionConflict:
+        return _batch_conflicts(base_versions)
     db.session.commit()
-    return jsonify({"message": "Assignment removed", "allocation": classroom.allocation})
+    return jsonify({"message": "Batch applied", "versions": versions, "changes": [
+        {"classroom_id": classroom_id, "dayIndex": day, "periodIndex": period,
+         "assignments": [{"subject": s, **({"teacher_id": t} if t is not None else {})} for s, t in items] or None}
+        for (classroom_id, day, period), items in sorted(changed.items())]})
+
+TEACHER_SCHEDULE_CACHE_SIZE = 1024
+# Request threads share the caches: every read, insert and eviction holds this lock
+_teacher_schedule_lock = threading.Lock()
+
+
+def _teacher_schedule_cache() -> OrderedDict[int, tuple[int, dict]]:
+    """
+    Materialized teacher schedules of the current app, so apps on different
+    databases never share entries: teacher_id -> (schedule_version, payload), oldest first.
+    """
+    return current_app.extensions.setdefault("teacher_schedules", OrderedDict())
+
+
+def _query_teacher_schedule(teacher_id: int):
+    return {"teacher_id": teacher_id, "grid": teacher_grid(teacher_id)}
 
-# Get a teacher's schedule as a single-value grid (5x6), derived from classroom allocations
+
+# Get a teacher's schedule as a single-value days x periods grid (see /calendar), derived from classroom allocations
+# Served with an ETag tied to the teacher's schedule_version: a matching
+# If-None-Match gets 304, and unchanged schedules are answered from memory.
 @timetable_bp.route("/teachers/<int:teacher_id>/schedule", methods=["GET"])
 def get_teacher_schedule(teacher_id: int):
-    # initialize empty grid
-    grid = [[None for _ in range(6)] for _ in range(5)]
-    classrooms = Classroom.query.all()
-    for c in classrooms:
-        alloc = c.allocation or []
-        for d in range(min(5, len(alloc))):
-            row = alloc[d] or []
-            for p in range(min(6, len(row))):
-                cell = row[p]
-                if not cell:
-                    continue
-                items = cell if isinstance(cell, list) else [cell]
-                for item in items:
-                    if not item:
-                        continue
-                    if int(item.get("teacher_id")) == int(teacher_id):
-                        grid[d][p] = {
-                            "classroomId": c.classroom_id,
-                            "classroomName": c.classroom,
-                            "subject": item.get("subject"),
-                        }
-                        break
-    return jsonify({"teacher_id": teacher_id, "grid": grid})
-
-
-def _build_teacher_subjects_map():
-    teachers = Teacher.query.all()
-    teacher_id_to_subjects = {}
-    for t in teachers:
-        teacher_id_to_subjects[t.id] = [s.name for s in t.subjects]
-    return teacher_id_to_subjects
+    version = db.session.query(Teacher.schedule_version).filter_by(id=teacher_id).scalar()
+    if version is None:
+        # unknown teacher: nothing to version, answer uncached
+        return jsonify(_query_teacher_schedule(teacher_id))
+
+    etag = f"teacher-{teacher_id}-v{version}"
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        cache = _teacher_schedule_cache()
+        with _teacher_schedule_lock:
+            cached = cache.get(teacher_id)
+        if cached and cached[0] == version:
+            payload = cached[1]
+        else:
+            payload = _query_teacher_schedule(teacher_id)
+            with _teacher_schedule_lock:
+                cache[teacher_id] = (version, payload)
+                cache.move_to_end(teacher_id)
+                while len(cache) > TEACHER_SCHEDULE_CACHE_SIZE:
+                    cache.popitem(last=False)
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# Live updates for one teacher's schedule, as Server-Sent Events (text/event-stream)
+# GET /timetable/teachers/<id>/events?since=<schedule_version>
+# The first event is the whole schedule, unless `since` (or Last-Event-ID) is
+# already the current version, in which case it is a "cells" event with no changes:
+#   event: schedule
+#   id: 8
+#   data: {"teacher_id": 3, "version": 8, "grid": [...]}   (grid as in GET /teachers/<id>/schedule)
+# Then one event per committed change to the teacher's slots:
+#   event: cells
+#   id: 9
+#   data: {"teacher_id": 3, "version": 9, "changes": [{"dayIndex", "periodIndex", "slot": {"classroomId", "classroomName", "subject"} | null}]}
+# or, for a change not confined to some cells (e.g. a classroom rename), a
+# "schedule" event with the whole grid as above.
+# "event: resync" ends a stream that fell too far behind, as for classrooms.
+@timetable_bp.route("/teachers/<int:teacher_id>/events", methods=["GET"])
+def stream_teacher_events(teacher_id: int):
+    since = _stream_since()
+    subscription = events.subscribe([teacher_channel(teacher_id)])
+    version = db.session.query(Teacher.schedule_version).filter_by(id=teacher_id).scalar()
+    if version is None:
+        events.unsubscribe(subscription)
+        return jsonify({"error": "Teacher not found"}), 404
+    if since == version:
+        initial = ("cells", version, {"teacher_id": teacher_id, "version": version, "changes": []})
+    else:
+        initial = ("schedule", version, {**_query_teacher_schedule(teacher_id), "version": version})
+    return _event_stream(subscription, [initial])
+
 
 def _is_teacher_assigned_elsewhere(teacher_id: int, day_index: int, period_index: int, exclude_classroom_id: int | None = None):
-    classrooms = Classroom.query.all()
-    for c in classrooms:
-        if exclude_classroom_id is not None and c.classroom_id == exclude_classroom_id:
-            continue
-        if not c.allocation:
-            continue
-        try:
-            cell = c.allocation[day_index][period_index]
-        except Exception:
-            cell = None
-        if not cell:
-            continue
-        for assign in cell:
-            if assign and int(assign.get("teacher_id")) == int(teacher_id):
-                return True
-    return False
+    return is_teacher_busy(teacher_id, day_index, period_index, exclude_classroom_id=exclude_classroom_id)
 
 # Check if a teacher is available for a given slot and subject
 @timetable_bp.route("/teachers/<int:teacher_id>/availability", methods=["GET"])
@@ -530,45 +1016,236 @@ def get_available_teachers_for_slot():
     day_index = int(day)
     period_index = int(period)
 
-    teacher_subjects = _build_teacher_subjects_map()
-    result = []
-    for teacher_id, subjects in teacher_subjects.items():
-        if subject is not None and subject not in subjects:
-            continue
-        if _is_teacher_assigned_elsewhere(teacher_id, day_index, period_index, exclude_classroom_id=int(classroom_id)):
-            continue
-        t = Teacher.query.get(teacher_id)
-        result.append({
-            "id": t.id,
-            "teachername": t.teachername,
-            "mailid": t.mailid,
-            "subjects": subjects
-        })
+    busy = busy_teacher_ids(day_index, period_index, exclude_classroom_id=int(classroom_id))
+    query = _teachers_query(subject)
+    if busy:
+        query = query.filter(Teacher.id.notin_(busy))
+    return jsonify({"teachers": [_teacher_to_dict(t) for t in query]})
+
+
+# Get the free qualified teachers for every slot of a classroom at once
+# (one request instead of one /teachers/available call per cell)
+# GET /timetable/classrooms/<classroom_id>/availability
+# Optional query params:
+#   subject=Math      only this subject
+#   all_subjects=1    every subject some teacher teaches, not just the classroom's subject_details
+# Response JSON:
+# {
+#   "classroom_id": 1,
+#   "subjects": ["Mathematics", "Physics"],
+#   "teachers": [{"id", "teachername", "mailid", "subjects"}, ...],   # every teacher the grid names
+#   "grid": [[{"Mathematics": [2, 5], "Physics": []}, ...], ...]     # days x periods; null on blocked slots
+# }
+# A teacher is listed when they teach the subject and no other classroom has
+# them at that time, as in /teachers/available. Built from one teachers query
+# and one pass over the week's bookings.
+@timetable_bp.route("/classrooms/<int:classroom_id>/availability", methods=["GET"])
+def get_classroom_availability(classroom_id: int):
+    classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
+    if not classroom:
+        return jsonify({"error": "Classroom not found"}), 404
+
+    teachers = _teachers_query().all()
+    qualified = {}  # subject -> teacher ids, by id
+    for teacher in teachers:
+        for subject in teacher.subjects:
+            ids = qualified.setdefault(subject.name, [])
+            if not ids or ids[-1] != teacher.id:
+                ids.append(teacher.id)
+
+    subject = request.args.get("subject")
+    if subject is not None:
+        subjects = [subject]
+    elif request.args.get("all_subjects") in ("1", "true", "yes"):
+        subjects = sorted(qualified)
+    else:
+        subjects = list((classroom.subject_details or {}).keys())
+
+    calendar = current_calendar()
+    busy = busy_by_slot(exclude_classroom_id=classroom_id)
+    grid = calendar.empty_grid()
+    named = set()
+    for day in range(calendar.num_days):
+        for period in range(calendar.periods_per_day):
+            if calendar.is_blocked(day, period):
+                continue
+            taken = busy.get((day, period), ())
+            cell = {}
+            for name in subjects:
+                cell[name] = [teacher_id for teacher_id in qualified.get(name, ()) if teacher_id not in taken]
+                named.update(cell[name])
+            grid[day][period] = cell
 
-    return jsonify({"teachers": result})
+    return jsonify({
+        "classroom_id": classroom_id,
+        "subjects": subjects,
+        "teachers": [_teacher_to_dict(t) for t in teachers if t.id in named],
+        "grid": grid,
+    })
 
 
-# Auto-generate simple schedule stub: clears empty cells by proposing subject-only placeholders
+# Longest soft-constraint optimization an auto_generate job may ask for, in seconds
+MAX_OPTIMIZE_SECONDS = 60
+
+
+def _generation_options(data):
+    """
+    Validates the generation fields of a request body (mode, seed, optimize,
+    objective). Returns (options, None), or (None, error message) for a 400.
+    """
+    mode = data.get("mode", "random")
+    seed = data.get("seed")
+    if mode not in GENERATION_MODES:
+        return None, f"mode must be one of {', '.join(GENERATION_MODES)}"
+    if seed is not None and not isinstance(seed, int):
+        return None, "seed must be an integer"
+    optimize_s = data.get("optimize", 0)
+    if (not isinstance(optimize_s, (int, float)) or isinstance(optimize_s, bool)
+            or not 0 <= optimize_s <= MAX_OPTIMIZE_SECONDS):
+        return None, f"optimize must be a number of seconds from 0 to {MAX_OPTIMIZE_SECONDS}"
+    try:
+        objective = Objective.from_dict(data.get("objective"))
+    except (ValueError, TypeError) as exc:
+        return None, f"invalid objective: {exc}"
+    return {"mode": mode, "seed": seed, "optimize_s": optimize_s, "objective": objective}, None
+
+
+def _classroom_ids_error(classroom_ids):
+    """Checks an optional "classroom_ids" list. Returns None if valid, else (message, status)."""
+    if classroom_ids is None:
+        return None
+    if not isinstance(classroom_ids, list) or not all(isinstance(i, int) for i in classroom_ids):
+        return "classroom_ids must be a list of integers", 400
+    found = {cid for (cid,) in db.session.query(Classroom.classroom_id).filter(
+        Classroom.classroom_id.in_(classroom_ids))}
+    missing = sorted(set(classroom_ids) - found)
+    if missing:
+        return f"Classroom not found: {', '.join(map(str, missing))}", 404
+    return None
+
+
+# Auto-generate a classroom timetable as a background job
+# Payload (optional): {"mode": "random" | "joint" | "solver", "seed": int,
+#                      "optimize": seconds, "objective": {"weights": {...}, "max_consecutive": int, "heavy": [...]}}
+# Response 202: {"message": "Auto-generate queued", "job_id": "<hex>", "status": "queued"}
+# The job runs the engine in backend/auto against the DB teachers, keeping clear
+# of every teacher's bookings in other classrooms, optionally improves the
+# result's soft constraints for "optimize" seconds, and on success replaces the
+# classroom's allocation. Poll GET /timetable/jobs/<job_id> for progress.
+# The job fails, writing nothing, if a teacher it books was booked in another
+# classroom while it ran (re-checked with the teachers locked).
 @timetable_bp.route("/classrooms/<int:classroom_id>/auto_generate", methods=["POST"])
 def auto_generate_schedule(classroom_id: int):
     classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
     if not classroom:
         return jsonify({"error": "Classroom not found"}), 404
 
-    allocation = classroom.allocation or []
-    while len(allocation) < 5:
-        allocation.append([None] * 6)
-    for i in range(5):
-        row = allocation[i]
-        while len(row) < 6:
-            row.append(None)
-        allocation[i] = row
-
-    subjects = list((classroom.subject_details or {}).keys())
-    # naive fill: keep None cells untouched; this is a stub for UI integration
-    classroom.allocation = allocation
+    options, error = _generation_options(request.get_json(silent=True) or {})
+    if error:
+        return jsonify({"error": error}), 400
+
+    job = job_queue.submit("auto_generate", _run_auto_generate, classroom_id, options,
+                           classroom_id=classroom_id, mode=options["mode"])
+    return jsonify({"message": "Auto-generate queued", "job_id": job["id"], "status": job["status"]}), 202
+
+
+def _run_auto_generate(report, classroom_id: int, options):
+    # Runs on a job worker thread, inside the app context
+    allocation = generate_classroom(classroom_id, report=report, **options)
+    if not lock_classrooms([classroom_id]):
+        raise GenerationError("Classroom was deleted during generation")
+    check_clashes([(classroom_id, day, period, teacher_id)
+                   for day, period, _, teacher_id in iter_grid_assignments(allocation)], [classroom_id])
+    classroom = Classroom.query.filter_by(classroom_id=classroom_id).first()
+    _set_allocation(classroom, allocation)
+    db.session.commit()
+    return {"classroom_id": classroom_id, "allocation": allocation}
+
+
+# Generate the timetables of many classrooms at once as a background job
+# Payload (optional): {"classroom_ids": [1, 2], "mode": ..., "seed": ..., "optimize": ..., "objective": ...}
+#                     (classroom_ids default: every classroom; the rest as for auto_generate)
+# Response 202: {"message": "Generate queued", "job_id": "<hex>", "status": "queued"}
+# One engine run places every listed classroom together, so they share teachers
+# without clashes, and the result is written in a single transaction (bulk
+# delete + multi-row insert). The job result is {"classroom_ids": [...], "slots": int}.
+# Teachers booked elsewhere while the job ran fail it, as for auto_generate.
+@timetable_bp.route("/generate", methods=["POST"])
+def generate_schedules():
+    data = request.get_json(silent=True) or {}
+    classroom_ids = data.get("classroom_ids")
+    error = _classroom_ids_error(classroom_ids)
+    if error:
+        return jsonify({"error": error[0]}), error[1]
+    options, error = _generation_options(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    job = job_queue.submit("generate", _run_generate, classroom_ids, options,
+                           classroom_ids=classroom_ids, mode=options["mode"])
+    return jsonify({"message": "Generate queued", "job_id": job["id"], "status": job["status"]}), 202
+
+
+def _run_generate(report, classroom_ids, options):
+    # Runs on a job worker thread, inside the app context
+    result = generate_classrooms(classroom_ids, report=report, **options)
+    db.session.commit()
+    return result
+
+
+# Repair existing timetables after teachers or subject_details changed, as a background job
+# Payload (optional): {"classroom_ids": [1, 2]}   (default: every classroom)
+# Response 202: {"message": "Repair queued", "job_id": "<hex>", "status": "queued"}
+# Assignments that are still valid are kept; only the freed slots (widening to
+# whole classrooms if needed) are re-solved, and only changed cells are written.
+# The job result lists the changed slots ("changes") and the dropped assignments.
+# Teachers booked elsewhere while the job ran fail it, as for auto_generate.
+@timetable_bp.route("/repair", methods=["POST"])
+def repair_schedules():
+    data = request.get_json(silent=True) or {}
+    classroom_ids = data.get("classroom_ids")
+    error = _classroom_ids_error(classroom_ids)
+    if error:
+        return jsonify({"error": error[0]}), error[1]
+
+    job = job_queue.submit("repair", _run_repair, classroom_ids, classroom_ids=classroom_ids)
+    return jsonify({"message": "Repair queued", "job_id": job["id"], "status": job["status"]}), 202
+
+
+def _run_repair(report, classroom_ids):
+    # Runs on a job worker thread, inside the app context
+    result = repair_classrooms(classroom_ids, report=report)
+    existing = {cid for (cid,) in db.session.query(Classroom.classroom_id)}
+    if any(change["classroom_id"] not in existing for change in result["changes"]):
+        raise GenerationError("Classroom was deleted during repair")
+    apply_changes(result["changes"])
     db.session.commit()
-    return jsonify({"message": "Auto-generate completed", "allocation": classroom.allocation})
+    return result
+
+
+# Get a background job's status and progress
+# Response: {"id", "kind", "status": "queued|running|succeeded|failed", "progress": {...}, "error", ...}
+@timetable_bp.route("/jobs/<string:job_id>", methods=["GET"])
+def get_job_status(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+# Get a finished job's result
+# 200 with the result once succeeded, 202 with the status while still queued/running,
+# 422 with the error if the job failed
+@timetable_bp.route("/jobs/<string:job_id>/result", methods=["GET"])
+def get_job_result(job_id: str):
+    job = job_queue.get(job_id, with_result=True)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == FAILED:
+        return jsonify({"status": job["status"], "error": job["error"]}), 422
+    if job["status"] != SUCCEEDED:
+        return jsonify({"status": job["status"], "progress": job["progress"]}), 202
+    return jsonify({"status": job["status"], **job["result"]})
 
 
 # Onboard a classroom with simple payload from UI
@@ -608,7 +1285,7 @@ def onboard_classroom():
         classroom=classname,
         admin_email=admin,
         subject_details=subject_details,
-        allocation=[[None for _ in range(6)] for _ in range(5)],
+        allocation=current_calendar().empty_grid(),
     )
     db.session.add(classroom)
     db.session.commit()
@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+
+from .models import db, Teacher, Subject
+
+# Keys per IN (...) lookup or delete, kept under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+
+class ImportFormatError(Exception):
+    """Raised when the request body cannot be parsed at all."""
+
+
+def _split_subjects(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    # CSV cells: "Math;Physics" or "Math|Physics"
+    return str(value).replace("|", ";").split(";")
+
+
+def _normalize(raw):
+    """Maps one input record to (teachername, mailid, subjects) or raises ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("row must be an object")
+    # auto/teacher.json records: {"teacher_id": 1, "name": "...", "subject": [...]}
+    name = raw.get("teachername", raw.get("name"))
+    mailid = raw.get("mailid", raw.get("mail"))
+    if mailid is None and raw.get("teacher_id") is not None:
+        mailid = f"{raw['teacher_id']}@gmail.com"  # same convention as auto/main.py init_teachers
+    subjects = _split_subjects(raw.get("subjects", raw.get("subject")))
+
+    name = (name or "").strip() if isinstance(name, str) else ""
+    mailid = (mailid or "").strip() if isinstance(mailid, str) else ""
+    if not name:
+        raise ValueError("teachername is required")
+    if not mailid or "@" not in mailid:
+        raise ValueError("a valid mailid is required")
+    if not all(isinstance(s, str) for s in subjects):
+        raise ValueError("subjects must be strings")
+    cleaned = []
+    for s in subjects:
+        s = s.strip()
+        if s and s not in cleaned:
+            cleaned.append(s)
+    return name, mailid, cleaned
+
+
+def parse_records(mimetype, stream, data=None):
+    """
+    Yields raw records from a JSON array, a teacher.json-style object
+    ({"1": {...}, "2": {...}}), CSV with a header row, or NDJSON (streamed
+    line by line). `data` is the already-decoded JSON body, if any.
+    """
+    if mimetype in ("text/csv", "application/csv"):
+        yield from csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8"))
+    elif mimetype in ("application/x-ndjson", "application/jsonl", "application/x-jsonlines"):
+        for line in io.TextIOWrapper(stream, encoding="utf-8"):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield exc
+    else:
+        if isinstance(data, list):
+            yield from data
+        elif isinstance(data, dict):
+            # {"teachers": [...]} or the auto/teacher.json layout {"1": {...}, "2": {...}}
+            yield from data["teachers"] if isinstance(data.get("teachers"), list) else data.values()
+        else:
+            raise ImportFormatError("Expected a JSON array, a teacher.json object, CSV or NDJSON")
+
+
+def import_teachers(records):
+    """
+    Validates and upserts teachers keyed by mailid, all in one transaction.
+
+    New teachers are inserted with a single executemany-style INSERT, existing
+    ones get their name updated and their subject list replaced, so importing
+    the same data twice changes nothing.
+    Returns a summary with per-row errors; invalid rows are skipped.
+    """
+    errors = []
+    rows = {}  # mailid -> (row number, name, subjects)
+    for number, raw in enumerate(records, start=1):
+        if isinstance(raw, Exception):
+            errors.append({"row": number, "error": f"invalid JSON: {raw}"})
+            continue
+        try:
+            name, mailid, subjects = _normalize(raw)
+        except ValueError as exc:
+            errors.append({"row": number, "error": str(exc)})
+            continue
+        if mailid in rows:
+            errors.append({"row": number, "error": f"duplicate mailid {mailid} (row {rows[mailid][0]})"})
+            continue
+        rows[mailid] = (number, name, subjects)
+
+    mailids = list(rows)
+    existing = {}
+    for i in range(0, len(mailids), LOOKUP_CHUNK):
+        chunk = mailids[i:i + LOOKUP_CHUNK]
+        for teacher_id, mailid, name in db.session.query(Teacher.id, Teacher.mailid, Teacher.teachername).filter(
+                Teacher.mailid.in_(chunk)):
+            existing[mailid] = (teacher_id, name)
+    current_subjects = {}
+    existing_ids = [teacher_id for teacher_id, _ in existing.values()]
+    for i in range(0, len(existing_ids), LOOKUP_CHUNK):
+        for teacher_id, name in db.session.query(Subject.teacher_id, Subject.name).filter(
+                Subject.teacher_id.in_(existing_ids[i:i + LOOKUP_CHUNK])):
+            current_subjects.setdefault(teacher_id, set()).add(name)
+
+    new_rows = [{"teachername": rows[m][1], "mailid": m} for m in mailids if m not in existing]
+    renamed = []
+    resubjected = []
+    unchanged = 0
+    for mailid, (teacher_id, name) in existing.items():
+        _, new_name, subjects = rows[mailid]
+        changed = False
+        if new_name != name:
+            renamed.append({"id": teacher_id, "teachername": new_name})
+            changed = True
+        # Qualifications are a set: listing the same subjects in another order changes nothing
+        if set(subjects) != current_subjects.get(teacher_id, set()):
+            resubjected.append(teacher_id)
+            changed = True
+        unchanged += not changed
+
+    try:
+        subject_rows = []
+        if new_rows:
+            # Plain executemany, then read the ids back by mailid: asking for
+            # RETURNING in parameter order makes SQLite insert row by row
+            db.session.execute(db.insert(Teacher), new_rows)
+            new_mailids = [row["mailid"] for row in new_rows]
+            for i in range(0, len(new_mailids), LOOKUP_CHUNK):
+                for teacher_id, mailid in db.session.query(Teacher.id, Teacher.mailid).filter(
+                        Teacher.mailid.in_(new_mailids[i:i + LOOKUP_CHUNK])):
+                    subject_rows.extend({"name": s, "teacher_id": teacher_id} for s in rows[mailid][2])
+        if renamed:
+            db.session.execute(db.update(Teacher), renamed)
+        if resubjected:
+            for i in range(0, len(resubjected), LOOKUP_CHUNK):
+                db.session.execute(db.delete(Subject).where(
+                    Subject.teacher_id.in_(resubjected[i:i + LOOKUP_CHUNK])))
+            by_id = {teacher_id: mailid for mailid, (teacher_id, _) in existing.items()}
+            for teacher_id in resubjected:
+                subject_rows.extend({"name": s, "teacher_id": teacher_id} for s in rows[by_id[teacher_id]][2])
+        if subject_rows:
+            db.session.execute(db.insert(Subject), subject_rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        "created": len(new_rows),
+        "updated": len(existing) - unchanged,
+        "unchanged": unchanged,
+        "errors": errors,
+    }
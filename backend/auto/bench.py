@@ -0,0 +1,242 @@
+"""
+Benchmark harness for the scheduling engine.
+
+Runs every (scenario, mode) case over a range of seeds and records
+time-to-first-solution, attempts/decisions used, success rate and peak
+memory, then writes everything to a JSON file tagged with the git commit:
+
+    python bench.py --scenarios small medium --seeds 10 --output before.json
+    python bench.py --scenarios small medium --seeds 10 --compare before.json
+
+Scenario instances are generated from a fixed seed, so the same scenario
+name always means the same institution; the run seeds only drive the
+random and joint modes' shuffles. The solver is deterministic, so its
+repeats only measure timing noise. "shared", "tight" and "large" are not in
+the default set: runs that fail use up their whole attempt/node budget,
+which takes from seconds ("shared", random mode) to minutes there.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from main import init_teachers, init_classroom, run_attempt, load_data, MAX_ATTEMPTS
+from solver import Solver, SOLVED
+from state import ScheduleState, Calendar, DEFAULT_CALENDAR
+from workload import generate_institution, describe
+
+AUTO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# name -> generate_institution() arguments; "fixture" is the checked-in JSON pair
+SCENARIOS = {
+    "fixture": None,
+    "small": dict(num_classrooms=5, num_teachers=14, tightness=0.8),
+    "medium": dict(num_classrooms=20, num_teachers=30, tightness=0.9),
+    # many classes sharing a small staff: where class-by-class greedy fails
+    "shared": dict(num_classrooms=16, num_teachers=16, num_subjects=8, subjects_per_class=6,
+                   tightness=0.85, overlap=0.3),
+    "tight": dict(num_classrooms=20, num_teachers=24, tightness=1.0, overlap=0.5),
+    "large": dict(num_classrooms=60, num_teachers=90, num_subjects=16, tightness=0.9),
+    # a 6-day x 8-period week with the last period of the last day blocked
+    "week6x8": dict(num_classrooms=20, num_teachers=30, tightness=0.9, calendar=Calendar(6, 8, [(5, 7)])),
+}
+MODES = ("random", "joint", "solver")
+INSTANCE_SEED = 1
+# Half the solver's own DEFAULT_MAX_NODES (100_000): a case that fails spends
+# the whole budget on every seed, so the solver's default would double the
+# slowest cases of a run
+BENCH_MAX_NODES = 50_000
+
+
+def load_scenario(name):
+    """Returns (teacher_data, classroom_data, calendar) for a scenario name."""
+    if SCENARIOS[name] is None:
+        return (load_data(os.path.join(AUTO_DIR, "teacher.json")),
+                load_data(os.path.join(AUTO_DIR, "sample.json")), DEFAULT_CALENDAR)
+    teacher_data, classroom_data = generate_institution(seed=INSTANCE_SEED, **SCENARIOS[name])
+    return teacher_data, classroom_data, SCENARIOS[name].get("calendar", DEFAULT_CALENDAR)
+
+
+def build_state(teacher_data, classroom_data, calendar=DEFAULT_CALENDAR):
+    teachers_map, subject_index = init_teachers(teacher_data, calendar)
+    classroom_map = init_classroom(classroom_data, calendar)
+    return ScheduleState(teachers_map, classroom_map, subject_index, calendar)
+
+
+def _placed(state):
+    return sum(state.demand) - sum(state.remaining)
+
+
+def run_random(state, seed, max_attempts, joint=False):
+    """Restarts like main() until an attempt succeeds; attempt N uses seed + N - 1."""
+    start = time.perf_counter()
+    best = 0
+    for attempt in range(1, max_attempts + 1):
+        success = run_attempt(state, random.Random(seed + attempt - 1), joint=joint)
+        best = max(best, _placed(state))
+        if success:
+            break
+    return {
+        "seed": seed,
+        "success": success,
+        "time_s": time.perf_counter() - start,
+        "attempts": attempt,
+        "placed": best,
+    }
+
+
+def run_solver(state, seed, max_nodes):
+    start = time.perf_counter()
+    solver = Solver(state, max_nodes=max_nodes)
+    status, _ = solver.solve()
+    return {
+        "seed": seed,
+        "success": status == SOLVED,
+        "status": status,
+        "time_s": time.perf_counter() - start,
+        "attempts": solver.nodes,  # decisions, the solver's unit of work
+        "backjumps": solver.backjumps,
+        "placed": _placed(state),
+    }
+
+
+def run_once(state, mode, seed, args):
+    if mode == "solver":
+        return run_solver(state, seed, args.max_nodes)
+    return run_random(state, seed, args.max_attempts, joint=mode == "joint")
+
+
+def peak_memory_kb(teacher_data, classroom_data, calendar, mode, seed, args):
+    """Peak Python allocation of building the state and running one seed (traced separately, as tracing slows runs down)."""
+    tracemalloc.start()
+    try:
+        run_once(build_state(teacher_data, classroom_data, calendar), mode, seed, args)
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(runs):
+    solved = [r for r in runs if r["success"]]
+    times = [r["time_s"] for r in solved]
+    return {
+        "runs": len(runs),
+        "success_rate": len(solved) / len(runs) if runs else None,
+        "time_to_solution_median_s": statistics.median(times) if times else None,
+        "time_to_solution_p90_s": _percentile(times, 0.9),
+        "time_to_solution_mean_s": statistics.fmean(times) if times else None,
+        "attempts_median": statistics.median(r["attempts"] for r in solved) if solved else None,
+        # random/joint: runs solved by their first attempt (solver "attempts" are decisions)
+        "first_attempt_rate": sum(r["attempts"] == 1 for r in solved) / len(runs) if runs else None,
+    }
+
+
+def run_case(name, mode, seeds, args):
+    teacher_data, classroom_data, calendar = load_scenario(name)
+    setup_start = time.perf_counter()
+    state = build_state(teacher_data, classroom_data, calendar)
+    setup_s = time.perf_counter() - setup_start
+
+    runs = [run_once(state, mode, seed, args) for seed in seeds]
+    case = {
+        "scenario": name,
+        "mode": mode,
+        "instance": {**describe(teacher_data, classroom_data, calendar), "calendar": calendar.to_dict()},
+        "setup_s": setup_s,
+        **summarize(runs),
+        "peak_memory_kb": None,
+        "seeds": runs,
+    }
+    if not args.no_memory:
+        case["peak_memory_kb"] = peak_memory_kb(teacher_data, classroom_data, calendar, mode, seeds[0], args)
+    return case
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=AUTO_DIR,
+                             capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=AUTO_DIR,
+                               capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+
+def compare(results, baseline):
+    """Prints per-case median time and success rate against a previous results file."""
+    old = {(c["scenario"], c["mode"]): c for c in baseline["cases"]}
+    print(f"\nvs {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for case in results["cases"]:
+        before = old.get((case["scenario"], case["mode"]))
+        label = f"{case['scenario']}/{case['mode']}"
+        if before is None:
+            print(f"  {label:<20} (not in baseline)")
+            continue
+        t0, t1 = before["time_to_solution_median_s"], case["time_to_solution_median_s"]
+        speed = f"{t1 / t0:6.2f}x time" if t0 and t1 else "   n/a time"
+        print(f"  {label:<20} {speed}   success {before['success_rate']:.0%} -> {case['success_rate']:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the timetable engine.")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=["fixture", "small", "medium"])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--seeds", type=int, default=10, help="runs per case (seeds base-seed ..)")
+    parser.add_argument("--base-seed", type=int, default=0)
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="random-mode restarts per run")
+    parser.add_argument("--max-nodes", type=int, default=BENCH_MAX_NODES, help="solver decisions per run")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file to compare against")
+    args = parser.parse_args(argv)
+    if args.max_attempts < 1:
+        parser.error("--max-attempts must be at least 1")
+
+    seeds = list(range(args.base_seed, args.base_seed + args.seeds))
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "seeds": seeds,
+            "max_attempts": args.max_attempts,
+            "max_nodes": args.max_nodes,
+        },
+        "cases": [],
+    }
+    for name in args.scenarios:
+        for mode in args.modes:
+            case = run_case(name, mode, seeds, args)
+            results["cases"].append(case)
+            median = case["time_to_solution_median_s"]
+            timing = f"median {median * 1000:.1f} ms" if median is not None else "no solution"
+            first = f", first attempt {case['first_attempt_rate']:.0%}" if mode != "solver" else ""
+            print(f"{name}/{mode}: success {case['success_rate']:.0%}{first}, {timing}", flush=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
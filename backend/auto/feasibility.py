@@ -0,0 +1,168 @@
+"""
+Static feasibility analysis, run once before any generation attempt.
+
+check_feasibility() looks only at the input (demand, qualifications and
+teacher slots already blocked), so an impossible timetable is rejected in
+milliseconds with the reason, instead of after MAX_ATTEMPTS failed attempts
+or an exhausted search.
+"""
+from collections import deque, namedtuple
+
+from state import MAX_PERIODS_PER_DAY
+
+# code: machine-readable reason (same style as check_for_infeasibility's)
+Problem = namedtuple("Problem", ("code", "message"))
+
+
+def _teacher_capacity(state):
+    """Free slots per teacher index: the calendar's open slots minus slots booked by other classrooms."""
+    open_mask = state.calendar.open_mask
+    booked = [0] * len(state.teachers)
+    for t, slot in state.blocked:
+        booked[t] |= 1 << slot
+    return [(open_mask & ~mask).bit_count() for mask in booked]
+
+
+def _week_cap(calendar):
+    """Most periods of one subject a class can get in a week: MAX_PERIODS_PER_DAY per day, or fewer on short days."""
+    return sum(min(MAX_PERIODS_PER_DAY, (calendar.open_mask & day_mask).bit_count()) for day_mask in calendar.day_masks)
+
+
+def _max_flow(capacity, source, sink):
+    """
+    Edmonds-Karp over a dict-of-dicts residual graph (mutated in place).
+    Returns the flow value; afterwards, nodes still reachable from `source`
+    in `capacity` form the source side of a minimum cut.
+    """
+    flow = 0
+    while True:
+        parent = {source: None}
+        queue = deque([source])
+        while queue and sink not in parent:
+            node = queue.popleft()
+            for nxt, cap in capacity[node].items():
+                if cap > 0 and nxt not in parent:
+                    parent[nxt] = node
+                    queue.append(nxt)
+        if sink not in parent:
+            return flow
+        bottleneck = None
+        node = sink
+        while parent[node] is not None:
+            cap = capacity[parent[node]][node]
+            bottleneck = cap if bottleneck is None or cap < bottleneck else bottleneck
+            node = parent[node]
+        node = sink
+        while parent[node] is not None:
+            prev = parent[node]
+            capacity[prev][node] -= bottleneck
+            capacity[node][prev] = capacity[node].get(prev, 0) + bottleneck
+            node = prev
+        flow += bottleneck
+
+
+def _reachable(capacity, source):
+    seen = {source}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for nxt, cap in capacity[node].items():
+            if cap > 0 and nxt not in seen:
+                seen.add(nxt)
+                queue.append(nxt)
+    return seen
+
+
+def _teacher_flow_problem(state, subject_demand, capacity_per_teacher):
+    """
+    Max-flow bound on teacher capacity: source -> subject (its total demand)
+    -> each qualified teacher -> sink (the teacher's free slots). If the flow
+    can't carry the whole demand, the subjects on the source side of the
+    minimum cut need more periods than all their teachers together can give
+    (Hall's condition), and that group is what the message names.
+    """
+    source, sink = ("source",), ("sink",)
+    graph = {source: {}, sink: {}}
+    total = 0
+    for s, demand in enumerate(subject_demand):
+        if not demand:
+            continue
+        total += demand
+        graph[source][("s", s)] = demand
+        edges = graph[("s", s)] = {}
+        qualified = state.qualified[s]
+        while qualified:
+            t = (qualified & -qualified).bit_length() - 1
+            edges[("t", t)] = demand
+            graph.setdefault(("t", t), {sink: capacity_per_teacher[t]})
+            qualified &= qualified - 1
+
+    flow = _max_flow(graph, source, sink)
+    if flow >= total:
+        return None
+
+    side = _reachable(graph, source)
+    subjects = sorted(node[1] for node in side if node[0] == "s")
+    teachers = sorted(node[1] for node in side if node[0] == "t")
+    needed = sum(subject_demand[s] for s in subjects)
+    available = sum(capacity_per_teacher[t] for t in teachers)
+    names = ", ".join(state.subjects[s] for s in subjects)
+    teacher_ids = ", ".join(str(state.teachers[t].teacher_id) for t in teachers) or "none"
+    return Problem(
+        "TEACHER_CAPACITY_EXCEEDED",
+        f"{names} need {needed} periods in total, but the only teachers qualified for them "
+        f"(ids {teacher_ids}) have {available} free slots; at most {flow} of all {total} periods can be staffed",
+    )
+
+
+def check_feasibility(state):
+    """
+    Necessary conditions for a complete timetable, checked on the input alone:
+    - every class needs at most the calendar's open slots
+    - every (class, subject) needs at most MAX_PERIODS_PER_DAY a day, over
+      the week's days
+    - every demanded subject has a qualified teacher
+    - no teacher has to teach more than their free slots (max-flow bound over
+      all subjects sharing qualified teachers)
+    Returns a list of Problems; empty means no static reason it can't work
+    (the search can still fail on slot-level interactions).
+    """
+    problems = []
+    n_subjects = len(state.subjects)
+    calendar = state.calendar
+    week_cap = _week_cap(calendar)
+    subject_demand = [0] * n_subjects
+
+    for c, classroom_obj in enumerate(state.classrooms):
+        class_total = 0
+        for s in state.class_subjects[c]:
+            demand = state.demand[c * n_subjects + s]
+            class_total += demand
+            subject_demand[s] += demand
+            if demand > week_cap:
+                problems.append(Problem(
+                    f"MAX_PERIODS_EXCEEDED_FOR_{state.subjects[s]}",
+                    f"{classroom_obj.name} needs {demand} periods of {state.subjects[s]}, but at most "
+                    f"{week_cap} fit in a week (at most {MAX_PERIODS_PER_DAY} a day over {calendar.num_days} days)",
+                ))
+        if class_total > calendar.open_slots:
+            problems.append(Problem(
+                "SLOT_SATURATION",
+                f"{classroom_obj.name} needs {class_total} periods, but a week has only {calendar.open_slots} slots",
+            ))
+
+    unstaffed = False
+    for s, demand in enumerate(subject_demand):
+        if demand and not state.qualified[s]:
+            unstaffed = True
+            problems.append(Problem(
+                f"NO_TEACHER_FOR_{state.subjects[s]}",
+                f"{state.subjects[s]} is needed for {demand} periods, but no teacher is qualified to teach it",
+            ))
+
+    # An unstaffed subject would just be reported again as a capacity cut
+    if not unstaffed:
+        problem = _teacher_flow_problem(state, subject_demand, _teacher_capacity(state))
+        if problem is not None:
+            problems.append(problem)
+    return problems
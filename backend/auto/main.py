@@ -1,11 +1,24 @@
 # FILE: backend/main.py (Consolidated Code)
 
+import argparse
 import json
+import logging
+import os
 import random
+import sys
 # Assuming Teacher, Classroom, and Subject classes are in the backend directory
 from teacher import Teacher
 from classroom import Classroom
 from subject import Subject  # Assuming Subject class exists
+from state import ScheduleState, Calendar, DEFAULT_CALENDAR, MAX_PERIODS_PER_DAY
+from solver import Solver, SOLVED, INFEASIBLE, NODE_LIMIT, DEFAULT_MAX_NODES
+from stats import RunStats, CLASS_BUSY, DAY_CAP, NO_FREE_TEACHER
+from feasibility import check_feasibility
+from repair import repair, diff
+from optimize import optimize, Objective, DEFAULT_OBJECTIVE, TERMS
+
+# Per-attempt events go to INFO, per-class events to DEBUG; off unless -v is given
+logger = logging.getLogger("timetable.engine")
 
 # --- DATA LOADING & INIT ---
 
@@ -20,22 +33,52 @@ def load_data(filename):
         return {}
 
 
-def init_teachers(teacher_data):
-    """Initializes Teacher objects from the loaded data."""
+def load_calendar(filename=None):
+    """
+    Loads the week's shape ({"days", "periods_per_day", "blocked": [[day, period], ...]})
+    from a JSON file; without one, the default 5-day x 6-period week.
+    """
+    if not filename:
+        return DEFAULT_CALENDAR
+    return Calendar.from_dict(load_data(filename))
+
+
+def load_objective(filename=None):
+    """
+    Loads the optimizer's soft-constraint weights ({"weights": {term: weight},
+    "max_consecutive", "heavy": [subject, ...]}) from a JSON file; without one,
+    the defaults in optimize.py.
+    """
+    if not filename:
+        return DEFAULT_OBJECTIVE
+    return Objective.from_dict(load_data(filename))
+
+
+def init_teachers(teacher_data, calendar=DEFAULT_CALENDAR):
+    """
+    Initializes Teacher objects from the loaded data, plus the
+    subject -> qualified teachers index (each list sorted by teacher_id).
+    """
     teachers_map = {}
+    subject_index = {}
     for data in teacher_data.values():
         teacher_obj = Teacher(
             teacher_id=data['teacher_id'],
             name=data['name'],
             mail=f"{data['teacher_id']}@gmail.com",
             subjects=data['subject'],
+            calendar=calendar,
         )
         teachers_map[data['teacher_id']] = teacher_obj
+        for subject in teacher_obj.subjects:
+            subject_index.setdefault(subject, []).append(teacher_obj)
+    for qualified in subject_index.values():
+        qualified.sort(key=lambda t: t.teacher_id)
     # NOTE: teachers_map keys are integers (1, 2, 3...)
-    return teachers_map
+    return teachers_map, subject_index
 
 
-def init_classroom(classroom_data):
+def init_classroom(classroom_data, calendar=DEFAULT_CALENDAR):
     """Initializes Classroom objects from the loaded data."""
     classroom_map = {}
     for data in classroom_data.values():
@@ -44,7 +87,7 @@ def init_classroom(classroom_data):
             name=data['classroom'],
             subject_details=data['subject_details'],
             # Start with an empty grid for the automated allocation
-            classroomSchedule=[[None for _ in range(6)] for _ in range(5)]
+            classroomSchedule=calendar.empty_grid()
         )
         # NOTE: classroom_map keys are integers (1, 2)
         classroom_map[data['classroom_id']] = classroom_obj
@@ -53,105 +96,80 @@ def init_classroom(classroom_data):
 
 # --- CONSTRAINT & HELPER FUNCTIONS ---
 
-def check_max_subject_periods(classroom_obj, day_index, subject):
+def check_max_subject_periods(state, class_idx, day_index, subject_idx):
     """
     HARD CONSTRAINT: Returns True if the subject is currently scheduled 
     less than 2 times on the given day.
     """
-    count = 0
-    # Iterate through all 6 periods of the specific day
-    for assignment in classroom_obj.classroomSchedule[day_index]:
-        if assignment is not None and assignment.get("subject") == subject:
-            count += 1
-
-    # The current assignment will be the next one, so we check if the count is strictly < 2
-    return count < 2
+    return state.under_day_cap(class_idx, subject_idx, day_index)
 
 
-def find_available_teacher(subject, teachers_map, day_index, period_index):
+def find_available_teacher(subject_idx, state, day_index, period_index):
     """
-    Returns a list of Teacher objects qualified for the subject AND free 
-    at the specified day/period, sorted by ID (simple priority).
+    Returns the indices (into state.teachers) of teachers qualified for the
+    subject AND free at the specified day/period, lowest ID first.
+    Cost is proportional to the qualified teachers, not the whole faculty.
     """
+    free = state.free_teachers(subject_idx, state.calendar.slot_index(day_index, period_index))
     available_teachers = []
-
-    for teacher_id, teacher_obj in teachers_map.items():
-        if subject in teacher_obj.subjects:  # Check qualification
-            # Check Teacher Availability (Hard Constraint: No Conflict)
-            if teacher_obj.teacher_is_free(day_index, period_index):
-                available_teachers.append(teacher_obj)
-
-    # Prioritize the teacher with the lowest ID (simple weighting)
-    available_teachers.sort(key=lambda t: t.teacher_id)
+    while free:
+        lowest = free & -free
+        available_teachers.append(lowest.bit_length() - 1)
+        free ^= lowest
     return available_teachers
 
 
 # --- ALLOCATION ENGINE ---
 
-def allocate_single_period(classroom_obj, teachers_map):
+def allocate_single_period(state, class_idx, rng=random):
     """
     Attempts to allocate ONE remaining period using a randomized greedy approach.
     Enforces cross-class and per-day subject constraints.
+    `rng` supplies the shuffles, so a seeded random.Random makes it repeatable.
     """
 
     # 1. Identify Subject Demand (Pick the first subject with remaining demand)
-    subject_to_schedule = next(
-        (subject for subject, count in classroom_obj.remaining_periods.items() if count > 0),
-        None  # Returns None if no subjects are left
-    )
+    subject_idx = state.next_subject(class_idx)
 
-    if subject_to_schedule is None:
+    if subject_idx is None:
         return False
 
     # 2. Random Day/Period Selection
-    days = [0, 1, 2, 3, 4]
-    periods = [0, 1, 2, 3, 4, 5]
-    random.shuffle(days)
-    random.shuffle(periods)
+    days = list(range(state.num_days))
+    periods = list(range(state.periods_per_day))
+    rng.shuffle(days)
+    rng.shuffle(periods)
 
     for day_index in days:
         # Check the new Max 2 Periods Per Day constraint BEFORE checking periods
-        if not check_max_subject_periods(classroom_obj, day_index, subject_to_schedule):
+        if not check_max_subject_periods(state, class_idx, day_index, subject_idx):
             continue
 
         for period_index in periods:
+            slot = state.calendar.slot_index(day_index, period_index)
 
             # Hard Constraint 1: Class Availability
-            if not classroom_obj.classroom_is_free(day_index, period_index):
+            if not state.classroom_is_free(class_idx, slot):
                 continue
 
-            # Hard Constraint 2: Teacher Availability (Checked within find_available_teacher)
-            available_teachers = find_available_teacher(
-                subject_to_schedule, teachers_map, day_index, period_index
-            )
-
-            if available_teachers:
-                # Select the best available teacher (first one due to simple ID sort)
-                teacher_obj = available_teachers[0]
-                teacher_id = teacher_obj.teacher_id
+            # Hard Constraint 2: Teacher Availability (qualified AND free this slot)
+            free_teachers = state.free_teachers(subject_idx, slot)
 
-                # --- 3. ALLOCATION: Parallel Update ---
-
-                # A. Update Class Grid
-                classroom_obj.add_classroom_schedule(
-                    day_index, period_index, subject_to_schedule, teacher_id
-                )
-
-                # B. Update Teacher Grid (Crucial for cross-class conflict check)
-                teacher_obj.add_teacher_schedule(
-                    day_index, period_index, classroom_obj.name, subject_to_schedule
-                )
-
-                # C. Update Demand Counter
-                classroom_obj.decrement_period_count(subject_to_schedule, 1)
+            if free_teachers:
+                # Select the best available teacher (lowest bit == lowest ID)
+                teacher_idx = (free_teachers & -free_teachers).bit_length() - 1
 
+                # --- 3. ALLOCATION ---
+                # Class mask, teacher mask, per-day count and demand are all
+                # updated together; the dict grids are filled in on success.
+                state.place(class_idx, subject_idx, teacher_idx, slot)
                 return True
 
     return False
 
 
-def write_schedules_to_json(classroom_map, teachers_map):
-    """Writes the final schedules for classrooms and teachers to a JSON file."""
+def write_schedules_to_json(classroom_map, teachers_map, output_filename=None):
+    """Writes the final schedules for classrooms and teachers to a JSON file (default gen_schedule.json)."""
     final_schedules = {
         "class_schedules": {cid: {"name": c.name, "final_allocation": c.classroomSchedule}
                             for cid, c in classroom_map.items()},
@@ -159,7 +177,7 @@ def write_schedules_to_json(classroom_map, teachers_map):
                               for tid, t in teachers_map.items()}
     }
 
-    output_filename = "backend/auto/gen_schedule.json"
+    output_filename = output_filename or DEFAULT_OUTPUT_FILE
     try:
         with open(output_filename, 'w') as f:
             json.dump(final_schedules, f, indent=4)
@@ -168,7 +186,7 @@ def write_schedules_to_json(classroom_map, teachers_map):
         print(f"\n❌ Error: Could not write to file {output_filename}.")
 
 
-def check_for_infeasibility(classroom_obj):
+def check_for_infeasibility(state, class_idx):
     """
     Checks if remaining demand is impossible to meet due to:
     1. Max Periods Per Day Constraint (Max 2).
@@ -176,103 +194,527 @@ def check_for_infeasibility(classroom_obj):
     """
 
     # 1. Total Slot Check (Resource Bottleneck)
-    total_periods_assigned = sum(classroom_obj.subject_details.values(
-    )) - sum(classroom_obj.remaining_periods.values())
-    if total_periods_assigned >= 30:  # Max slots in a 5x6 grid
+    if state.class_masks[class_idx] == state.calendar.full_mask:
         return "SLOT_SATURATION"
 
     # 2. Max Periods Per Day Check (Constraint Impossibility)
-    for subject, required_count in classroom_obj.remaining_periods.items():
+    base = class_idx * len(state.subjects)
+    for subject_idx in state.class_subjects[class_idx]:
+        required_count = state.remaining[base + subject_idx]
         if required_count > 0:
 
-            # Count how many days the subject is currently scheduled < 2 times
-            available_slots_left = 0
-            for day_index in range(5):
-                # Count current placements on this day
-                current_count = sum(1 for assignment in classroom_obj.classroomSchedule[day_index]
-                                    if assignment is not None and assignment.get('subject') == subject)
-
-                # Add potential slots (2 minus what's currently scheduled)
-                available_slots_left += (2 - current_count)
+            # Potential slots left: (2 - placements) summed over the week
+            counts = state.day_counts
+            offset = (base + subject_idx) * state.num_days
+            available_slots_left = MAX_PERIODS_PER_DAY * state.num_days - sum(counts[offset:offset + state.num_days])
 
             # Check against total required periods
             if required_count > available_slots_left:
-                return f"MAX_PERIODS_EXCEEDED_FOR_{subject}"
+                return f"MAX_PERIODS_EXCEEDED_FOR_{state.subjects[subject_idx]}"
 
     return None  # Schedule is still feasible
 
 
+def record_failure(state, class_idx, reason, stats, subject_idx=None):
+    """
+    Counts why a subject of the class (default: its next subject) found no
+    slot. Each slot was rejected because the class was busy, the subject had
+    hit its daily cap, or every qualified teacher was busy (those teachers are
+    counted as the bottleneck).
+    Only runs on the failure path, so successful placements cost nothing.
+    """
+    stats.failures += 1
+    stats.failed_classes[state.classrooms[class_idx].name] += 1
+    if reason:
+        stats.infeasibility[reason] += 1
+    if subject_idx is None:
+        subject_idx = state.next_subject(class_idx)
+    if subject_idx is None:
+        return
+    stats.failed_subjects[state.subjects[subject_idx]] += 1
+
+    qualified = state.qualified[subject_idx]
+    for day_index in range(state.num_days):
+        capped = not state.under_day_cap(class_idx, subject_idx, day_index)
+        blocked_today = False
+        for period_index in range(state.periods_per_day):
+            slot = state.calendar.slot_index(day_index, period_index)
+            if not state.classroom_is_free(class_idx, slot):
+                stats.blocked_by[CLASS_BUSY] += 1
+                continue
+            blocked_today = True
+            if capped:
+                stats.blocked_by[DAY_CAP] += 1
+                continue
+            stats.blocked_by[NO_FREE_TEACHER] += 1
+            busy = qualified & state.slot_busy[slot]
+            while busy:
+                bit = busy & -busy
+                stats.busy_teachers[state.teachers[bit.bit_length() - 1].teacher_id] += 1
+                busy ^= bit
+        if blocked_today:
+            stats.failed_days[day_index] += 1
+
+
+def _schedule_classes(state, rng, stats):
+    for class_idx, classroom_obj in enumerate(state.classrooms):
+        logger.debug("Scheduling Class: %s", classroom_obj.name)
+
+        # Loop to schedule all required single periods for this class
+        while True:
+            success = allocate_single_period(state, class_idx, rng)
+
+            remaining_total = state.remaining_total(class_idx)
+
+            if remaining_total == 0:
+                break  # Class is fully scheduled
+
+            if not success:
+                # Allocation failure occurred for a subject. Test feasibility.
+                infeasibility_reason = check_for_infeasibility(
+                    state, class_idx)
+                if stats is not None:
+                    record_failure(state, class_idx, infeasibility_reason, stats)
+
+                if infeasibility_reason:
+                    # Log the fatal constraint violation and stop this attempt.
+                    logger.debug("FATAL INFEASIBILITY detected for %s: %s",
+                                 classroom_obj.name, infeasibility_reason)
+                # Otherwise it failed due to poor randomization but is still
+                # feasible; either way the caller starts a new, random attempt.
+                return False
+
+    return True
+
+
+def feasible_slots(state, class_idx, subject_idx):
+    """Mask of the slots where the class is free, the subject is under its day cap and a qualified teacher is free."""
+    calendar = state.calendar
+    mask = ~state.class_masks[class_idx] & state.subject_open[subject_idx] & calendar.full_mask
+    for day_index in range(calendar.num_days):
+        if not state.under_day_cap(class_idx, subject_idx, day_index):
+            mask &= ~calendar.day_masks[day_index]
+    return mask
+
+
+def _slack(state, class_idx, subject_idx, mask, remaining):
+    """Periods the subject can still get in `mask` (day caps included) minus the periods it still needs."""
+    capacity = 0
+    for day_index, day_mask in enumerate(state.calendar.day_masks):
+        free_today = (mask & day_mask).bit_count()
+        if free_today:
+            left = MAX_PERIODS_PER_DAY - state.day_count(class_idx, subject_idx, day_index)
+            capacity += free_today if free_today < left else left
+    return capacity - remaining
+
+
+def _schedule_jointly(state, rng, stats):
+    """
+    Interleaves placements across all classes instead of finishing one class
+    before the next. Every step places one period of the most constrained
+    (class, subject) pair:
+    - least slack: feasible slots left (day caps included) minus periods needed
+    - ties: the subject whose qualified teachers have the least free time per
+      period still needed anywhere (teacher load)
+    - remaining ties: a per-attempt random order
+    It goes in the slot where the most qualified teachers are still free (so
+    scarce teacher slots are left for others), with the qualified teacher who
+    can teach the fewest subjects, then has the most free slots.
+    A pair whose slack drops below zero fails the attempt right away.
+    Slack is cached per pair and only recomputed for the pairs a placement
+    can affect: the same class, and subjects that lost their last free teacher
+    in that slot.
+    """
+    n_subjects = len(state.subjects)
+    pairs = [(c, s) for c in range(len(state.classrooms)) for s in state.class_subjects[c]
+             if state.demand[c * n_subjects + s]]
+    rng.shuffle(pairs)
+    class_pairs = [[] for _ in state.classrooms]
+    subject_pairs = [[] for _ in state.subjects]
+    for i, (c, s) in enumerate(pairs):
+        class_pairs[c].append(i)
+        subject_pairs[s].append(i)
+    remaining = state.remaining
+
+    # Teacher load per subject: periods still needed / free qualified teacher slots
+    needed = [0] * n_subjects
+    for c, s in pairs:
+        needed[s] += remaining[c * n_subjects + s]
+    free_slots = [0] * n_subjects
+    for t, subjects in enumerate(state.teacher_subjects):
+        free = state.num_slots - state.teacher_masks[t].bit_count()
+        for s in subjects:
+            free_slots[s] += free
+
+    slack = [0] * len(pairs)
+    dirty = range(len(pairs))
+    while True:
+        for i in dirty:
+            c, s = pairs[i]
+            left = remaining[c * n_subjects + s]
+            slack[i] = _slack(state, c, s, feasible_slots(state, c, s), left) if left else None
+
+        best, best_key = None, None
+        for i, pair_slack in enumerate(slack):
+            if pair_slack is None:
+                continue
+            s = pairs[i][1]
+            key = (pair_slack, -needed[s] / free_slots[s] if free_slots[s] else float("-inf"))
+            if best_key is None or key < best_key:
+                best, best_key = i, key
+        if best is None:
+            return True
+
+        class_idx, subject_idx = pairs[best]
+        if best_key[0] < 0:
+            if stats is not None:
+                record_failure(state, class_idx, check_for_infeasibility(state, class_idx), stats, subject_idx)
+            logger.debug("No room left for %s in %s", state.subjects[subject_idx], state.classrooms[class_idx].name)
+            return False
+
+        mask = feasible_slots(state, class_idx, subject_idx)
+        slots = []
+        while mask:
+            lowest = mask & -mask
+            slots.append(lowest.bit_length() - 1)
+            mask ^= lowest
+        rng.shuffle(slots)
+        slot = max(slots, key=lambda candidate: state.free_teachers(subject_idx, candidate).bit_count())
+
+        free = state.free_teachers(subject_idx, slot)
+        teacher_idx, teacher_key = None, None
+        while free:
+            lowest = free & -free
+            t = lowest.bit_length() - 1
+            free ^= lowest
+            key = (len(state.teacher_subjects[t]), state.teacher_masks[t].bit_count())
+            if teacher_key is None or key < teacher_key:
+                teacher_idx, teacher_key = t, key
+
+        was_open = [state.subject_open[s] for s in state.teacher_subjects[teacher_idx]]
+        state.place(class_idx, subject_idx, teacher_idx, slot)
+        needed[subject_idx] -= 1
+        dirty = set(class_pairs[class_idx])
+        for s, before in zip(state.teacher_subjects[teacher_idx], was_open):
+            free_slots[s] -= 1
+            if state.subject_open[s] != before:
+                dirty.update(subject_pairs[s])
+
+
+def run_attempt(state, rng, stats=None, joint=False):
+    """
+    One randomized greedy pass over all classes, starting from an empty state:
+    class by class, or with `joint`, interleaved across classes by scarcity.
+    Returns True if every period of every class was placed.
+    With `stats` (a RunStats), the attempt, its placements and the cause of
+    any failure are counted; nothing is printed either way.
+    """
+    # 1. WORKING STATE INITIALIZATION (Resets for every attempt)
+    state.reset()
+
+    # 2. ALLOCATION LOGIC (The attempt to build the schedule)
+    if joint:
+        success = _schedule_jointly(state, rng, stats)
+    else:
+        success = _schedule_classes(state, rng, stats)
+    if stats is not None:
+        stats.attempts += 1
+        stats.placements += sum(state.demand) - sum(state.remaining)
+    return success
+
+
+def report_stats(stats, stats_path=None):
+    """Logs the run summary and optionally writes the full stats as JSON."""
+    phases = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in stats.phases.items())
+    logger.info("Stats: %d attempts, %d placements, %d failures, %d nodes, %d backtracks (%s)",
+                stats.attempts, stats.placements, stats.failures, stats.nodes, stats.backtracks, phases)
+    if stats.failures or stats.backtracks:
+        logger.info("Bottlenecks: %s", stats.bottlenecks())
+    if stats_path:
+        with open(stats_path, "w") as f:
+            json.dump(stats.to_dict(), f, indent=4)
+        logger.info("Wrote stats to %s", stats_path)
+
+
+def polish(state, stats, optimize_s, objective, seed=None):
+    """Improves the finished timetable in `state` for up to `optimize_s` seconds (no-op if 0)."""
+    if not optimize_s:
+        return
+    with stats.phase("optimize"):
+        result = optimize(state, objective, time_budget=optimize_s, rng=random.Random(seed), stats=stats)
+    terms = ", ".join(f"{term} {result.before[term]} -> {result.after[term]}" for term in TERMS)
+    print(f"Optimized with {result.moves} moves ({result.accepted} accepted): "
+          f"cost {result.before['total']:g} -> {result.after['total']:g} ({terms})")
+
+
 MAX_ATTEMPTS = 1000
 
+AUTO_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEACHERS_FILE = os.path.join(AUTO_DIR, "teacher.json")
+DEFAULT_CLASSROOMS_FILE = os.path.join(AUTO_DIR, "sample.json")
+DEFAULT_OUTPUT_FILE = os.path.join(AUTO_DIR, "gen_schedule.json")
+
+
+def open_database(db_uri, calendar_file=None):
+    """
+    Opens the API's database (a SQLAlchemy URI) through the app, pushing an app
+    context for the rest of the run, and returns app/engine.py: the data layer
+    the API's own generation jobs read from and write to. The week is the
+    app's TIMETABLE_CALENDAR unless `calendar_file` overrides it.
+    """
+    backend_dir = os.path.dirname(AUTO_DIR)
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    from app import create_app
+    from app import engine as store
+
+    config = {"SQLALCHEMY_DATABASE_URI": db_uri}
+    if calendar_file:
+        config["TIMETABLE_CALENDAR"] = load_calendar(calendar_file).to_dict()
+    create_app(config).app_context().push()
+    return store
+
+
+def save_results(state, classroom_map, teachers_map, stats, store=None, output_file=None, changes=None):
+    """
+    Writes the finished timetable. With a database (`store`), every class's
+    slots are replaced in one transaction, or with repair's `changes` only the
+    changed slots. The JSON schedules are written to `output_file` if given,
+    and to gen_schedule.json when there is no database.
+    """
+    with stats.phase("write"):
+        if store is not None:
+            if changes is None:
+                written = store.save_allocations(state)
+                print(f"\n✅ Saved {written} slots of {len(state.classrooms)} classrooms to the database")
+            else:
+                store.apply_changes(changes)
+                print(f"\n✅ Saved {len(changes)} changed slot(s) to the database")
+            store.db.session.commit()
+        if output_file or store is None:
+            state.write_back()
+            write_schedules_to_json(classroom_map, teachers_map, output_file)
+
+
+def existing_allocations(state, classroom_raw_data, existing_file=None):
+    """
+    Per class index, the timetable repair mode starts from: the class's
+    final_allocation in `existing_file` (a gen_schedule.json from an earlier
+    run) if given, else the "allocation" grid of the classroom input.
+    """
+    by_id = {data['classroom_id']: data.get('allocation') for data in classroom_raw_data.values()}
+    if existing_file:
+        for cid, schedule in load_data(existing_file).get("class_schedules", {}).items():
+            by_id[int(cid)] = schedule.get("final_allocation")
+    return [by_id.get(classroom_obj.classroom_id) for classroom_obj in state.classrooms]
+
+
+def report_changes(changes):
+    """Prints the repair diff, one changed slot per line."""
+    def describe(item):
+        return f"{item['subject']} (teacher {item['teacher_id']})" if item else "free"
+
+    print(f"{len(changes)} slot(s) changed:")
+    for change in changes:
+        print(f"  {change['classroom']} day {change['day']} period {change['period']}: "
+              f"{describe(change['before'])} -> {describe(change['after'])}")
+
 
-def main():
+def main(mode="random", seed=None, workers=1, stats_path=None,
+         teachers_file=DEFAULT_TEACHERS_FILE, classrooms_file=DEFAULT_CLASSROOMS_FILE, check_only=False,
+         existing_file=None, calendar_file=None, optimize_s=0, objective_file=None, db_uri=None, output_file=None,
+         max_nodes=DEFAULT_MAX_NODES):
+    stats = RunStats()
+    try:
+        _run(mode, seed, workers, stats, teachers_file, classrooms_file, check_only, existing_file, calendar_file,
+             optimize_s, objective_file, db_uri, output_file, max_nodes)
+    finally:
+        report_stats(stats, stats_path)
+
+
+def report_search_failure(status, detail, stats, hint):
+    """Prints why the solver (or repair) stopped without a timetable and counts a proven infeasibility."""
+    if status == NODE_LIMIT:
+        # Not a proof: the budget ran out before the search found a timetable or refuted every branch
+        print(f"\nFATAL ERROR: search budget exhausted ({detail}); the input may still be schedulable. {hint}")
+        bottlenecks = stats.bottlenecks()
+        if bottlenecks:
+            print(f"Bottlenecks: {bottlenecks}")
+        return
+    if status == INFEASIBLE:
+        stats.infeasibility[detail] += 1
+    print(f"\nFATAL ERROR: {status}: {detail}")
+
+
+def _run(mode, seed, workers, stats, teachers_file, classrooms_file, check_only, existing_file, calendar_file,
+         optimize_s, objective_file, db_uri, output_file, max_nodes=DEFAULT_MAX_NODES):
     # --- STATIC INITIALIZATION (Runs ONLY once) ---
-    teacher_raw_data = load_data('backend/teacher.json')
-    classroom_raw_data = load_data('backend/sample.json')
+    with stats.phase("load"):
+        store = None
+        if db_uri:
+            # Teachers and every classroom from the API's database, results written back there
+            store = open_database(db_uri, calendar_file)
+            teacher_raw_data, classroom_raw_data = store.load_engine_input(with_allocations=mode == "repair")
+            calendar = store.current_calendar()
+        else:
+            teacher_raw_data = load_data(teachers_file)
+            classroom_raw_data = load_data(classrooms_file)
+            calendar = load_calendar(calendar_file)
+        objective = load_objective(objective_file)
+
+    # Teacher/Classroom objects and their indices are built once; each attempt
+    # only clears the occupancy state.
+    with stats.phase("init"):
+        teachers_map, subject_index = init_teachers(teacher_raw_data, calendar)
+        classroom_map = init_classroom(classroom_raw_data, calendar)
+        state = ScheduleState(teachers_map, classroom_map, subject_index, calendar)
+
+    # Reject impossible input up front instead of after every attempt fails
+    with stats.phase("precheck"):
+        problems = check_feasibility(state)
+    for problem in problems:
+        stats.infeasibility[problem.code] += 1
+    if problems:
+        print("\nFATAL ERROR: the input cannot be scheduled:")
+        for problem in problems:
+            print(f"  - {problem.code}: {problem.message}")
+        return
+    if check_only:
+        print("✅ No static infeasibility found.")
+        return
+
+    if mode == "repair":
+        # Keep what is still valid in the existing timetable, re-solve the rest
+        allocations = existing_allocations(state, classroom_raw_data, existing_file)
+        with stats.phase("search"):
+            result = repair(state, allocations, stats=stats)
+        for dropped in result.dropped:
+            stats.infeasibility[dropped["reason"]] += 1
+        if result.status != SOLVED:
+            report_search_failure(result.status, result.detail, stats,
+                                  "Retry with --mode joint for a full regeneration.")
+            return
+        print(f"✅ FINAL SUCCESS! Timetable repaired at stage '{result.stage}' "
+              f"({len(result.dropped)} existing assignment(s) no longer valid).")
+        polish(state, stats, optimize_s, objective, seed)
+        changes = diff(state, allocations)
+        report_changes(changes)
+        save_results(state, classroom_map, teachers_map, stats, store, output_file, changes)
+        return
+
+    if mode == "solver":
+        # Systematic search: a timetable, a proof there is none, or NODE_LIMIT once --max-nodes runs out
+        with stats.phase("search"):
+            solver = Solver(state, max_nodes=max_nodes, stats=stats)
+            status, detail = solver.solve()
+        stats.add_solver(solver)
+        if status == SOLVED:
+            print(
+                f"✅ FINAL SUCCESS! Timetable solved after {solver.nodes} decisions ({solver.backjumps} backjumps).")
+            polish(state, stats, optimize_s, objective, seed)
+            save_results(state, classroom_map, teachers_map, stats, store, output_file)
+        else:
+            report_search_failure(status, detail, stats, "Retry with --mode joint or a larger --max-nodes.")
+        return
+
+    # Attempt N uses random.Random(seed + N - 1); re-running with the printed
+    # seed reproduces the same timetable, sequentially or in parallel.
+    # "joint" restarts the same way, interleaving classes within each attempt.
+    joint = mode == "joint"
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    print(f"Random seed: {seed}")
+
+    if workers > 1:
+        from parallel import run_parallel
+
+        # Workers keep no stats; attempts counts the sequence up to the winner
+        with stats.phase("search"):
+            result = run_parallel(teacher_raw_data, classroom_raw_data, seed, MAX_ATTEMPTS, workers, joint, calendar)
+        if result is None:
+            stats.attempts = MAX_ATTEMPTS
+            print(
+                f"\nFATAL ERROR: Could not find a feasible timetable within {MAX_ATTEMPTS} attempts.")
+            return
+        winning_seed, grid_subject, grid_teacher = result
+        stats.attempts = winning_seed - seed + 1
+        state.restore(grid_subject, grid_teacher)
+        print(
+            f"✅ FINAL SUCCESS! Timetable generated in attempt {winning_seed - seed + 1} ({workers} workers).")
+        polish(state, stats, optimize_s, objective, winning_seed)
+        save_results(state, classroom_map, teachers_map, stats, store, output_file)
+        return
 
     # --- THE RETRY LOOP ---
-    for attempt in range(1, MAX_ATTEMPTS + 1):
-        print(f"\n--- ATTEMPT {attempt} of {MAX_ATTEMPTS} ---")
-
-        # 1. WORKING STATE INITIALIZATION (Resets for every attempt)
-        # Create fresh, empty Teacher and Classroom objects for the new try.
-        teachers_map = init_teachers(teacher_raw_data)
-        classroom_map = init_classroom(classroom_raw_data)
-
-        successful_run = True
-
-        # 2. ALLOCATION LOGIC (The attempt to build the schedule)
-        for classroom_id, classroom_obj in classroom_map.items():
-            print(f"Scheduling Class: {classroom_obj.name}")
-
-            # Loop to schedule all required single periods for this class
-            while True:
-                success = allocate_single_period(classroom_obj, teachers_map)
-
-                remaining_total = sum(classroom_obj.remaining_periods.values())
-
-                if remaining_total == 0:
-                    break  # Class is fully scheduled
-
-                if not success:
-                    # Allocation failure occurred for a subject. Test feasibility.
-                    infeasibility_reason = check_for_infeasibility(
-                        classroom_obj)
-
-                    if infeasibility_reason:
-                        # Log the fatal constraint violation and stop this attempt.
-                        print(
-                            f"❌ FATAL INFEASIBILITY detected for {classroom_obj.name}: {infeasibility_reason}")
-                        successful_run = False
-                        break
-                    else:
-                        # Failed due to poor randomization, but still feasible. Break the inner loop
-                        # to allow the outer retry loop to start a new, random attempt.
-                        successful_run = False
-                        break
-
-            if not successful_run:
-                break  # If one class fails, stop the outer class loop and start a new attempt
-
-        # 3. CHECK & TERMINATE
-        # We need the final remaining total across ALL classes
-        grand_remaining_total = sum(
-            sum(c.remaining_periods.values()) for c in classroom_map.values()
-        )
+    with stats.phase("search"):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            logger.info("--- ATTEMPT %d of %d ---", attempt, MAX_ATTEMPTS)
 
-        if successful_run and grand_remaining_total == 0:
-            print(
-                f"✅ FINAL SUCCESS! Timetable generated in {attempt} attempts.")
-            write_schedules_to_json(classroom_map, teachers_map)
-            return  # Exit the entire program upon success
+            successful_run = run_attempt(state, random.Random(seed + attempt - 1), stats, joint)
 
-        # If unsuccessful, the loop simply increments 'attempt' and tries again.
-        print(
-            f"❌ Attempt {attempt} failed. Grand Remaining: {grand_remaining_total}. Retrying...")
+            # 3. CHECK & TERMINATE
+            if successful_run:
+                break
+
+            # If unsuccessful, the loop simply increments 'attempt' and tries again.
+            if logger.isEnabledFor(logging.INFO):
+                grand_remaining_total = sum(
+                    state.remaining_total(c) for c in range(len(state.classrooms))
+                )
+                logger.info("Attempt %d failed. Grand Remaining: %d. Retrying...", attempt, grand_remaining_total)
+        else:
+            print(
+                f"\nFATAL ERROR: Could not find a feasible timetable within {MAX_ATTEMPTS} attempts.")
+            print(f"Bottlenecks: {stats.bottlenecks()}")
+            return
 
     print(
-        f"\nFATAL ERROR: Could not find a feasible timetable within {MAX_ATTEMPTS} attempts.")
+        f"✅ FINAL SUCCESS! Timetable generated in {attempt} attempts.")
+    polish(state, stats, optimize_s, objective, seed + attempt - 1)
+    save_results(state, classroom_map, teachers_map, stats, store, output_file)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate class and teacher timetables.")
+    parser.add_argument("--mode", choices=["random", "joint", "solver", "repair"], default="random",
+                        help="random: randomized greedy with restarts, class by class; "
+                             "joint: the same, interleaving all classes by scarcity; solver: backtracking search; "
+                             "repair: keep the valid part of an existing timetable and re-solve the rest")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="base seed for the random mode (printed on every run)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to spread random-mode attempts over")
+    parser.add_argument("--teachers", default=DEFAULT_TEACHERS_FILE, help="teacher JSON (teacher.json format)")
+    parser.add_argument("--classrooms", default=DEFAULT_CLASSROOMS_FILE, help="classroom JSON (sample.json format)")
+    parser.add_argument("--db", metavar="URI",
+                        help="read teachers and classrooms from the API's database and write the timetable back "
+                             "to it, e.g. sqlite:///timetable.db (instead of --teachers/--classrooms and the JSON file)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write the schedules JSON here (default: gen_schedule.json, and none with --db)")
+    parser.add_argument("--calendar", metavar="FILE",
+                        help='week shape JSON: {"days": 6, "periods_per_day": 8, "blocked": [[5, 7]]} (default 5x6)')
+    parser.add_argument("--existing", metavar="FILE",
+                        help="repair mode: gen_schedule.json to repair (default: the classrooms' \"allocation\")")
+    parser.add_argument("--optimize", type=float, default=0, metavar="SECONDS",
+                        help="after a timetable is found, improve its soft constraints (teacher gaps, "
+                             "subject spread, consecutive periods) by local search for this long")
+    parser.add_argument("--objective", metavar="FILE",
+                        help='optimizer weights JSON: {"weights": {"teacher_gaps": 1, ...}, '
+                             '"max_consecutive": 3, "heavy": ["Mathematics"]}')
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES, metavar="N",
+                        help=f"solver mode: give up (NODE_LIMIT) after N decisions (default {DEFAULT_MAX_NODES}; "
+                             "0 for no limit)")
+    parser.add_argument("--check", action="store_true",
+                        help="only run the static feasibility check on the input")
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="-v: per-attempt events and a stats summary; -vv: per-class events too")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="write run statistics (attempts, phases, failure causes) as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(format="%(message)s",
+                        level=[logging.WARNING, logging.INFO, logging.DEBUG][min(args.verbose, 2)])
+    main(mode=args.mode, seed=args.seed, workers=args.workers, stats_path=args.stats,
+         teachers_file=args.teachers, classrooms_file=args.classrooms, check_only=args.check,
+         existing_file=args.existing, calendar_file=args.calendar, optimize_s=args.optimize,
+         objective_file=args.objective, db_uri=args.db, output_file=args.output,
+         max_nodes=args.max_nodes or None)
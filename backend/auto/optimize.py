@@ -0,0 +1,327 @@
+"""
+Soft-constraint optimization of a complete timetable.
+
+Every generation mode stops at the first timetable meeting the hard
+constraints. optimize() then improves it by simulated annealing under a
+weighted Objective. Each move keeps every hard constraint (class and teacher
+clashes, qualifications, the per-day cap, blocked and pinned slots) and is
+scored only from what it touches: at most two days of two teachers, looked up
+in per-day tables, and a few per-day subject counts. A move costs the same
+on any instance size, and only accepted moves touch the state.
+
+Moves, all within one class:
+- move: a period goes to a free slot
+- swap: two periods exchange slots (and keep their teachers)
+- teacher: a period gets another qualified teacher free at that time
+"""
+import math
+import random
+import time
+from collections import namedtuple
+
+from state import MAX_PERIODS_PER_DAY, EMPTY
+
+# Soft constraints (Objective.weights keys)
+TEACHER_GAPS = "teacher_gaps"      # idle periods between a teacher's first and last period of a day
+SUBJECT_SPREAD = "subject_spread"  # pairs of periods of one subject on the same day, per class
+CONSECUTIVE = "consecutive"        # a teacher's periods beyond max_consecutive in a row
+LATE_HEAVY = "late_heavy"          # periods of a heavy subject in the last period of a day
+TERMS = (TEACHER_GAPS, SUBJECT_SPREAD, CONSECUTIVE, LATE_HEAVY)
+
+DEFAULT_WEIGHTS = {TEACHER_GAPS: 1.0, SUBJECT_SPREAD: 1.0, CONSECUTIVE: 2.0, LATE_HEAVY: 1.0}
+DEFAULT_MAX_CONSECUTIVE = 3
+DEFAULT_TIME_BUDGET_S = 5.0
+
+# Annealing schedule: the temperature falls geometrically over the budget
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.02
+CHECK_EVERY = 1024        # moves between clock reads (and temperature updates)
+TEACHER_MOVE_RATE = 0.2   # share of moves that change a period's teacher
+
+OptimizeResult = namedtuple("OptimizeResult", ("before", "after", "moves", "accepted", "elapsed_s"))
+
+
+class Objective:
+    """
+    What optimize() minimizes: sum of weights[term] x the term's count (see
+    TERMS; a weight of 0 turns a term off). `max_consecutive` is how many
+    periods in a row a teacher takes before CONSECUTIVE counts, `heavy` the
+    subject names LATE_HEAVY keeps out of the last period of the day.
+    """
+
+    __slots__ = ("weights", "max_consecutive", "heavy")
+
+    def __init__(self, weights=None, max_consecutive=DEFAULT_MAX_CONSECUTIVE, heavy=()):
+        merged = dict(DEFAULT_WEIGHTS)
+        for term, weight in (weights or {}).items():
+            if term not in merged:
+                raise ValueError(f"unknown objective term {term!r} (expected one of {', '.join(TERMS)})")
+            if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight < 0:
+                raise ValueError(f"weight of {term} must be a non-negative number")
+            merged[term] = weight
+        if not isinstance(max_consecutive, int) or isinstance(max_consecutive, bool) or max_consecutive < 1:
+            raise ValueError("max_consecutive must be a positive integer")
+        self.weights = merged
+        self.max_consecutive = max_consecutive
+        self.heavy = frozenset(heavy)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds an objective from {"weights": {term: weight}, "max_consecutive", "heavy": [subject, ...]}."""
+        data = data or {}
+        if not isinstance(data, dict):
+            raise ValueError("the objective must be a JSON object")
+        heavy = data.get("heavy") or []
+        if not isinstance(heavy, list) or not all(isinstance(name, str) for name in heavy):
+            raise ValueError("heavy must be a list of subject names")
+        weights = data.get("weights") or {}
+        if not isinstance(weights, dict):
+            raise ValueError("weights must map objective terms to numbers")
+        return cls(weights, data.get("max_consecutive", DEFAULT_MAX_CONSECUTIVE), heavy)
+
+    def to_dict(self):
+        return {
+            "weights": dict(self.weights),
+            "max_consecutive": self.max_consecutive,
+            "heavy": sorted(self.heavy),
+        }
+
+
+DEFAULT_OBJECTIVE = Objective()
+
+
+def _day_table(periods_per_day, skip, max_consecutive):
+    """
+    (gaps, over) for every occupancy pattern of one day: idle periods between
+    the first and last taught one, and periods beyond max_consecutive in a row.
+    `skip` bits are the day's blocked periods, which are neither idle nor
+    taught and break a run.
+    """
+    gaps, over = [], []
+    for bits in range(1 << periods_per_day):
+        taught = bits & ~skip
+        idle = 0
+        if taught:
+            first = (taught & -taught).bit_length() - 1
+            span = ((1 << taught.bit_length()) - 1) & ~((1 << first) - 1)
+            idle = (span & ~taught & ~skip).bit_count()
+        run = extra = 0
+        for period in range(periods_per_day):
+            if (taught >> period) & 1:
+                run += 1
+                extra += run > max_consecutive
+            else:
+                run = 0
+        gaps.append(idle)
+        over.append(extra)
+    return gaps, over
+
+
+def _day_tables(calendar, objective):
+    """Per day: the (gaps, over) tables for that day's blocked periods (shared between equal days)."""
+    low = (1 << calendar.periods_per_day) - 1
+    cache = {}
+    tables = []
+    for day in range(calendar.num_days):
+        skip = (calendar.blocked_mask >> (day * calendar.periods_per_day)) & low
+        if skip not in cache:
+            cache[skip] = _day_table(calendar.periods_per_day, skip, objective.max_consecutive)
+        tables.append(cache[skip])
+    return tables
+
+
+def _last_periods(calendar):
+    """Per slot: 1 if it is the last open period of its day."""
+    last = [0] * calendar.num_slots
+    for day_mask in calendar.day_masks:
+        open_bits = calendar.open_mask & day_mask
+        if open_bits:
+            last[open_bits.bit_length() - 1] = 1
+    return last
+
+
+def score(state, objective=DEFAULT_OBJECTIVE):
+    """The count of every objective term for the timetable in `state`, plus their weighted "total"."""
+    calendar = state.calendar
+    periods = calendar.periods_per_day
+    low = (1 << periods) - 1
+    tables = _day_tables(calendar, objective)
+    counts = dict.fromkeys(TERMS, 0)
+
+    for mask in state.teacher_masks:
+        for day, (gaps, over) in enumerate(tables):
+            bits = (mask >> (day * periods)) & low
+            counts[TEACHER_GAPS] += gaps[bits]
+            counts[CONSECUTIVE] += over[bits]
+    for count in state.day_counts:
+        counts[SUBJECT_SPREAD] += count * (count - 1) // 2
+    last = _last_periods(calendar)
+    heavy = {s for s, subject in enumerate(state.subjects) if subject in objective.heavy}
+    for cell, s in enumerate(state.grid_subject):
+        if s in heavy and last[cell % state.num_slots]:
+            counts[LATE_HEAVY] += 1
+
+    counts["total"] = sum(objective.weights[term] * counts[term] for term in TERMS)
+    return counts
+
+
+def optimize(state, objective=DEFAULT_OBJECTIVE, time_budget=DEFAULT_TIME_BUDGET_S, max_moves=None,
+             rng=None, stats=None):
+    """
+    Improves the complete timetable in `state` by simulated annealing until
+    `time_budget` seconds or `max_moves` moves are used up (whichever ends
+    first; give only max_moves for a run that is reproducible from `rng`).
+    The best timetable found is left in `state`; pinned cells never move.
+    Returns an OptimizeResult with the score() before and after.
+    """
+    if not time_budget and not max_moves:
+        raise ValueError("optimize() needs a time_budget or max_moves")
+    rng = rng or random.Random()
+    start = time.perf_counter()
+    before = score(state, objective)
+
+    calendar = state.calendar
+    periods = calendar.periods_per_day
+    num_slots = state.num_slots
+    num_days = state.num_days
+    n_subjects = len(state.subjects)
+    n_classes = len(state.classrooms)
+    low = (1 << periods) - 1
+    weights = objective.weights
+
+    # Teacher cost of a day's occupancy pattern, both teacher terms weighted
+    teacher_cost = [[weights[TEACHER_GAPS] * g + weights[CONSECUTIVE] * o for g, o in zip(gaps, over)]
+                    for gaps, over in _day_tables(calendar, objective)]
+    day_of = [slot // periods for slot in range(num_slots)]
+    shift = [day * periods for day in range(num_days)]
+    last = _last_periods(calendar)
+    late = [weights[LATE_HEAVY] if subject in objective.heavy else 0 for subject in state.subjects]
+    spread = weights[SUBJECT_SPREAD]
+    open_slots = [slot for slot in range(num_slots) if (calendar.open_mask >> slot) & 1]
+    n_open = len(open_slots)
+    qualified = [[t for t in range(len(state.teachers)) if (mask >> t) & 1] for mask in state.qualified]
+    fixed = bytearray(n_classes * num_slots)
+    for c, _, _, slot in state.pinned:
+        fixed[c * num_slots + slot] = 1
+
+    grid_subject, grid_teacher = state.grid_subject, state.grid_teacher
+    teacher_masks, day_counts = state.teacher_masks, state.day_counts
+    place, unplace = state.place, state.unplace
+    rand = rng.random
+    exp = math.exp
+
+    cost = best = before["total"]
+    best_grids = None
+    moves = accepted = 0
+    temperature = START_TEMPERATURE
+    cooling = math.log(END_TEMPERATURE / START_TEMPERATURE)
+
+    while n_classes and n_open > 1:
+        if moves % CHECK_EVERY == 0:
+            progress = 0.0
+            if time_budget:
+                progress = (time.perf_counter() - start) / time_budget
+            if max_moves:
+                progress = max(progress, moves / max_moves)
+            if progress >= 1.0:
+                break
+            temperature = START_TEMPERATURE * exp(cooling * progress)
+        moves += 1
+
+        c = int(rand() * n_classes)
+        a = open_slots[int(rand() * n_open)]
+        cell_a = c * num_slots + a
+        s1 = grid_subject[cell_a]
+        if s1 == EMPTY or fixed[cell_a]:
+            continue
+        t1 = grid_teacher[cell_a]
+        day_a = day_of[a]
+        bit_a = 1 << a
+
+        if rand() < TEACHER_MOVE_RATE:
+            candidates = qualified[s1]
+            t2 = candidates[int(rand() * len(candidates))]
+            if t2 == t1 or teacher_masks[t2] & bit_a:
+                continue
+            m1, m2, sh, table = teacher_masks[t1], teacher_masks[t2], shift[day_a], teacher_cost[day_a]
+            delta = (table[((m1 ^ bit_a) >> sh) & low] - table[(m1 >> sh) & low]
+                     + table[((m2 | bit_a) >> sh) & low] - table[(m2 >> sh) & low])
+            if delta > 0 and rand() >= exp(-delta / temperature):
+                continue
+            unplace(c, a)
+            place(c, s1, t2, a)
+        else:
+            b = open_slots[int(rand() * n_open)]
+            cell_b = c * num_slots + b
+            if b == a or fixed[cell_b]:
+                continue
+            s2 = grid_subject[cell_b]
+            day_b = day_of[b]
+            bit_b = 1 << b
+            base1 = (c * n_subjects + s1) * num_days
+
+            if s2 == EMPTY:
+                # move: t1 teaches at b instead of a
+                m1 = teacher_masks[t1]
+                if m1 & bit_b:
+                    continue
+                delta = late[s1] * (last[b] - last[a])
+                if day_a != day_b:
+                    if day_counts[base1 + day_b] >= MAX_PERIODS_PER_DAY:
+                        continue
+                    delta += spread * (day_counts[base1 + day_b] - day_counts[base1 + day_a] + 1)
+                m1b = m1 ^ bit_a ^ bit_b
+                delta += _teacher_delta(teacher_cost, shift, low, m1, m1b, day_a, day_b)
+                if delta > 0 and rand() >= exp(-delta / temperature):
+                    continue
+                unplace(c, a)
+                place(c, s1, t1, b)
+            else:
+                # swap: (s1, t1) to b and (s2, t2) to a
+                t2 = grid_teacher[cell_b]
+                if s1 == s2 and t1 == t2:
+                    continue
+                delta = (late[s1] - late[s2]) * (last[b] - last[a])
+                if s1 != s2 and day_a != day_b:
+                    base2 = (c * n_subjects + s2) * num_days
+                    if (day_counts[base1 + day_b] >= MAX_PERIODS_PER_DAY
+                            or day_counts[base2 + day_a] >= MAX_PERIODS_PER_DAY):
+                        continue
+                    delta += spread * (day_counts[base1 + day_b] - day_counts[base1 + day_a] + 1
+                                       + day_counts[base2 + day_a] - day_counts[base2 + day_b] + 1)
+                if t1 != t2:
+                    m1, m2 = teacher_masks[t1], teacher_masks[t2]
+                    if m1 & bit_b or m2 & bit_a:
+                        continue
+                    delta += (_teacher_delta(teacher_cost, shift, low, m1, m1 ^ bit_a ^ bit_b, day_a, day_b)
+                              + _teacher_delta(teacher_cost, shift, low, m2, m2 ^ bit_a ^ bit_b, day_a, day_b))
+                if delta > 0 and rand() >= exp(-delta / temperature):
+                    continue
+                unplace(c, a)
+                unplace(c, b)
+                place(c, s1, t1, b)
+                place(c, s2, t2, a)
+
+        accepted += 1
+        cost += delta
+        if cost < best - 1e-9:
+            best = cost
+            best_grids = (grid_subject[:], grid_teacher[:])
+
+    if best_grids is not None and cost > best + 1e-9:
+        state.restore(*best_grids)
+    if stats is not None:
+        stats.moves += moves
+    return OptimizeResult(before, score(state, objective), moves, accepted, time.perf_counter() - start)
+
+
+def _teacher_delta(teacher_cost, shift, low, old, new, day_a, day_b):
+    """Change in one teacher's cost when their mask goes from `old` to `new`, which differ on day_a/day_b only."""
+    table = teacher_cost[day_a]
+    sh = shift[day_a]
+    delta = table[(new >> sh) & low] - table[(old >> sh) & low]
+    if day_b != day_a:
+        table = teacher_cost[day_b]
+        sh = shift[day_b]
+        delta += table[(new >> sh) & low] - table[(old >> sh) & low]
+    return delta
@@ -0,0 +1,78 @@
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from main import init_teachers, init_classroom, run_attempt
+from state import ScheduleState, DEFAULT_CALENDAR
+
+# Seeds handed to a worker per task; small enough that a win cancels quickly
+SEEDS_PER_TASK = 8
+
+# Worker-process globals, set once by _init_worker
+_state = None
+_best_seed = None
+_joint = False
+
+
+def _init_worker(teacher_raw_data, classroom_raw_data, best_seed, joint, calendar):
+    """Builds the worker's own ScheduleState once; tasks only reset it."""
+    global _state, _best_seed, _joint
+    teachers_map, subject_index = init_teachers(teacher_raw_data, calendar)
+    classroom_map = init_classroom(classroom_raw_data, calendar)
+    _state = ScheduleState(teachers_map, classroom_map, subject_index, calendar)
+    _best_seed = best_seed
+    _joint = joint
+
+
+def _run_seeds(seeds):
+    """
+    Runs one attempt per seed, in order. Stops as soon as a lower seed has
+    already succeeded elsewhere, since that result wins regardless.
+    Returns (seed, grid_subject, grid_teacher) for the first success, or None.
+    """
+    for seed in seeds:
+        if seed >= _best_seed.value:
+            return None
+        if run_attempt(_state, random.Random(seed), joint=_joint):
+            with _best_seed.get_lock():
+                if seed < _best_seed.value:
+                    _best_seed.value = seed
+            return seed, _state.grid_subject, _state.grid_teacher
+    return None
+
+
+def run_parallel(teacher_raw_data, classroom_raw_data, base_seed, attempts, workers, joint=False,
+                 calendar=DEFAULT_CALENDAR):
+    """
+    Spreads attempts base_seed .. base_seed + attempts - 1 over a process pool.
+
+    The result is the successful attempt with the LOWEST seed, which is the one
+    the sequential loop would have returned, so a run is reproducible from its
+    base seed whatever the worker count. Tasks whose seeds all lie above the
+    best success so far are cancelled, and running ones stop at their next seed.
+    `joint` selects run_attempt's interleaved scheduling.
+    Returns (seed, grid_subject, grid_teacher) or None if every attempt failed.
+    """
+    end = base_seed + attempts
+    best_seed = multiprocessing.Value("q", end)
+    winner = None
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(teacher_raw_data, classroom_raw_data, best_seed, joint, calendar),
+    ) as pool:
+        tasks = {}
+        for start in range(base_seed, end, SEEDS_PER_TASK):
+            seeds = range(start, min(start + SEEDS_PER_TASK, end))
+            tasks[pool.submit(_run_seeds, seeds)] = start
+
+        for future in as_completed(tasks):
+            result = future.result() if not future.cancelled() else None
+            if result is not None and (winner is None or result[0] < winner[0]):
+                winner = result
+                for other, start in tasks.items():
+                    if start > winner[0]:
+                        other.cancel()
+
+    return winner
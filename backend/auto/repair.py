@@ -0,0 +1,217 @@
+"""
+Incremental repair of an existing timetable.
+
+Instead of generating from an empty grid, repair() pins every existing
+assignment that is still valid for the current input (teacher still exists,
+is qualified and free, subject still demanded, per-day cap respected), frees
+the rest, and re-solves only a neighbourhood around what is left to place.
+The neighbourhood grows in stages until the Solver finds a timetable:
+- fill: every valid assignment stays, only the freed periods are placed
+- classes: the classes with unplaced periods are re-solved as a whole
+- teachers: plus every class sharing a teacher with the unplaced subjects
+- all: nothing pinned (a full regeneration)
+Previous placements are tried first at every stage, so the result moves as
+few slots as the search allows; diff() lists the slots that changed.
+"""
+from collections import namedtuple
+
+from solver import Solver, SOLVED, NODE_LIMIT
+from state import EMPTY
+
+# Why an existing assignment was not pinned
+OUT_OF_GRID = "OUT_OF_GRID"              # outside the calendar's days x periods
+BLOCKED_SLOT = "BLOCKED_SLOT"            # a slot the calendar keeps free of classes
+SUBJECT_REMOVED = "SUBJECT_REMOVED"      # the class no longer needs the subject
+OVER_DEMAND = "OVER_DEMAND"              # more periods placed than the class now needs
+NO_TEACHER = "NO_TEACHER"
+UNKNOWN_TEACHER = "UNKNOWN_TEACHER"      # teacher removed (e.g. on leave)
+NOT_QUALIFIED = "NOT_QUALIFIED"
+TEACHER_CLASH = "TEACHER_CLASH"          # teacher already busy in that slot
+DAY_CAP = "DAY_CAP"                      # MAX_PERIODS_PER_DAY of the subject already reached
+CELL_DROPPED = "CELL_DROPPED"            # extra teacher of a cell whose main assignment was dropped
+
+# Search budget per stage; a stage that runs out widens to the next one
+REPAIR_MAX_NODES = 20_000
+
+RepairResult = namedtuple("RepairResult", ("status", "detail", "stage", "dropped"))
+
+
+def _teacher_id(item):
+    """Teacher of an API cell ({"teacher_id"}) or an engine cell ({"teacher"})."""
+    value = item.get("teacher_id", item.get("teacher"))
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_allocation(allocation):
+    """
+    Yields (day, period, position, subject, teacher_id) for every assignment of a
+    days x periods allocation grid, in either the API shape (cells are lists of
+    {"subject", "teacher_id"}) or the engine's gen_schedule.json shape (cells
+    are single {"subject", "teacher"} dicts). `position` > 0 marks the extra
+    assignments of a multi-teacher cell.
+    """
+    for day, row in enumerate(allocation or []):
+        for period, cell in enumerate(row or []):
+            items = cell if isinstance(cell, list) else [cell]
+            position = 0
+            for item in items:
+                if not item or (not item.get("subject") and _teacher_id(item) is None):
+                    continue
+                yield day, period, position, item.get("subject") or None, _teacher_id(item)
+                position += 1
+
+
+def pin_existing(state, allocations):
+    """
+    Pins the still-valid assignments of `allocations` (per class index, a grid
+    as accepted by iter_allocation) into a freshly reset state, in grid order.
+
+    Extra assignments of a multi-teacher cell don't count towards demand; their
+    teachers are blocked in the slot (repair() keeps them blocked only while
+    the cell stays pinned).
+    Returns (extras, dropped): extras as (class, slot, teacher) and dropped
+    as dicts naming the class, slot, assignment and reason.
+    """
+    state.pinned = []
+    state.reset()
+    calendar = state.calendar
+    n_subjects = len(state.subjects)
+    extras, dropped = [], []
+
+    for c, allocation in enumerate(allocations):
+        for day, period, position, subject, teacher_id in iter_allocation(allocation):
+            reason = None
+            slot = calendar.slot_index(day, period)
+            s = state.subject_pos.get(subject)
+            t = state.teacher_pos.get(teacher_id)
+            if not calendar.in_range(day, period):
+                reason = OUT_OF_GRID
+            elif calendar.is_blocked(day, period):
+                reason = BLOCKED_SLOT
+            elif position > 0:
+                if state.grid_subject[c * state.num_slots + slot] == EMPTY:
+                    reason = CELL_DROPPED
+                elif t is None:
+                    reason = UNKNOWN_TEACHER if teacher_id is not None else NO_TEACHER
+                elif not state.teacher_is_free(t, slot):
+                    reason = TEACHER_CLASH
+                else:
+                    state.block_teacher(t, slot)
+                    extras.append((c, slot, t))
+            elif s is None or not state.demand[c * n_subjects + s]:
+                reason = SUBJECT_REMOVED
+            elif not state.remaining[c * n_subjects + s]:
+                reason = OVER_DEMAND
+            elif teacher_id is None:
+                reason = NO_TEACHER
+            elif t is None:
+                reason = UNKNOWN_TEACHER
+            elif not (state.qualified[s] >> t) & 1:
+                reason = NOT_QUALIFIED
+            elif not state.teacher_is_free(t, slot) or not state.classroom_is_free(c, slot):
+                reason = TEACHER_CLASH
+            elif not state.under_day_cap(c, s, day):
+                reason = DAY_CAP
+            else:
+                state.pin(c, s, t, slot)
+
+            if reason is not None:
+                dropped.append({
+                    "classroom": state.classrooms[c].name, "day": day, "period": period,
+                    "subject": subject, "teacher_id": teacher_id, "reason": reason,
+                })
+    return extras, dropped
+
+
+def _neighbourhoods(state):
+    """
+    The classes to unpin at each stage, widest last. Computed on the state right
+    after pin_existing, from the periods the pins leave unplaced.
+    """
+    n_subjects = len(state.subjects)
+    short_classes = set()
+    short_subjects = set()
+    for c in range(len(state.classrooms)):
+        for s in state.class_subjects[c]:
+            if state.remaining[c * n_subjects + s]:
+                short_classes.add(c)
+                short_subjects.add(s)
+
+    teachers = 0
+    for s in short_subjects:
+        teachers |= state.qualified[s]
+    sharing = set(short_classes)
+    for c, _, t, _ in state.pinned:
+        if (teachers >> t) & 1:
+            sharing.add(c)
+
+    return (("fill", set()), ("classes", short_classes), ("teachers", sharing),
+            ("all", set(range(len(state.classrooms)))))
+
+
+def repair(state, allocations, max_nodes=REPAIR_MAX_NODES, stats=None, time_limit=None):
+    """
+    Repairs the existing `allocations` (per class index) against the current
+    input. On SOLVED the repaired timetable is in `state`. `max_nodes` and
+    `time_limit` (seconds) bound the search of each stage.
+    Returns a RepairResult: status and detail as from Solver.solve(), the stage
+    that produced it and the assignments that could not be kept.
+    """
+    base_blocked = list(state.blocked)
+    extras, dropped = pin_existing(state, allocations)
+    pins = list(state.pinned)
+    preferred = {(c, slot): (s, t) for c, s, t, slot in pins}
+
+    status, detail, stage, tried = NODE_LIMIT, None, None, None
+    for stage, freed in _neighbourhoods(state):
+        if freed == tried:
+            continue
+        tried = freed
+        state.pinned = [pin for pin in pins if pin[0] not in freed]
+        kept = {(c, slot) for c, _, _, slot in state.pinned}
+        state.blocked = base_blocked + [(t, slot) for c, slot, t in extras if (c, slot) in kept]
+
+        solver = Solver(state, max_nodes=max_nodes, stats=stats, preferred=preferred, time_limit=time_limit)
+        status, detail = solver.solve()
+        if stats is not None:
+            stats.add_solver(solver)
+        if status == SOLVED:
+            break
+
+    state.pinned = []
+    state.blocked = base_blocked
+    return RepairResult(status, detail, stage, dropped)
+
+
+def diff(state, allocations):
+    """
+    Slots whose main assignment differs between the existing `allocations` and
+    the repaired state, as dicts with the class, slot and "before"/"after"
+    ({"subject", "teacher_id"} or None), in class and slot order.
+    """
+    calendar = state.calendar
+    num_slots = calendar.num_slots
+    changes = []
+    for c, allocation in enumerate(allocations):
+        before = {}
+        for day, period, position, subject, teacher_id in iter_allocation(allocation):
+            if position == 0 and calendar.in_range(day, period):
+                before[calendar.slot_index(day, period)] = {"subject": subject, "teacher_id": teacher_id}
+        for slot in range(num_slots):
+            s = state.grid_subject[c * num_slots + slot]
+            after = None
+            if s != EMPTY:
+                teacher_obj = state.teachers[state.grid_teacher[c * num_slots + slot]]
+                after = {"subject": state.subjects[s], "teacher_id": int(teacher_obj.teacher_id)}
+            if before.get(slot) != after:
+                day, period = divmod(slot, calendar.periods_per_day)
+                changes.append({
+                    "classroom_id": state.classrooms[c].classroom_id,
+                    "classroom": state.classrooms[c].name,
+                    "day": day, "period": period,
+                    "before": before.get(slot), "after": after,
+                })
+    return changes
@@ -0,0 +1,430 @@
+import time
+
+from state import MAX_PERIODS_PER_DAY
+from stats import CLASS_FULL, TEACHER_CAPACITY, NO_FEASIBLE_SLOTS
+
+# Solver outcomes
+SOLVED = "SOLVED"
+INFEASIBLE = "INFEASIBLE"
+NODE_LIMIT = "NODE_LIMIT"
+
+# Default search budget: the instances the random-restart modes solve need a few
+# hundred to a few thousand decisions; one that exhausts this is better served
+# by --mode joint (or a larger budget) than by a search that may never end
+DEFAULT_MAX_NODES = 100_000
+# How often (in decisions) the optional time limit is checked
+TIME_CHECK_INTERVAL = 256
+
+
+class _Frame:
+    """
+    One decision level: the variable, its ordered candidates, its conflict set
+    and the values it refuted (excluded from later levels of the same variable).
+    """
+
+    __slots__ = ("var", "candidates", "next", "conflicts", "refuted")
+
+    def __init__(self, var, candidates, conflicts):
+        self.var = var
+        self.candidates = candidates
+        self.next = 0
+        self.conflicts = conflicts
+        self.refuted = []
+
+
+class Solver:
+    """
+    Systematic alternative to the random-restart loop in main.py.
+
+    Each (class, subject) pair with demand is a variable that has to be
+    placed `remaining` times. Search is depth-first over single placements:
+    - variable ordering: most constrained first (least slack between the
+      slots still feasible for it and the periods it still needs), ties
+      broken by teacher load like --mode joint
+    - value ordering: as in --mode joint, the slots where the most qualified
+      teachers are still free, then the teacher who can teach the fewest
+      subjects, then has the most free slots
+    - forward checking: after every placement, the classes and subjects the
+      placement touched are re-checked, and a wiped-out domain rejects it
+    - conflict-directed backjumping: every level keeps the set of earlier
+      levels that pruned it, and an exhausted level jumps straight back to
+      the most recent of those instead of the previous level
+    The hard constraints are the engine's own: teacher clash, class clash and
+    MAX_PERIODS_PER_DAY per subject per day. A (slot, teacher) value refuted
+    at one level of a variable is not retried at its deeper levels, which
+    removes the equivalent permutations of the same placements.
+
+    Slack and the per-subject and per-class counters are kept up to date per
+    placement (and undone from the trail), so a node costs the variables the
+    placement can affect rather than a scan of all of them.
+
+    The search is deterministic and exhaustive, so solve() ends with a
+    complete timetable in `state`, with INFEASIBLE once every branch has been
+    refuted, or with NODE_LIMIT when the budget runs out first: `max_nodes`
+    decisions (DEFAULT_MAX_NODES; None for no limit) and, optionally,
+    `time_limit` seconds.
+
+    `nodes`, `backtracks` and `backjumps` are always counted; with `stats`
+    (a RunStats) every forward-check wipe-out is also attributed to the
+    class or subject that caused it.
+
+    `preferred` ({(class, slot): (subject, teacher)}, from repair mode) puts a
+    previous timetable's own placements first in each candidate list, so the
+    result stays as close to it as the search allows.
+    """
+
+    def __init__(self, state, max_nodes=DEFAULT_MAX_NODES, stats=None, preferred=None, time_limit=None):
+        self.state = state
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.stats = stats
+        self.preferred = preferred
+        self.num_days = state.num_days
+        self.full_mask = state.calendar.full_mask
+        self.day_masks = state.calendar.day_masks
+        self.nodes = 0
+        self.backtracks = 0
+        self.backjumps = 0
+
+        n_subjects = len(state.subjects)
+        self.variables = []
+        self.class_vars = [[] for _ in state.classrooms]
+        self.subject_vars = [[] for _ in state.subjects]
+        for c, subjects in enumerate(state.class_subjects):
+            for s in subjects:
+                if state.demand[c * n_subjects + s] > 0:
+                    v = len(self.variables)
+                    self.variables.append((c, s))
+                    self.class_vars[c].append(v)
+                    self.subject_vars[s].append(v)
+
+        self.qualified_teachers = []
+        for mask in state.qualified:
+            self.qualified_teachers.append([t for t in range(len(state.teachers)) if (mask >> t) & 1])
+
+        # Search bookkeeping, all undone in strict LIFO order
+        self.trail = []  # per level: (var, slot, teacher, subjects that lost the slot, previous slacks)
+        self.class_levels = [[] for _ in state.classrooms]
+        self.teacher_levels = [[] for _ in state.teachers]
+        self.excluded = [{} for _ in self.variables]  # per variable: refuted (slot, teacher) -> level
+
+        # Incremental counters, filled by _init_counters()
+        self.slack = []
+        self.subject_needed = []
+        self.subject_free = []
+        self.class_needed = []
+
+    def _init_counters(self):
+        state = self.state
+        n_subjects = len(state.subjects)
+        self.slack = [self._slack(v) for v in range(len(self.variables))]
+        self.subject_needed = [0] * n_subjects
+        for c, s in self.variables:
+            self.subject_needed[s] += state.remaining[c * n_subjects + s]
+        self.subject_free = [0] * n_subjects
+        for t, subjects in enumerate(state.teacher_subjects):
+            free = state.num_slots - state.teacher_masks[t].bit_count()
+            for s in subjects:
+                self.subject_free[s] += free
+        self.class_needed = [state.remaining_total(c) for c in range(len(state.classrooms))]
+
+    # --- DOMAINS ---
+
+    def _domain(self, v):
+        """Slots (as a mask) where the next placement of variable v is still allowed."""
+        c, s = self.variables[v]
+        state = self.state
+        mask = ~state.class_masks[c] & state.subject_open[s] & self.full_mask
+        for day, day_mask in enumerate(self.day_masks):
+            if not state.under_day_cap(c, s, day):
+                mask &= ~day_mask
+        return mask
+
+    def _slack(self, v):
+        """
+        Periods v could still receive (distinct feasible slots, at most
+        MAX_PERIODS_PER_DAY per day) minus the periods it still needs.
+        """
+        c, s = self.variables[v]
+        state = self.state
+        base = c * len(state.subjects) + s
+        mask = ~state.class_masks[c] & state.subject_open[s]
+        counts = state.day_counts
+        offset = base * self.num_days
+        capacity = 0
+        for day, day_mask in enumerate(self.day_masks):
+            left = MAX_PERIODS_PER_DAY - counts[offset + day]
+            if left > 0:
+                free_today = (mask & day_mask).bit_count()
+                capacity += free_today if free_today < left else left
+        return capacity - state.remaining[base]
+
+    def _subject_slack(self, s):
+        """
+        Free (teacher, slot) pairs among the teachers qualified for s, minus the
+        periods of s still to place in all classes. Negative means no
+        assignment of teachers can cover the demand.
+        """
+        return self.subject_free[s] - self.subject_needed[s]
+
+    def _subject_culprits(self, s):
+        levels = set()
+        for t in self.qualified_teachers[s]:
+            levels.update(self.teacher_levels[t])
+        return levels
+
+    def _culprits(self, v):
+        """Levels whose placements can have pruned variable v's domain."""
+        c, s = self.variables[v]
+        levels = set(self.class_levels[c])
+        for t in self.qualified_teachers[s]:
+            levels.update(self.teacher_levels[t])
+        return levels
+
+    def _candidates(self, v, conflicts):
+        """
+        (slot, teacher) values for v, without those refuted at an earlier level
+        of v (whose levels join `conflicts`): the preferred placements first, if
+        any, then slots by most free qualified teachers (earliest first on ties)
+        and teachers by fewest subjects, most free slots, lowest index.
+        """
+        c, s = self.variables[v]
+        state = self.state
+        excluded = self.excluded[v]
+        mask = self._domain(v)
+        slots = []
+        while mask:
+            lowest = mask & -mask
+            slot = lowest.bit_length() - 1
+            mask ^= lowest
+            free = state.free_teachers(s, slot)
+            slots.append((-free.bit_count(), slot, free))
+        slots.sort()
+
+        teacher_subjects = state.teacher_subjects
+        teacher_masks = state.teacher_masks
+        candidates = []
+        for _, slot, free in slots:
+            teachers = []
+            while free:
+                bit = free & -free
+                t = bit.bit_length() - 1
+                free ^= bit
+                teachers.append((len(teacher_subjects[t]), teacher_masks[t].bit_count(), t))
+            teachers.sort()
+            for _, _, t in teachers:
+                level = excluded.get((slot, t))
+                if level is None:
+                    candidates.append((slot, t))
+                else:
+                    conflicts.add(level)
+        if self.preferred:
+            preferred = self.preferred
+
+            def rank(value):
+                previous = preferred.get((c, value[0]))
+                if previous is None or previous[0] != s:
+                    return 2
+                return 0 if previous[1] == value[1] else 1
+
+            candidates.sort(key=rank)
+        return candidates
+
+    # --- SEARCH ---
+
+    def _select(self):
+        """
+        Most constrained open variable: smallest slack, then the highest teacher
+        load (periods of its subject still needed per free qualified teacher
+        slot). None when all are placed.
+        """
+        best, best_key = None, None
+        remaining = self.state.remaining
+        n_subjects = len(self.state.subjects)
+        slack = self.slack
+        needed = self.subject_needed
+        free = self.subject_free
+        for v, (c, s) in enumerate(self.variables):
+            if not remaining[c * n_subjects + s]:
+                continue
+            key = (slack[v], -needed[s] / free[s] if free[s] else float("-inf"))
+            if best_key is None or key < best_key:
+                best, best_key = v, key
+        return best
+
+    def _assign(self, v, slot, t):
+        c, s = self.variables[v]
+        state = self.state
+        level = len(self.trail)
+        teacher_subjects = state.teacher_subjects[t]
+        was_open = [state.subject_open[s2] for s2 in teacher_subjects]
+        state.place(c, s, t, slot)
+
+        self.subject_needed[s] -= 1
+        self.class_needed[c] -= 1
+        closed = []
+        for s2, before in zip(teacher_subjects, was_open):
+            self.subject_free[s2] -= 1
+            if state.subject_open[s2] != before:
+                closed.append(s2)
+
+        # Only the same class and the subjects that lost their last free teacher at `slot` change slack
+        slack = self.slack
+        saved = []
+        dirty = set(self.class_vars[c])
+        for s2 in closed:
+            dirty.update(self.subject_vars[s2])
+        for u in dirty:
+            saved.append((u, slack[u]))
+            slack[u] = self._slack(u)
+
+        self.trail.append((v, slot, t, saved))
+        self.class_levels[c].append(level)
+        self.teacher_levels[t].append(level)
+
+    def _unassign(self):
+        v, slot, t, saved = self.trail.pop()
+        c, s = self.variables[v]
+        self.state.unplace(c, slot)
+        self.subject_needed[s] += 1
+        self.class_needed[c] += 1
+        for s2 in self.state.teacher_subjects[t]:
+            self.subject_free[s2] += 1
+        slack = self.slack
+        for u, previous in saved:
+            slack[u] = previous
+        self.class_levels[c].pop()
+        self.teacher_levels[t].pop()
+
+    def _refute(self, frame, level, slot, t):
+        """Excludes the value just undone at `level` from the deeper levels of the same variable."""
+        self.excluded[frame.var][(slot, t)] = level
+        frame.refuted.append((slot, t))
+
+    def _drop(self, frame):
+        """Lifts the exclusions of a level that is being left."""
+        excluded = self.excluded[frame.var]
+        for value in frame.refuted:
+            del excluded[value]
+
+    def _record_wipeout(self, cause, c=None, s=None):
+        stats = self.stats
+        stats.blocked_by[cause] += 1
+        if c is not None:
+            stats.failed_classes[self.state.classrooms[c].name] += 1
+        if s is not None:
+            stats.failed_subjects[self.state.subjects[s]] += 1
+
+    def _forward_check(self, v, t):
+        """
+        Re-checks the class of v, the teacher capacity of every subject t can
+        teach, and every open variable whose slack the placement changed.
+        Returns the culprit levels of the first wiped-out variable, or None if
+        all of them can still meet their demand.
+        """
+        c = self.variables[v][0]
+        state = self.state
+        n_subjects = len(state.subjects)
+        free_slots = (~state.class_masks[c] & self.full_mask).bit_count()
+        if free_slots < self.class_needed[c]:
+            if self.stats is not None:
+                self._record_wipeout(CLASS_FULL, c=c)
+            return set(self.class_levels[c])
+
+        for s in state.teacher_subjects[t]:
+            if self.subject_free[s] < self.subject_needed[s]:
+                if self.stats is not None:
+                    self._record_wipeout(TEACHER_CAPACITY, s=s)
+                return self._subject_culprits(s)
+        slack = self.slack
+        for u, _ in self.trail[-1][3]:
+            if slack[u] < 0:
+                cu, su = self.variables[u]
+                if state.remaining[cu * n_subjects + su]:
+                    if self.stats is not None:
+                        self._record_wipeout(NO_FEASIBLE_SLOTS, c=cu, s=su)
+                    return self._culprits(u)
+        return None
+
+    def _explain(self):
+        """Describes the root-level bottleneck for an INFEASIBLE result."""
+        for s, subject in enumerate(self.state.subjects):
+            if self._subject_slack(s) < 0:
+                return f"NOT_ENOUGH_TEACHER_SLOTS_FOR_{subject}"
+        for v in range(len(self.variables)):
+            if self.slack[v] < 0:
+                c, s = self.variables[v]
+                return f"NO_FEASIBLE_SLOTS_FOR_{self.state.subjects[s]}_IN_{self.state.classrooms[c].name}"
+        for c, classroom_obj in enumerate(self.state.classrooms):
+            if self.state.remaining_total(c) > self.state.calendar.open_slots:
+                return f"SLOT_SATURATION_IN_{classroom_obj.name}"
+        return "SEARCH_SPACE_EXHAUSTED"
+
+    def _out_of_budget(self, started):
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            return True
+        return (self.time_limit is not None and self.nodes % TIME_CHECK_INTERVAL == 0
+                and time.perf_counter() - started > self.time_limit)
+
+    def solve(self):
+        """
+        Runs the search on a freshly reset state.
+        Returns (status, detail): (SOLVED, None), (INFEASIBLE, reason) or
+        (NODE_LIMIT, what was spent).
+        """
+        started = time.perf_counter()
+        self.state.reset()
+        self._init_counters()
+        explanation = self._explain()
+        if explanation != "SEARCH_SPACE_EXHAUSTED":
+            return INFEASIBLE, explanation
+
+        stack = []
+        descend = True
+        while True:
+            if descend:
+                v = self._select()
+                if v is None:
+                    return SOLVED, None
+                self.nodes += 1
+                if self._out_of_budget(started):
+                    self.nodes -= 1
+                    return NODE_LIMIT, f"gave up after {self.nodes} decisions in {time.perf_counter() - started:.1f} s"
+                conflicts = self._culprits(v)
+                stack.append(_Frame(v, self._candidates(v, conflicts), conflicts))
+
+            frame = stack[-1]
+            level = len(stack) - 1
+            descend = False
+            while frame.next < len(frame.candidates):
+                slot, t = frame.candidates[frame.next]
+                frame.next += 1
+                self._assign(frame.var, slot, t)
+                wiped = self._forward_check(frame.var, t)
+                if wiped is None:
+                    descend = True
+                    break
+                frame.conflicts |= wiped
+                self.backtracks += 1
+                self._unassign()
+                self._refute(frame, level, slot, t)
+            if descend:
+                continue
+
+            # Every value failed: jump back to the latest level in the conflict set
+            stack.pop()
+            self._drop(frame)
+            frame.conflicts.discard(level)
+            if not frame.conflicts:
+                return INFEASIBLE, "SEARCH_SPACE_EXHAUSTED"
+            target = max(frame.conflicts)
+            if target < level - 1:
+                self.backjumps += 1
+            while len(stack) - 1 > target:
+                self._drop(stack.pop())
+                self._unassign()
+            _, slot, t, _ = self.trail[-1]
+            self._unassign()  # the target level's own value
+            self._refute(stack[-1], target, slot, t)
+            frame.conflicts.discard(target)
+            stack[-1].conflicts |= frame.conflicts
@@ -0,0 +1,284 @@
+from array import array
+
+# Grid shape used when no calendar is configured
+DEFAULT_DAYS = 5
+DEFAULT_PERIODS_PER_DAY = 6
+
+# HARD CONSTRAINT: a subject may appear at most this many times per day
+MAX_PERIODS_PER_DAY = 2
+
+EMPTY = -1
+
+
+class Calendar:
+    """
+    The institution's week: `num_days` x `periods_per_day` slots, minus the
+    `blocked` (day, period) slots when no class is held (assembly, lunch...).
+
+    Everything sized by the week (occupancy masks, per-day counts, grids) is
+    derived from here. Slots are numbered day by day, so slot_index() is also
+    the bit position of a (day, period) pair in an occupancy mask.
+    """
+
+    __slots__ = ("num_days", "periods_per_day", "num_slots", "full_mask", "day_masks",
+                 "blocked", "blocked_mask", "open_mask", "open_slots")
+
+    def __init__(self, num_days=DEFAULT_DAYS, periods_per_day=DEFAULT_PERIODS_PER_DAY, blocked=()):
+        for name, value in (("days", num_days), ("periods_per_day", periods_per_day)):
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ValueError(f"{name} must be a positive integer")
+        self.num_days = num_days
+        self.periods_per_day = periods_per_day
+        self.num_slots = num_days * periods_per_day
+        self.full_mask = (1 << self.num_slots) - 1
+        self.day_masks = tuple(((1 << periods_per_day) - 1) << (d * periods_per_day) for d in range(num_days))
+
+        self.blocked = []
+        self.blocked_mask = 0
+        for entry in blocked:
+            day, period = entry
+            if not self.in_range(day, period):
+                raise ValueError(f"blocked slot {[day, period]} is outside the {num_days}x{periods_per_day} week")
+            if not (self.blocked_mask >> self.slot_index(day, period)) & 1:
+                self.blocked.append((day, period))
+                self.blocked_mask |= 1 << self.slot_index(day, period)
+        self.blocked.sort()
+        self.open_mask = self.full_mask & ~self.blocked_mask
+        self.open_slots = self.open_mask.bit_count()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a calendar from {"days", "periods_per_day", "blocked": [[day, period], ...]}; missing keys use the defaults."""
+        data = data or {}
+        blocked = data.get("blocked") or []
+        if not isinstance(blocked, list) or not all(isinstance(e, (list, tuple)) and len(e) == 2 for e in blocked):
+            raise ValueError("blocked must be a list of [day, period] pairs")
+        return cls(data.get("days", DEFAULT_DAYS), data.get("periods_per_day", DEFAULT_PERIODS_PER_DAY), blocked)
+
+    def to_dict(self):
+        return {
+            "days": self.num_days,
+            "periods_per_day": self.periods_per_day,
+            "blocked": [list(entry) for entry in self.blocked],
+        }
+
+    def slot_index(self, day, period):
+        """Returns the bit position of a (day, period) pair in an occupancy mask."""
+        return day * self.periods_per_day + period
+
+    def in_range(self, day, period):
+        return 0 <= day < self.num_days and 0 <= period < self.periods_per_day
+
+    def is_blocked(self, day, period):
+        return (self.blocked_mask >> self.slot_index(day, period)) & 1 == 1
+
+    def empty_grid(self):
+        """A days x periods_per_day grid of None, the shape of every schedule grid."""
+        return [[None for _ in range(self.periods_per_day)] for _ in range(self.num_days)]
+
+
+DEFAULT_CALENDAR = Calendar()
+
+
+class ScheduleState:
+    """
+    Compact working state for one allocation attempt.
+
+    Teachers, classrooms and subjects are numbered once when the state is
+    built; the per-attempt bookkeeping is then plain integers and flat arrays,
+    all sized from `calendar` (num_slots = days x periods per day):
+    - teacher_masks / class_masks: one num_slots-bit occupancy mask per entity
+    - day_counts: placements per (class, subject, day), for the per-day cap
+    - remaining: periods still to place per (class, subject)
+    - grid_subject / grid_teacher: the placement per (class, slot), EMPTY if free
+    - slot_busy: per slot, a bitset of the teachers already teaching then
+    - subject_open: per subject, a mask of slots where at least one
+      qualified teacher is still free
+    The calendar's blocked slots count as taken for every class and teacher.
+    Combined with `qualified` (per subject, a bitset of teachers who can teach
+    it) a free-teacher lookup is `qualified[s] & ~slot_busy[slot]`.
+    reset() clears all of it so the same indices are reused across retries.
+    Teacher slots booked outside this run (block_teacher) and placements
+    fixed by pin() (repair mode) survive a reset.
+    """
+
+    __slots__ = (
+        "teachers", "classrooms", "subjects",
+        "teacher_pos", "subject_pos", "class_subjects", "demand",
+        "qualified", "teacher_subjects",
+        "teacher_masks", "class_masks", "slot_busy", "subject_open",
+        "day_counts", "remaining",
+        "grid_subject", "grid_teacher", "blocked", "pinned",
+        "calendar", "num_days", "periods_per_day", "num_slots",
+    )
+
+    def __init__(self, teachers_map, classroom_map, subject_index, calendar=DEFAULT_CALENDAR):
+        self.calendar = calendar
+        self.num_days = calendar.num_days
+        self.periods_per_day = calendar.periods_per_day
+        self.num_slots = calendar.num_slots
+
+        # Teachers are numbered by ascending ID so "lowest index" == "lowest ID"
+        self.teachers = sorted(teachers_map.values(), key=lambda t: t.teacher_id)
+        self.teacher_pos = {t.teacher_id: i for i, t in enumerate(self.teachers)}
+        self.classrooms = list(classroom_map.values())
+
+        self.subjects = []
+        self.subject_pos = {}
+        for classroom_obj in self.classrooms:
+            for subject in classroom_obj.subject_details:
+                if subject not in self.subject_pos:
+                    self.subject_pos[subject] = len(self.subjects)
+                    self.subjects.append(subject)
+
+        # Per class: subject indices in subject_details order (demand priority)
+        n_subjects = len(self.subjects)
+        self.class_subjects = []
+        self.demand = array("H", bytes(2 * len(self.classrooms) * n_subjects))
+        for c, classroom_obj in enumerate(self.classrooms):
+            order = []
+            for subject, count in classroom_obj.subject_details.items():
+                s = self.subject_pos[subject]
+                order.append(s)
+                self.demand[c * n_subjects + s] = count
+            self.class_subjects.append(tuple(order))
+
+        # Per subject: bitset over teacher indices of who is qualified,
+        # and the reverse: per teacher, the subject indices they can take
+        self.qualified = []
+        self.teacher_subjects = [[] for _ in self.teachers]
+        for s, subject in enumerate(self.subjects):
+            mask = 0
+            for teacher_obj in subject_index.get(subject, ()):
+                t = self.teacher_pos[teacher_obj.teacher_id]
+                mask |= 1 << t
+                self.teacher_subjects[t].append(s)
+            self.qualified.append(mask)
+
+        self.blocked = []
+        self.pinned = []
+        self.reset()
+
+    def reset(self):
+        """Clears every placement except the pinned ones, restoring the rest of the demand."""
+        n_classes = len(self.classrooms)
+        n_subjects = len(self.subjects)
+        calendar = self.calendar
+        blocked_mask = calendar.blocked_mask
+        all_teachers = (1 << len(self.teachers)) - 1
+        self.teacher_masks = [blocked_mask] * len(self.teachers)
+        self.class_masks = [blocked_mask] * n_classes
+        self.slot_busy = [all_teachers if (blocked_mask >> slot) & 1 else 0 for slot in range(self.num_slots)]
+        self.subject_open = [calendar.open_mask if q else 0 for q in self.qualified]
+        self.day_counts = array("B", bytes(n_classes * n_subjects * self.num_days))
+        self.remaining = array("H", self.demand)
+        self.grid_subject = array("h", [EMPTY]) * (n_classes * self.num_slots)
+        self.grid_teacher = array("h", [EMPTY]) * (n_classes * self.num_slots)
+        for t, slot in self.blocked:
+            self._occupy_teacher(t, slot)
+        for c, s, t, slot in self.pinned:
+            self.place(c, s, t, slot)
+
+    # --- CHECKS ---
+
+    def teacher_is_free(self, t, slot):
+        return not (self.teacher_masks[t] >> slot) & 1
+
+    def classroom_is_free(self, c, slot):
+        return not (self.class_masks[c] >> slot) & 1
+
+    def free_teachers(self, s, slot):
+        """Bitset of teacher indices qualified for subject s and free at `slot`."""
+        return self.qualified[s] & ~self.slot_busy[slot]
+
+    def day_count(self, c, s, day):
+        return self.day_counts[(c * len(self.subjects) + s) * self.num_days + day]
+
+    def under_day_cap(self, c, s, day):
+        """True if subject s can still be placed once more on `day` for class c."""
+        return self.day_counts[(c * len(self.subjects) + s) * self.num_days + day] < MAX_PERIODS_PER_DAY
+
+    def next_subject(self, c):
+        """Returns the first subject index of class c with remaining demand, or None."""
+        base = c * len(self.subjects)
+        for s in self.class_subjects[c]:
+            if self.remaining[base + s] > 0:
+                return s
+        return None
+
+    def remaining_total(self, c):
+        base = c * len(self.subjects)
+        return sum(self.remaining[base + s] for s in self.class_subjects[c])
+
+    # --- MUTATION ---
+
+    def _occupy_teacher(self, t, slot):
+        bit = 1 << slot
+        self.teacher_masks[t] |= bit
+        self.slot_busy[slot] |= 1 << t
+        busy = self.slot_busy[slot]
+        for s2 in self.teacher_subjects[t]:
+            if not self.qualified[s2] & ~busy:
+                self.subject_open[s2] &= ~bit
+
+    def block_teacher(self, t, slot):
+        """Marks teacher t busy at `slot` for this and every later attempt."""
+        self.blocked.append((t, slot))
+        self._occupy_teacher(t, slot)
+
+    def pin(self, c, s, t, slot):
+        """Places subject s for class c at `slot` for this and every later attempt."""
+        self.pinned.append((c, s, t, slot))
+        self.place(c, s, t, slot)
+
+    def place(self, c, s, t, slot):
+        """Records subject s taught by teacher t for class c at `slot`."""
+        self.class_masks[c] |= 1 << slot
+        self._occupy_teacher(t, slot)
+        base = c * len(self.subjects) + s
+        self.day_counts[base * self.num_days + slot // self.periods_per_day] += 1
+        self.remaining[base] -= 1
+        self.grid_subject[c * self.num_slots + slot] = s
+        self.grid_teacher[c * self.num_slots + slot] = t
+
+    def unplace(self, c, slot):
+        """Undoes the placement of class c at `slot` (the inverse of place())."""
+        cell = c * self.num_slots + slot
+        s = self.grid_subject[cell]
+        t = self.grid_teacher[cell]
+        bit = 1 << slot
+        self.class_masks[c] &= ~bit
+        self.teacher_masks[t] &= ~bit
+        self.slot_busy[slot] &= ~(1 << t)
+        for s2 in self.teacher_subjects[t]:
+            self.subject_open[s2] |= bit
+        base = c * len(self.subjects) + s
+        self.day_counts[base * self.num_days + slot // self.periods_per_day] -= 1
+        self.remaining[base] += 1
+        self.grid_subject[cell] = EMPTY
+        self.grid_teacher[cell] = EMPTY
+
+    def restore(self, grid_subject, grid_teacher):
+        """Resets the state and replays the placements of saved grid arrays (pins are already in)."""
+        self.reset()
+        for cell, s in enumerate(grid_subject):
+            if s != EMPTY and self.grid_subject[cell] == EMPTY:
+                c, slot = divmod(cell, self.num_slots)
+                self.place(c, s, grid_teacher[cell], slot)
+
+    def write_back(self):
+        """
+        Copies the placements into the Classroom/Teacher objects' grids, so the
+        rest of the pipeline (JSON output) sees the familiar days x periods schedules.
+        """
+        for c, classroom_obj in enumerate(self.classrooms):
+            for slot in range(self.num_slots):
+                s = self.grid_subject[c * self.num_slots + slot]
+                if s == EMPTY:
+                    continue
+                day, period = divmod(slot, self.periods_per_day)
+                subject = self.subjects[s]
+                teacher_obj = self.teachers[self.grid_teacher[c * self.num_slots + slot]]
+                classroom_obj.add_classroom_schedule(day, period, subject, teacher_obj.teacher_id)
+                teacher_obj.add_teacher_schedule(day, period, classroom_obj.name, subject)
+                classroom_obj.decrement_period_count(subject, 1)
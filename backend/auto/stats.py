@@ -0,0 +1,83 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Why a subject could not be placed (RunStats.blocked_by keys)
+CLASS_BUSY = "CLASS_BUSY"              # the class already has a period in the slot
+DAY_CAP = "DAY_CAP"                    # MAX_PERIODS_PER_DAY of the subject reached that day
+NO_FREE_TEACHER = "NO_FREE_TEACHER"    # every qualified teacher is busy in the slot
+CLASS_FULL = "CLASS_FULL"              # solver: fewer free slots than periods left in the class
+TEACHER_CAPACITY = "TEACHER_CAPACITY"  # solver: qualified teachers can't cover the subject's demand
+NO_FEASIBLE_SLOTS = "NO_FEASIBLE_SLOTS"  # solver: a (class, subject) has fewer usable slots than periods left
+
+
+class RunStats:
+    """
+    Structured statistics for one engine run.
+
+    Counters are plain attributes; the failure histograms are keyed by names
+    (subject, classroom, teacher id, day index) so the JSON from to_dict() can
+    be read without the input files. Nothing here does I/O: callers decide
+    whether to log, print or dump it.
+    """
+
+    def __init__(self):
+        self.attempts = 0
+        self.placements = 0        # periods placed, summed over attempts
+        self.failures = 0          # random mode: allocations that found no slot
+        self.nodes = 0             # solver: decisions
+        self.backtracks = 0        # solver: values undone after a failed forward check
+        self.backjumps = 0         # solver: backtracks that skipped levels
+        self.moves = 0             # optimizer: local-search moves tried
+        self.phases = {}           # phase name -> seconds
+        self.infeasibility = Counter()    # check_for_infeasibility / solver reasons
+        self.blocked_by = Counter()       # cause -> slots (or wipe-outs) it blocked
+        self.failed_subjects = Counter()
+        self.failed_classes = Counter()
+        self.failed_days = Counter()      # day index -> failed placements blocked that day
+        self.busy_teachers = Counter()    # teacher id -> times all-busy blocked a slot
+
+    @contextmanager
+    def phase(self, name):
+        """Adds the time spent inside the block to phases[name]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add_solver(self, solver):
+        self.attempts += 1
+        self.nodes += solver.nodes
+        self.backtracks += solver.backtracks
+        self.backjumps += solver.backjumps
+
+    def bottlenecks(self, top=3):
+        """Short text naming the most frequent failure causes, subjects, classes and teachers."""
+        parts = []
+        for label, counter in (("causes", self.blocked_by), ("subjects", self.failed_subjects),
+                               ("classes", self.failed_classes), ("busy teachers", self.busy_teachers)):
+            if counter:
+                parts.append(f"{label}: " + ", ".join(f"{key} ({count})" for key, count in counter.most_common(top)))
+        return "; ".join(parts)
+
+    def to_dict(self):
+        def ranked(counter):
+            return [{"key": key, "count": count} for key, count in counter.most_common()]
+
+        return {
+            "attempts": self.attempts,
+            "placements": self.placements,
+            "failures": self.failures,
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "backjumps": self.backjumps,
+            "moves": self.moves,
+            "phases_s": dict(self.phases),
+            "infeasibility": ranked(self.infeasibility),
+            "blocked_by": ranked(self.blocked_by),
+            "failed_subjects": ranked(self.failed_subjects),
+            "failed_classes": ranked(self.failed_classes),
+            "failed_days": ranked(self.failed_days),
+            "busy_teachers": ranked(self.busy_teachers),
+        }
@@ -1,10 +1,13 @@
+from state import DEFAULT_CALENDAR
+
+
 class Teacher:
-    def __init__(self, teacher_id, name, mail, subjects):
+    def __init__(self, teacher_id, name, mail, subjects, calendar=DEFAULT_CALENDAR):
         self.teacher_id = teacher_id
         self.name = name
         self.mail = mail
         self.subjects = subjects
-        self.teacherSchedule = [[None for _ in range(6)] for _ in range(5)]
+        self.teacherSchedule = calendar.empty_grid()
 
     def info_getter(self):
         return {
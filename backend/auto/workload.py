@@ -0,0 +1,172 @@
+"""
+Synthetic institutions for exercising the scheduling engine.
+
+generate_institution() returns (teacher_data, classroom_data) in the same
+shape as teacher.json and sample.json, so the result can be fed to
+init_teachers/init_classroom directly or written out and used with main.py:
+
+    python workload.py --classrooms 40 --teachers 60 --out /tmp/big
+"""
+import argparse
+import json
+import os
+import random
+
+from state import Calendar, DEFAULT_CALENDAR, MAX_PERIODS_PER_DAY
+
+# (subject, relative weight): core subjects show up in more classrooms and
+# take more periods than electives
+SUBJECT_POOL = (
+    ("Mathematics", 10), ("English", 9), ("Physics", 7), ("Chemistry", 7),
+    ("Computer Science", 6), ("Biology", 6), ("History", 5), ("Geography", 4),
+    ("Economics", 4), ("Second Language", 4), ("Physical Education", 3), ("Art", 3),
+    ("Music", 2), ("Civics", 2), ("Statistics", 2), ("Psychology", 1),
+)
+
+
+def _subject_pool(num_subjects):
+    if num_subjects <= len(SUBJECT_POOL):
+        return list(SUBJECT_POOL[:num_subjects])
+    extra = [(f"Elective {i}", 1) for i in range(1, num_subjects - len(SUBJECT_POOL) + 1)]
+    return list(SUBJECT_POOL) + extra
+
+
+def _weighted_sample(rng, items, weights, k):
+    """k distinct items, each pick weighted (without replacement)."""
+    items, weights = list(items), list(weights)
+    picked = []
+    for _ in range(min(k, len(items))):
+        i = rng.choices(range(len(items)), weights=weights)[0]
+        picked.append(items.pop(i))
+        weights.pop(i)
+    return picked
+
+
+def _class_demand(rng, subjects, weights, periods, week_cap):
+    """Spreads `periods` over the subjects: at least 2 each, the rest by weight, at most week_cap each."""
+    periods = min(periods, len(subjects) * week_cap)
+    demand = {s: 0 for s in subjects}
+    for s in subjects:
+        if periods - sum(demand.values()) >= 2:
+            demand[s] = 2
+    left = periods - sum(demand.values())
+    while left > 0:
+        open_subjects = [s for s in subjects if demand[s] < week_cap]
+        s = rng.choices(open_subjects, weights=[weights[x] for x in open_subjects])[0]
+        demand[s] += 1
+        left -= 1
+    return {s: n for s, n in demand.items() if n > 0}
+
+
+def generate_institution(num_classrooms, num_teachers, num_subjects=12, subjects_per_class=7,
+                         tightness=0.9, overlap=0.3, seed=0, calendar=DEFAULT_CALENDAR):
+    """
+    Builds a random but reproducible institution.
+
+    num_subjects        size of the subject catalogue (weighted, core subjects first)
+    subjects_per_class  distinct subjects each classroom takes
+    tightness           fraction of each classroom's open slots that must be filled
+    overlap             chance a teacher is qualified for each extra subject (up to two)
+    seed                same arguments + seed -> same institution
+    calendar            the week's shape (default 5 days x 6 periods)
+
+    Teachers get their main subject in proportion to total demand for it, so
+    the faculty is sized like a real one rather than uniformly at random: each
+    subject first gets enough teachers to cover its periods, as long as there
+    are teachers left, and every demanded subject has at least one.
+    Returns (teacher_data, classroom_data).
+    """
+    rng = random.Random(seed)
+    pool = _subject_pool(num_subjects)
+    names = [s for s, _ in pool]
+    weights = dict(pool)
+    periods = round(tightness * calendar.open_slots)
+    # A subject can't take more periods a week than the per-day cap allows
+    week_cap = sum(min(MAX_PERIODS_PER_DAY, (calendar.open_mask & day_mask).bit_count())
+                   for day_mask in calendar.day_masks)
+
+    classroom_data = {}
+    for cid in range(1, num_classrooms + 1):
+        subjects = _weighted_sample(rng, names, [weights[s] for s in names], subjects_per_class)
+        classroom_data[str(cid)] = {
+            "classroom_id": cid,
+            "classroom": f"Class {cid}",
+            "subject_details": _class_demand(rng, subjects, weights, periods, week_cap),
+        }
+
+    total_demand = {}
+    for data in classroom_data.values():
+        for subject, count in data["subject_details"].items():
+            total_demand[subject] = total_demand.get(subject, 0) + count
+    demanded = sorted(total_demand, key=lambda s: (-total_demand[s], names.index(s)))
+
+    # Main subjects: first enough teachers to cover each subject's demand
+    # (while the faculty lasts), then the rest by highest-averages apportionment
+    qualifications = []
+    staffed = {s: 0 for s in demanded}
+    mains = []
+    for s in demanded:
+        for _ in range(-(-total_demand[s] // calendar.open_slots)):
+            if len(mains) < num_teachers:
+                mains.append(s)
+                staffed[s] += 1
+    while demanded and len(mains) < num_teachers:
+        subject = max(demanded, key=lambda s: total_demand[s] / (staffed[s] + 1))
+        mains.append(subject)
+        staffed[subject] += 1
+    for main in mains:
+        subjects = [main]
+        for _ in range(2):
+            if rng.random() < overlap:
+                others = [s for s in demanded if s not in subjects]
+                if others:
+                    subjects.append(rng.choices(others, weights=[total_demand[s] for s in others])[0])
+        qualifications.append(subjects)
+
+    # Fewer teachers than subjects: the least-loaded teachers pick up the rest
+    for subject in demanded:
+        if qualifications and not any(subject in q for q in qualifications):
+            min(qualifications, key=len).append(subject)
+
+    teacher_data = {}
+    for tid, subjects in enumerate(qualifications, start=1):
+        teacher_data[str(tid)] = {"teacher_id": tid, "name": f"Teacher {tid}", "subject": subjects}
+    return teacher_data, classroom_data
+
+
+def describe(teacher_data, classroom_data, calendar=DEFAULT_CALENDAR):
+    """Headline numbers of an instance: sizes and how loaded the faculty is."""
+    periods = sum(sum(c["subject_details"].values()) for c in classroom_data.values())
+    return {
+        "classrooms": len(classroom_data),
+        "teachers": len(teacher_data),
+        "subjects": len({s for c in classroom_data.values() for s in c["subject_details"]}),
+        "periods": periods,
+        # share of all teacher-slots the demand needs; above 1.0 is infeasible
+        "teacher_load": round(periods / (len(teacher_data) * calendar.open_slots), 3) if teacher_data else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic teacher.json / sample.json pair.")
+    parser.add_argument("--classrooms", type=int, default=20)
+    parser.add_argument("--teachers", type=int, default=30)
+    parser.add_argument("--subjects", type=int, default=12)
+    parser.add_argument("--subjects-per-class", type=int, default=7)
+    parser.add_argument("--tightness", type=float, default=0.9)
+    parser.add_argument("--overlap", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=DEFAULT_CALENDAR.num_days)
+    parser.add_argument("--periods-per-day", type=int, default=DEFAULT_CALENDAR.periods_per_day)
+    parser.add_argument("--out", default=".", help="directory for teacher.json and sample.json")
+    args = parser.parse_args()
+
+    calendar = Calendar(args.days, args.periods_per_day)
+    teachers, classrooms = generate_institution(
+        args.classrooms, args.teachers, args.subjects, args.subjects_per_class,
+        args.tightness, args.overlap, args.seed, calendar)
+    os.makedirs(args.out, exist_ok=True)
+    for filename, data in (("teacher.json", teachers), ("sample.json", classrooms)):
+        with open(os.path.join(args.out, filename), "w") as f:
+            json.dump(data, f, indent=4)
+    print(json.dumps(describe(teachers, classrooms, calendar)))
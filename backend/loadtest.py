@@ -0,0 +1,363 @@
+"""
+Local load test for the timetable API.
+
+Seeds a scratch SQLite database with a synthetic institution (see
+auto/workload.py), then drives concurrent traffic at it and reports
+p50/p95/p99 latency and throughput per endpoint:
+
+    python loadtest.py --classrooms 200 --teachers 300 --requests 5000 --concurrency 8
+    python loadtest.py --serve --output load.json     # through a real HTTP server
+
+By default requests go through the Flask test client (no sockets); --serve
+starts a threaded werkzeug server on a free local port instead. Traffic is a
+weighted mix of what the UI does, adjustable with --mix:
+
+    slot        PATCH /timetable/classrooms/<id>/slot (one qualified teacher)
+    available   GET   /timetable/teachers/available for a subject and slot
+    schedule    GET   /timetable/teachers/<id>/schedule, revalidating with the last ETag half the time
+    classroom   GET   /timetable/classrooms/<id>
+    login       POST  /auth/login
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from flask_bcrypt import generate_password_hash
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+from app import create_app, db
+from app.models import Teacher, Subject, Classroom, SlotAssignment, User, current_calendar
+from app.engine import AUTO_DIR  # noqa: F401  (puts backend/auto on sys.path)
+from bench import git_commit
+from workload import generate_institution
+
+DEFAULT_MIX = {"slot": 20, "available": 30, "schedule": 30, "classroom": 10, "login": 10}
+LOAD_PASSWORD = "load-test-password"
+SEED_CHUNK = 5000
+
+
+# --- SEEDING ---
+
+def seed_database(num_classrooms, num_teachers, num_users, seed):
+    """
+    Fills an empty database with a generated institution: teachers with their
+    subjects, classrooms with a clash-free, mostly full allocation, and users
+    for the login traffic (all sharing one password hash, bcrypt is slow).
+    Returns the fixture the traffic is drawn from.
+    """
+    calendar = current_calendar()
+    teacher_data, classroom_data = generate_institution(num_classrooms, num_teachers, seed=seed, calendar=calendar)
+    rng = random.Random(seed)
+    open_cells = [(d, p) for d in range(calendar.num_days) for p in range(calendar.periods_per_day)
+                  if not calendar.is_blocked(d, p)]
+
+    teachers = sorted(teacher_data.values(), key=lambda t: t["teacher_id"])
+    db.session.execute(db.insert(Teacher), [
+        {"id": t["teacher_id"], "teachername": t["name"], "mailid": f"teacher{t['teacher_id']}@load.test"}
+        for t in teachers])
+    db.session.execute(db.insert(Subject), [
+        {"name": s, "teacher_id": t["teacher_id"]} for t in teachers for s in t["subject"]])
+
+    qualified = {}
+    for t in teachers:
+        for s in t["subject"]:
+            qualified.setdefault(s, []).append(t["teacher_id"])
+
+    # Greedy fill: each cell gets a subject still owed and a qualified teacher free then
+    busy = {}  # (day, period) -> teacher ids
+    slot_rows = []
+    for c in classroom_data.values():
+        owed = dict(c["subject_details"])
+        cells = list(open_cells)
+        rng.shuffle(cells)
+        for cell in cells:
+            taken = busy.setdefault(cell, set())
+            for subject in rng.sample(list(owed), len(owed)):
+                free = [t for t in qualified.get(subject, ()) if t not in taken]
+                if owed[subject] and free:
+                    teacher_id = rng.choice(free)
+                    taken.add(teacher_id)
+                    owed[subject] -= 1
+                    slot_rows.append({"classroom_id": c["classroom_id"], "day": cell[0], "period": cell[1],
+                                      "subject": subject, "teacher_id": teacher_id})
+                    break
+
+    db.session.execute(db.insert(Classroom), [
+        {"classroom_id": c["classroom_id"], "classroom": c["classroom"], "admin_email": "admin@load.test",
+         "subject_details": c["subject_details"], "legacy_allocation": []}
+        for c in classroom_data.values()])
+    for i in range(0, len(slot_rows), SEED_CHUNK):
+        db.session.execute(db.insert(SlotAssignment), slot_rows[i:i + SEED_CHUNK])
+
+    password_hash = generate_password_hash(LOAD_PASSWORD).decode("utf-8")
+    db.session.execute(db.insert(User), [
+        {"name": f"User {i}", "email": f"user{i}@load.test", "password_hash": password_hash}
+        for i in range(1, num_users + 1)])
+    db.session.commit()
+
+    return {
+        "classrooms": {c["classroom_id"]: list(c["subject_details"]) for c in classroom_data.values()},
+        "teacher_ids": [t["teacher_id"] for t in teachers],
+        "qualified": qualified,
+        "users": [f"user{i}@load.test" for i in range(1, num_users + 1)],
+        "slots": len(slot_rows),
+        "cells": open_cells,
+    }
+
+
+# --- DRIVERS ---
+
+class TestClientDriver:
+    """Requests through app.test_client(): measures the app, not the network stack."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers or {})
+        return response.status_code, response.headers.get("ETag")
+
+
+class HttpDriver:
+    """Plain HTTP/1.1 requests to a running server, one connection per request."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status, response.getheader("ETag")
+        finally:
+            conn.close()
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass  # one access-log line per request would dominate the output
+
+
+# --- TRAFFIC ---
+
+class Worker:
+    """One simulated client: draws requests from the mix and records latencies."""
+
+    def __init__(self, driver, fixture, mix, rng):
+        self.driver = driver
+        self.fixture = fixture
+        self.kinds = list(mix)
+        self.weights = [mix[k] for k in self.kinds]
+        self.rng = rng
+        self.etags = {}  # teacher id -> last schedule ETag seen
+        self.samples = []  # (kind, seconds, status)
+
+    def _slot(self):
+        rng = self.rng
+        classroom_id = rng.choice(list(self.fixture["classrooms"]))
+        return (classroom_id, *rng.choice(self.fixture["cells"]))
+
+    def next_request(self, kind):
+        """(method, path, body, headers) for one request of the given kind."""
+        rng, fixture = self.rng, self.fixture
+        if kind == "slot":
+            classroom_id, day, period = self._slot()
+            subject = rng.choice(fixture["classrooms"][classroom_id])
+            teacher_id = rng.choice(fixture["qualified"][subject])
+            body = {"dayIndex": day, "periodIndex": period,
+                    "assignments": [{"subject": subject, "teacher_id": teacher_id}]}
+            return "PATCH", f"/timetable/classrooms/{classroom_id}/slot", body, None
+        if kind == "available":
+            classroom_id, day, period = self._slot()
+            query = urlencode({"classroom_id": classroom_id, "day": day, "period": period,
+                               "subject": rng.choice(fixture["classrooms"][classroom_id])})
+            return "GET", f"/timetable/teachers/available?{query}", None, None
+        if kind == "schedule":
+            teacher_id = rng.choice(fixture["teacher_ids"])
+            headers = None
+            if teacher_id in self.etags and rng.random() < 0.5:
+                headers = {"If-None-Match": self.etags[teacher_id]}
+            return "GET", f"/timetable/teachers/{teacher_id}/schedule", None, headers
+        if kind == "classroom":
+            classroom_id = rng.choice(list(fixture["classrooms"]))
+            return "GET", f"/timetable/classrooms/{classroom_id}", None, None
+        if kind == "login":
+            body = {"email": rng.choice(fixture["users"]), "password": LOAD_PASSWORD}
+            return "POST", "/auth/login", body, None
+        raise ValueError(f"unknown request kind {kind!r}")
+
+    def run(self, count):
+        for _ in range(count):
+            kind = self.rng.choices(self.kinds, weights=self.weights)[0]
+            method, path, body, headers = self.next_request(kind)
+            start = time.perf_counter()
+            try:
+                status, etag = self.driver.request(method, path, body, headers)
+            except Exception:  # connection errors count as failures, the run goes on
+                status, etag = None, None
+            self.samples.append((kind, time.perf_counter() - start, status))
+            if kind == "schedule" and etag:
+                self.etags[int(path.split("/")[3])] = etag
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples, wall_s):
+    """Per-endpoint latency percentiles (ms), throughput and status counts."""
+    by_kind = {}
+    for kind, seconds, status in samples:
+        by_kind.setdefault(kind, []).append((seconds, status))
+    report = {}
+    for kind, rows in sorted(by_kind.items()):
+        latencies = sorted(seconds * 1000 for seconds, _ in rows)
+        statuses = {}
+        for _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        report[kind] = {
+            "requests": len(rows),
+            "throughput_rps": len(rows) / wall_s,
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99),
+            "mean_ms": statistics.fmean(latencies),
+            "errors": sum(1 for _, status in rows if status is None or status >= 500),
+            "statuses": statuses,
+        }
+    return report
+
+
+def print_report(report, wall_s, total):
+    print(f"\n{total} requests in {wall_s:.2f}s ({total / wall_s:.1f} req/s)")
+    print(f"{'endpoint':<11}{'reqs':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}  statuses")
+    for kind, r in report.items():
+        print(f"{kind:<11}{r['requests']:>7}{r['throughput_rps']:>9.1f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{r['errors']:>8}  {r['statuses']}")
+
+
+def parse_mix(text):
+    mix = dict(DEFAULT_MIX)
+    if text:
+        mix = {}
+        for part in text.split(","):
+            kind, _, weight = part.partition("=")
+            if kind not in DEFAULT_MIX:
+                raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}")
+            mix[kind] = float(weight)
+    return {k: w for k, w in mix.items() if w > 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the timetable API against a seeded scratch DB.")
+    parser.add_argument("--classrooms", type=int, default=100)
+    parser.add_argument("--teachers", type=int, default=150)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="total requests over all clients")
+    parser.add_argument("--concurrency", type=int, default=4, help="simultaneous clients (threads)")
+    parser.add_argument("--warmup", type=int, default=50, help="unrecorded requests per client first")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(None),
+                        help="weights, e.g. slot=20,available=30,schedule=30,classroom=10,login=10")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serve", action="store_true", help="go through a local HTTP server")
+    parser.add_argument("--db", help="SQLite file to seed (default: a temporary file, removed afterwards)")
+    parser.add_argument("--output", help="write the results as JSON here")
+    args = parser.parse_args(argv)
+
+    scratch = None
+    db_path = args.db
+    if db_path is None:
+        scratch = tempfile.TemporaryDirectory(prefix="timetable-load-")
+        db_path = os.path.join(scratch.name, "load.db")
+    elif os.path.exists(db_path):
+        parser.error(f"{db_path} already exists; the load test only seeds a fresh database")
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(db_path)}"})
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        fixture = seed_database(args.classrooms, args.teachers, args.users, args.seed)
+        print(f"Seeded {args.classrooms} classrooms, {args.teachers} teachers, {fixture['slots']} slots, "
+              f"{args.users} users in {time.perf_counter() - start:.2f}s", flush=True)
+
+    server = None
+    if args.serve:
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietRequestHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        make_driver = lambda: HttpDriver("127.0.0.1", server.server_port)  # noqa: E731
+    else:
+        make_driver = lambda: TestClientDriver(app)  # noqa: E731
+
+    try:
+        workers = [Worker(make_driver(), fixture, args.mix, random.Random(args.seed + i))
+                   for i in range(args.concurrency)]
+        warmups = [threading.Thread(target=w.run, args=(args.warmup,)) for w in workers]
+        for t in warmups:
+            t.start()
+        for t in warmups:
+            t.join()
+        for w in workers:
+            w.samples.clear()
+
+        per_worker = [args.requests // args.concurrency + (i < args.requests % args.concurrency)
+                      for i in range(args.concurrency)]
+        threads = [threading.Thread(target=w.run, args=(n,)) for w, n in zip(workers, per_worker)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall_s = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    samples = [s for w in workers for s in w.samples]
+    report = summarize(samples, wall_s)
+    print_report(report, wall_s, len(samples))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "python": sys.version.split()[0],
+                    "transport": "http" if args.serve else "test_client",
+                    "classrooms": args.classrooms,
+                    "teachers": args.teachers,
+                    "requests": args.requests,
+                    "concurrency": args.concurrency,
+                    "mix": args.mix,
+                    "seed": args.seed,
+                },
+                "wall_s": wall_s,
+                "throughput_rps": len(samples) / wall_s,
+                "endpoints": report,
+            }, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if scratch is not None:
+        with app.app_context():
+            db.engine.dispose()
+        scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
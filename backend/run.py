@@ -1,9 +1,17 @@
 from app import create_app, db
+from app.migrate import (add_missing_columns, add_missing_indexes, convert_json_columns, drop_obsolete_tables,
+                         migrate_allocations)
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
+    add_missing_columns()
+    convert_json_columns()
+    add_missing_indexes()
+    drop_obsolete_tables()
+    # Move allocations of databases created before SlotAssignment into rows
+    migrate_allocations()
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,63 @@
+"""
+Shared fixtures. Run from backend/: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The engine modules import each other by bare name, as app/engine.py arranges
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, "auto")]
+
+
+@pytest.fixture
+def app_config(request):
+    """Config overrides for the app fixture: the test module's APP_CONFIG, if any."""
+    return getattr(request.module, "APP_CONFIG", None)
+
+
+@pytest.fixture
+def app(app_config, monkeypatch):
+    """An app on the testing profile (in-memory SQLite) with empty tables, plus app_config."""
+    monkeypatch.setenv("TIMETABLE_CONFIG", "testing")
+    from app import create_app, db
+
+    app = create_app(app_config)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def school(client):
+    """Teachers Ada (id 1, Math) and Max (id 2, Physics) and empty classrooms C1 and C2."""
+    response = client.post("/timetable/teachers/import", json=[
+        {"teachername": "Ada", "mailid": "ada@example.com", "subjects": ["Math"]},
+        {"teachername": "Max", "mailid": "max@example.com", "subjects": ["Physics"]},
+    ])
+    assert response.status_code == 201
+    response = client.post("/timetable/add_schedule", json={
+        str(classroom_id): {"classroom_id": classroom_id, "classroom": f"C{classroom_id}",
+                            "admin_email": "admin@example.com", "subject_details": {"Math": 2, "Physics": 2}}
+        for classroom_id in (1, 2)})
+    assert response.status_code == 201
+    return client
+
+
+@pytest.fixture
+def set_slot(client):
+    """PATCHes one slot of a classroom to a single assignment; returns the response."""
+    def set_slot(classroom_id, day, period, teacher_id, subject="Math", **headers):
+        return client.patch(f"/timetable/classrooms/{classroom_id}/slot", headers=headers, json={
+            "dayIndex": day, "periodIndex": period, "assignments": [{"subject": subject, "teacher_id": teacher_id}]})
+
+    return set_slot
@@ -0,0 +1,48 @@
+import pytest
+
+
+def _teacher_ids(response):
+    return [t["id"] for t in response.json["teachers"]]
+
+
+def test_matrix_lists_free_qualified_teachers_per_slot(school, set_slot):
+    assert set_slot(2, 0, 0, 1).status_code == 200
+    assert set_slot(1, 0, 1, 2, "Physics").status_code == 200
+    response = school.get("/timetable/classrooms/1/availability")
+    assert response.status_code == 200
+    assert response.json["subjects"] == ["Math", "Physics"]
+    grid = response.json["grid"]
+    assert len(grid) == 5 and all(len(row) == 6 for row in grid)
+    # Ada teaches classroom 2 at (0, 0); the classroom's own bookings don't count
+    assert grid[0][0] == {"Math": [], "Physics": [2]}
+    assert grid[0][1] == grid[4][5] == {"Math": [1], "Physics": [2]}
+    assert _teacher_ids(response) == [1, 2]
+
+    other = school.get("/timetable/classrooms/2/availability").json["grid"]
+    assert other[0][0] == {"Math": [1], "Physics": [2]}
+    assert other[0][1] == {"Math": [1], "Physics": []}
+
+
+def test_matrix_subject_filters(school):
+    response = school.get("/timetable/classrooms/1/availability?subject=Physics")
+    assert response.json["subjects"] == ["Physics"]
+    assert response.json["grid"][0][0] == {"Physics": [2]}
+    assert _teacher_ids(response) == [2]
+
+    school.post("/timetable/teachers/import", json=[
+        {"teachername": "Eve", "mailid": "eve@example.com", "subjects": ["Art"]}])
+    response = school.get("/timetable/classrooms/1/availability?all_subjects=1")
+    assert response.json["subjects"] == ["Art", "Math", "Physics"]
+    assert response.json["grid"][2][3]["Art"] == [3]
+
+
+@pytest.mark.parametrize("app_config", [{"TIMETABLE_CALENDAR": {"days": 2, "periods_per_day": 3, "blocked": [[1, 2]]}}])
+def test_matrix_follows_the_calendar(school):
+    grid = school.get("/timetable/classrooms/1/availability").json["grid"]
+    assert len(grid) == 2 and all(len(row) == 3 for row in grid)
+    assert grid[1][2] is None
+    assert grid[1][1] == {"Math": [1], "Physics": [2]}
+
+
+def test_matrix_unknown_classroom(client):
+    assert client.get("/timetable/classrooms/9/availability").status_code == 404
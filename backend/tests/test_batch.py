@@ -0,0 +1,65 @@
+def _math(teacher_id=1):
+    return [{"subject": "Math", "teacher_id": teacher_id}]
+
+
+def test_batch_applies_operations_in_order(school):
+    response = school.post("/timetable/slots/batch", json={"operations": [
+        {"op": "set", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0, "assignments": _math()},
+        {"op": "set", "classroom_id": 2, "dayIndex": 0, "periodIndex": 0,
+         "assignments": [{"subject": "Physics", "teacher_id": 2}]},
+        {"op": "copy", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0, "to": {"dayIndex": 1, "periodIndex": 0}},
+        {"op": "swap", "classroom_id": 2, "dayIndex": 0, "periodIndex": 0, "to": {"dayIndex": 2, "periodIndex": 3}},
+    ]})
+    assert response.status_code == 200
+    # Classroom 2's (0, 0) ends as empty as it started, so it is not a change
+    assert [(c["classroom_id"], c["dayIndex"], c["periodIndex"]) for c in response.json["changes"]] == [
+        (1, 0, 0), (1, 1, 0), (2, 2, 3)]
+    first = school.get("/timetable/classrooms/1").json["allocation"]
+    second = school.get("/timetable/classrooms/2").json["allocation"]
+    assert first[0][0] == first[1][0] == _math()
+    assert second[0][0] is None
+    assert second[2][3] == [{"subject": "Physics", "teacher_id": 2}]
+
+
+def test_batch_rejects_teacher_clash_as_a_whole(school, set_slot):
+    assert set_slot(2, 0, 0, 1).status_code == 200
+    response = school.post("/timetable/slots/batch", json={"operations": [
+        {"op": "add", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0, "assignment": _math()[0]},
+        {"op": "set", "classroom_id": 1, "dayIndex": 0, "periodIndex": 1,
+         "assignments": [{"subject": "Physics", "teacher_id": 2}]},
+    ]})
+    assert response.status_code == 409
+    assert response.json["clashes"] == [{"classroom_id": 1, "dayIndex": 0, "periodIndex": 0, "teacher_id": 1,
+                                         "other_classroom_id": 2}]
+    assert school.get("/timetable/classrooms/1").json["allocation"][0][1] is None
+
+
+def test_batch_rejects_clash_within_itself(school):
+    response = school.post("/timetable/slots/batch", json={"operations": [
+        {"op": "set", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0, "assignments": _math()},
+        {"op": "set", "classroom_id": 2, "dayIndex": 0, "periodIndex": 0, "assignments": _math()},
+    ]})
+    assert response.status_code == 409
+
+
+def test_batch_rejects_invalid_operation_and_unknown_classroom(school):
+    response = school.post("/timetable/slots/batch", json={"operations": [
+        {"op": "set", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0, "assignments": _math()},
+        {"op": "move", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0},
+    ]})
+    assert response.status_code == 400 and response.json["error"].startswith("operations[1]")
+    response = school.post("/timetable/slots/batch", json={"operations": [
+        {"op": "set", "classroom_id": 9, "dayIndex": 0, "periodIndex": 0, "assignments": _math()}]})
+    assert response.status_code == 404
+    assert school.get("/timetable/classrooms/1").json["allocation"][0][0] is None
+
+
+def test_batch_checks_base_version_of_classroom_it_does_not_change(school, set_slot):
+    assert set_slot(2, 0, 0, 2, "Physics").status_code == 200
+    response = school.post("/timetable/slots/batch", json={
+        "operations": [{"op": "set", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0, "assignments": _math()}],
+        "baseVersions": {"1": 0, "2": 0},
+    })
+    assert response.status_code == 412
+    assert [(c["classroom_id"], c["version"]) for c in response.json["conflicts"]] == [(2, 1)]
+    assert school.get("/timetable/classrooms/1").json["allocation"][0][0] is None
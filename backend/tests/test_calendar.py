@@ -0,0 +1,23 @@
+import pytest
+
+# A 4-day week of 5 periods with the last period of the last day blocked
+APP_CONFIG = {"TIMETABLE_CALENDAR": {"days": 4, "periods_per_day": 5, "blocked": [[3, 4]]}}
+
+
+def test_calendar_shapes_every_grid(school):
+    assert school.get("/timetable/calendar").json == {"days": 4, "periods_per_day": 5, "blocked": [[3, 4]]}
+    allocation = school.get("/timetable/classrooms/1").json["allocation"]
+    assert [len(row) for row in allocation] == [5, 5, 5, 5]
+
+
+@pytest.mark.parametrize("day, period, error", [
+    (4, 0, "dayIndex or periodIndex out of range"),
+    (0, 5, "dayIndex or periodIndex out of range"),
+    (3, 4, "slot is blocked in the timetable calendar"),
+])
+def test_slot_edits_outside_the_calendar_are_rejected(school, set_slot, day, period, error):
+    response = set_slot(1, day, period, 1)
+    assert response.status_code == 400 and response.json["error"] == error
+    response = school.post("/timetable/classrooms/1/slot/assignments/remove",
+                           json={"dayIndex": day, "periodIndex": period})
+    assert response.status_code == 400 and response.json["error"] == error
@@ -0,0 +1,19 @@
+import pytest
+
+from app import create_app
+
+
+def test_jwt_secret_follows_final_secret_key(monkeypatch):
+    monkeypatch.setenv("TIMETABLE_CONFIG", "testing")
+    app = create_app({"SECRET_KEY": "override"})
+    assert app.config["JWT_SECRET_KEY"] == "override"
+    app = create_app({"SECRET_KEY": "override", "JWT_SECRET_KEY": "separate"})
+    assert app.config["JWT_SECRET_KEY"] == "separate"
+
+
+def test_production_requires_a_real_secret(monkeypatch):
+    monkeypatch.setenv("TIMETABLE_CONFIG", "production")
+    with pytest.raises(ValueError, match="SECRET_KEY"):
+        create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+    app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "SECRET_KEY": "a-real-secret"})
+    assert app.config["JWT_SECRET_KEY"] == "a-real-secret"
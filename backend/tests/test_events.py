@@ -0,0 +1,85 @@
+import json
+
+from app import events
+from app.events import classroom_channel, teacher_channel
+
+
+def _parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+    return fields["event"], json.loads(fields["data"])
+
+
+def _drain(subscription):
+    items = []
+    while not subscription.queue.empty():
+        items.append(subscription.queue.get_nowait())
+    return items
+
+
+def test_classroom_stream_sends_committed_changes(school, set_slot):
+    response = school.get("/timetable/classrooms/1/events", buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+    assert _parse(next(chunks)) == ("cells", {"classroom_id": 1, "version": 0, "changes": []})
+
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    name, data = _parse(next(chunks))
+    assert name == "cells" and data["version"] == 1
+    assert data["changes"] == [{"dayIndex": 0, "periodIndex": 0,
+                                "assignments": [{"subject": "Math", "teacher_id": 1}]}]
+    response.close()
+
+
+def test_teacher_event_follows_cell_change(app, school, set_slot):
+    with app.app_context():
+        subscription = events.subscribe([teacher_channel(1)])
+    assert set_slot(2, 1, 2, 1).status_code == 200
+    [(name, version, data)] = _drain(subscription)
+    assert name == "cells" and data["version"] == version
+    assert data["changes"] == [{"dayIndex": 1, "periodIndex": 2,
+                                "slot": {"classroomId": 2, "classroomName": "C2", "subject": "Math"}}]
+
+
+def test_rejected_write_publishes_nothing(app, school, set_slot):
+    assert set_slot(2, 0, 0, 1).status_code == 200
+    with app.app_context():
+        subscription = events.subscribe([classroom_channel(1)])
+    response = school.post("/timetable/slots/batch", json={"operations": [
+        {"op": "set", "classroom_id": 1, "dayIndex": 0, "periodIndex": 0,
+         "assignments": [{"subject": "Math", "teacher_id": 1}]}]})
+    assert response.status_code == 409
+    assert _drain(subscription) == []
+
+
+def test_slow_subscriber_gets_resync(app, school, set_slot):
+    app.config["EVENTS_QUEUE_SIZE"] = 2
+    with app.app_context():
+        subscription = events.subscribe([classroom_channel(1)])
+    for period in range(3):
+        assert set_slot(1, 0, period, 1).status_code == 200
+    assert subscription.queue.get_nowait()[0] == "resync"
+    assert subscription.queue.get_nowait() is None
+    with app.app_context():
+        assert not events.has_subscribers(classroom_channel(1))
+
+
+def test_subscribers_are_per_app(app, school, set_slot):
+    from app import create_app
+
+    other = create_app()
+    with other.app_context():
+        subscription = events.subscribe([classroom_channel(1)])
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    assert _drain(subscription) == []
+
+
+def test_classroom_rename_resends_teacher_schedule(app, school, set_slot):
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    with app.app_context():
+        subscription = events.subscribe([teacher_channel(1)])
+    response = school.post("/timetable/add_schedule", json={"1": {"classroom_id": 1, "classroom": "C1 renamed"}})
+    assert response.status_code == 201
+    [(name, version, data)] = _drain(subscription)
+    assert name == "schedule" and data["version"] == version
+    assert data["grid"][0][0] == {"classroomId": 1, "classroomName": "C1 renamed", "subject": "Math"}
+    assert school.get("/timetable/teachers/1/schedule").headers["ETag"] == f'"teacher-1-v{version}"'
@@ -0,0 +1,59 @@
+import json
+
+from bench import build_state, load_scenario
+from feasibility import check_feasibility
+from main import main
+from state import Calendar
+
+
+def _teachers(*subject_lists):
+    return {str(t): {"teacher_id": t, "name": f"T{t}", "subject": subjects}
+            for t, subjects in enumerate(subject_lists, start=1)}
+
+
+def _classrooms(*demands):
+    return {str(c): {"classroom_id": c, "classroom": f"C{c}", "subject_details": demand}
+            for c, demand in enumerate(demands, start=1)}
+
+
+def test_feasible_input_has_no_problems():
+    assert check_feasibility(build_state(*load_scenario("small"))) == []
+
+
+def test_reports_flow_bound_shortfall():
+    # Each class fits on its own, but teacher 1 alone must give A 5 periods in a 4-slot week
+    state = build_state(_teachers(["A", "B"], ["B"]), _classrooms({"A": 3}, {"A": 2, "B": 1}), Calendar(2, 2))
+    [problem] = check_feasibility(state)
+    assert problem.code == "TEACHER_CAPACITY_EXCEEDED"
+    assert problem.message == ("A need 5 periods in total, but the only teachers qualified for them (ids 1) "
+                               "have 4 free slots; at most 5 of all 6 periods can be staffed")
+
+
+def test_flow_bound_counts_slots_booked_elsewhere():
+    teacher_data, classroom_data = _teachers(["A"]), _classrooms({"A": 3})
+    state = build_state(teacher_data, classroom_data, Calendar(2, 2))
+    assert check_feasibility(state) == []
+    state.block_teacher(0, 0)
+    state.block_teacher(0, 3)
+    [problem] = check_feasibility(state)
+    assert problem.code == "TEACHER_CAPACITY_EXCEEDED" and "have 2 free slots" in problem.message
+
+
+def test_reports_per_class_problems():
+    state = build_state(_teachers(["A"]), _classrooms({"A": 5}, {"A": 2, "Art": 3}), Calendar(2, 2))
+    codes = {problem.code for problem in check_feasibility(state)}
+    assert codes == {"MAX_PERIODS_EXCEEDED_FOR_A", "SLOT_SATURATION", "NO_TEACHER_FOR_Art"}
+
+
+def test_check_flag_stops_after_the_check(tmp_path, capsys):
+    teachers_file, classrooms_file = tmp_path / "teachers.json", tmp_path / "classrooms.json"
+    teachers_file.write_text(json.dumps(_teachers(["A"])))
+    classrooms_file.write_text(json.dumps(_classrooms({"A": 2}, {"A": 31})))
+    main(teachers_file=str(teachers_file), classrooms_file=str(classrooms_file), check_only=True)
+    out = capsys.readouterr().out
+    assert "FATAL ERROR: the input cannot be scheduled" in out
+    assert "SLOT_SATURATION" in out and "TEACHER_CAPACITY_EXCEEDED" in out
+
+    classrooms_file.write_text(json.dumps(_classrooms({"A": 2})))
+    main(teachers_file=str(teachers_file), classrooms_file=str(classrooms_file), check_only=True)
+    assert "No static infeasibility found" in capsys.readouterr().out
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    # Jobs run on worker threads, and every thread would see its own in-memory SQLite database
+    return {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'jobs.db'}"}
+
+
+def _wait(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/timetable/jobs/{job_id}").json
+        if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_auto_generate_runs_as_a_job(school):
+    response = school.post("/timetable/classrooms/1/auto_generate", json={"mode": "solver"})
+    assert response.status_code == 202 and response.json["status"] == "queued"
+    job = _wait(school, response.json["job_id"])
+    assert job["status"] == "succeeded", job["error"]
+    assert job["kind"] == "auto_generate" and job["classroom_id"] == 1
+    assert "result" not in job
+
+    result = school.get(f"/timetable/jobs/{job['id']}/result")
+    assert result.status_code == 200
+    allocation = school.get("/timetable/classrooms/1").json["allocation"]
+    assert result.json["allocation"] == allocation
+    placed = [cell[0]["subject"] for row in allocation for cell in row if cell]
+    assert sorted(placed) == ["Math", "Math", "Physics", "Physics"]
+
+
+def test_failed_job_reports_its_error(app, school):
+    app.config["SOLVER_MAX_NODES"] = 1
+    response = school.post("/timetable/generate", json={"mode": "solver"})
+    job = _wait(school, response.json["job_id"])
+    assert job["status"] == "failed" and job["error"]
+    result = school.get(f"/timetable/jobs/{job['id']}/result")
+    assert result.status_code == 422 and result.json["error"] == job["error"]
+    assert school.get("/timetable/classrooms/1").json["allocation"][0][0] is None
+
+
+def test_job_runs_in_the_app_that_submitted_it(app, school):
+    from app import create_app, db
+
+    other = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://"})  # must not take over the queue's jobs
+    with other.app_context():
+        db.create_all()
+    response = school.post("/timetable/classrooms/1/auto_generate", json={"mode": "solver"})
+    assert _wait(school, response.json["job_id"])["status"] == "succeeded"
+
+
+def _book_first_slot_elsewhere(allocation, classroom_id):
+    """Books the teacher of the first filled cell of `allocation` in `classroom_id` at the same time."""
+    from app import db
+    from app.models import SlotAssignment
+
+    day, period, item = next((d, p, cell[0]) for d, row in enumerate(allocation) for p, cell in enumerate(row) if cell)
+    db.session.add(SlotAssignment(classroom_id=classroom_id, day=day, period=period, subject=item["subject"],
+                                  teacher_id=item["teacher_id"]))
+    db.session.commit()
+
+
+def test_auto_generate_fails_on_clash_booked_meanwhile(school, monkeypatch):
+    from app import routes
+
+    def generate_then_clash(classroom_id, **options):
+        allocation = generate_classroom(classroom_id, **options)
+        _book_first_slot_elsewhere(allocation, 2)
+        return allocation
+
+    generate_classroom = routes.generate_classroom
+    monkeypatch.setattr(routes, "generate_classroom", generate_then_clash)
+    response = school.post("/timetable/classrooms/1/auto_generate", json={"mode": "solver"})
+    job = _wait(school, response.json["job_id"])
+    assert job["status"] == "failed" and job["error"].startswith("Teacher clash")
+    assert school.get("/timetable/classrooms/1").json["allocation"] == [[None] * 6 for _ in range(5)]
+
+
+def test_save_allocations_rechecks_bookings(app, school):
+    from app import db
+    from app.engine import GenerationError, _generate, allocation_grid, save_allocations
+
+    with app.app_context():
+        state = _generate([1], "solver", None, None, 0, None)
+        _book_first_slot_elsewhere(allocation_grid(state, 0), 2)
+        with pytest.raises(GenerationError, match="booked in classroom 2"):
+            save_allocations(state)
+        db.session.rollback()
+    assert school.get("/timetable/classrooms/1").json["version"] == 0
+
+
+def test_unknown_job(client):
+    assert client.get("/timetable/jobs/nope").status_code == 404
+    assert client.get("/timetable/jobs/nope/result").status_code == 404
@@ -0,0 +1,18 @@
+APP_CONFIG = {"METRICS_ENABLED": True}
+
+
+def test_metrics_count_requests_by_endpoint(client):
+    assert client.get("/timetable/calendar").status_code == 200
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert 'timetable_requests_total{method="GET",endpoint="/timetable/calendar",status="200"}' in text
+    assert 'endpoint="/metrics"' not in text
+
+
+def test_metrics_settings_are_per_app(client):
+    from app import create_app
+
+    create_app({"METRICS_ENABLED": True, "METRICS_PATH": "/stats"})
+    client.get("/metrics")
+    assert 'endpoint="/metrics"' not in client.get("/metrics").get_data(as_text=True)
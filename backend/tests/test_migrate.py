@@ -0,0 +1,12 @@
+from app import db
+from app.migrate import drop_obsolete_tables
+
+
+def test_drop_obsolete_tables_removes_teacher_slot(app):
+    with app.app_context():
+        db.session.execute(db.text("CREATE TABLE teacher_slot (id INTEGER PRIMARY KEY, teacher_id INTEGER)"))
+        db.session.commit()
+        drop_obsolete_tables()
+        assert not db.inspect(db.engine).has_table("teacher_slot")
+        drop_obsolete_tables()  # nothing left to drop
+        assert db.inspect(db.engine).has_table("slot_assignment")
@@ -0,0 +1,29 @@
+from app.occupancy import busy_by_slot, busy_teacher_ids, is_teacher_busy
+
+
+def test_busy_lookups_follow_bookings(app, school, set_slot):
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    assert set_slot(2, 0, 0, 2, "Physics").status_code == 200
+    assert set_slot(2, 3, 4, 1).status_code == 200
+    with app.app_context():
+        assert is_teacher_busy(1, 0, 0)
+        assert not is_teacher_busy(1, 0, 0, exclude_classroom_id=1)
+        assert not is_teacher_busy(2, 3, 4)
+        assert busy_teacher_ids(0, 0) == {1, 2}
+        assert busy_teacher_ids(0, 0, exclude_classroom_id=2) == {1}
+        assert busy_by_slot() == {(0, 0): {1, 2}, (3, 4): {1}}
+        assert busy_by_slot(exclude_classroom_id=2) == {(0, 0): {1}}
+
+
+def test_availability_endpoints_skip_other_classrooms_bookings(school, set_slot):
+    assert set_slot(2, 1, 1, 1).status_code == 200
+    available = school.get("/timetable/teachers/1/availability?day=1&period=1&classroom_id=1").json
+    assert available == {"available": False}
+    assert school.get("/timetable/teachers/1/availability?day=1&period=1&classroom_id=2").json["available"]
+    assert school.get("/timetable/teachers/1/availability?day=1&period=1&subject=Art").json == {
+        "available": False, "reason": "Subject not taught by teacher"}
+
+    free = school.get("/timetable/teachers/available?classroom_id=1&day=1&period=1").json["teachers"]
+    assert [t["id"] for t in free] == [2]
+    free = school.get("/timetable/teachers/available?classroom_id=2&day=1&period=1&subject=Math").json["teachers"]
+    assert [t["id"] for t in free] == [1]
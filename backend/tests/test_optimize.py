@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from bench import build_state, load_scenario
+from optimize import optimize, score, Objective, DEFAULT_OBJECTIVE
+from solver import Solver, SOLVED
+from state import EMPTY
+from test_solver import assert_valid
+
+
+def _solved(scenario, blocked=()):
+    state = build_state(*load_scenario(scenario))
+    for t, slot in blocked:
+        state.block_teacher(t, slot)
+    assert Solver(state).solve()[0] == SOLVED
+    return state
+
+
+def _placements(state):
+    return {cell: (s, state.grid_teacher[cell]) for cell, s in enumerate(state.grid_subject) if s != EMPTY}
+
+
+@pytest.mark.parametrize("scenario", ["small", "week6x8"])
+def test_optimize_lowers_cost_and_keeps_hard_constraints(scenario):
+    # Teacher 0 is booked elsewhere for the first periods of the week
+    blocked = [(0, slot) for slot in range(4)]
+    state = _solved(scenario, blocked)
+    objective = Objective(heavy=state.subjects[:2])
+    result = optimize(state, objective, time_budget=None, max_moves=20_000, rng=random.Random(0))
+    assert result.after["total"] < result.before["total"]
+    assert result.after == score(state, objective)
+    assert_valid(state)
+    placements = _placements(state)
+    assert not [cell for cell, (_, t) in placements.items() if (t, cell % state.num_slots) in blocked]
+
+
+def test_optimize_is_reproducible_from_its_rng():
+    first, second = _solved("small"), _solved("small")
+    optimize(first, max_moves=5_000, time_budget=None, rng=random.Random(7))
+    optimize(second, max_moves=5_000, time_budget=None, rng=random.Random(7))
+    assert _placements(first) == _placements(second)
+
+
+def test_optimize_never_moves_pinned_cells():
+    state = _solved("small")
+    placements = _placements(state)
+    pinned = sorted(placements)[::3]
+    state.pinned = [(cell // state.num_slots, placements[cell][0], placements[cell][1], cell % state.num_slots)
+                    for cell in pinned]
+    optimize(state, DEFAULT_OBJECTIVE, time_budget=None, max_moves=20_000, rng=random.Random(1))
+    after = _placements(state)
+    assert all(after.get(cell) == placements[cell] for cell in pinned)
+    assert_valid(state)
+
+
+def test_objective_rejects_bad_settings():
+    with pytest.raises(ValueError):
+        Objective.from_dict({"weights": {"lunch": 1}})
+    with pytest.raises(ValueError):
+        Objective.from_dict({"max_consecutive": 0})
+    assert Objective.from_dict({"weights": {"late_heavy": 0}}).weights["late_heavy"] == 0
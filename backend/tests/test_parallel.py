@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from bench import build_state, load_scenario
+from main import run_attempt
+from parallel import run_parallel
+from test_solver import assert_valid
+
+
+def _first_sequential_success(state, base_seed, attempts, joint):
+    for seed in range(base_seed, base_seed + attempts):
+        if run_attempt(state, random.Random(seed), joint=joint):
+            return seed
+    return None
+
+
+@pytest.mark.parametrize("joint", [False, True])
+def test_parallel_returns_the_sequential_winner(joint):
+    # On "medium" the first random-mode attempt fails, so the winner is not simply the first seed
+    teacher_data, classroom_data, calendar = load_scenario("medium")
+    result = run_parallel(teacher_data, classroom_data, 0, 64, workers=2, joint=joint, calendar=calendar)
+    assert result is not None
+    seed, grid_subject, grid_teacher = result
+    assert seed == _first_sequential_success(build_state(teacher_data, classroom_data, calendar), 0, 64, joint)
+
+    state = build_state(teacher_data, classroom_data, calendar)
+    state.restore(grid_subject, grid_teacher)
+    assert_valid(state)
+
+
+def test_parallel_reports_no_success():
+    teacher_data, classroom_data, calendar = load_scenario("fixture")
+    # Nobody teaches the extra subject, so every attempt fails
+    classroom_data = {key: dict(value, subject_details={**value["subject_details"], "Astronomy": 1})
+                      for key, value in classroom_data.items()}
+    assert run_parallel(teacher_data, classroom_data, 0, 4, workers=2, calendar=calendar) is None
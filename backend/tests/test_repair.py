@@ -0,0 +1,72 @@
+from bench import build_state, load_scenario
+from repair import repair, diff, UNKNOWN_TEACHER, OVER_DEMAND
+from solver import Solver, SOLVED, INFEASIBLE
+from state import EMPTY
+from test_solver import assert_valid
+
+
+def _allocations(state):
+    """The state's timetable as API allocation grids, one per class."""
+    calendar = state.calendar
+    allocations = []
+    for c in range(len(state.classrooms)):
+        grid = calendar.empty_grid()
+        for slot in range(state.num_slots):
+            s = state.grid_subject[c * state.num_slots + slot]
+            if s != EMPTY:
+                day, period = divmod(slot, calendar.periods_per_day)
+                teacher_id = state.teachers[state.grid_teacher[c * state.num_slots + slot]].teacher_id
+                grid[day][period] = [{"subject": state.subjects[s], "teacher_id": int(teacher_id)}]
+        allocations.append(grid)
+    return allocations
+
+
+def _solved_small():
+    teacher_data, classroom_data, calendar = load_scenario("small")
+    state = build_state(teacher_data, classroom_data, calendar)
+    assert Solver(state).solve()[0] == SOLVED
+    return teacher_data, classroom_data, calendar, _allocations(state)
+
+
+def test_repair_keeps_valid_pins_and_only_moves_freed_slots():
+    teacher_data, classroom_data, calendar, allocations = _solved_small()
+    del teacher_data["1"]  # on leave
+    state = build_state(teacher_data, classroom_data, calendar)
+    result = repair(state, allocations)
+    assert (result.status, result.stage) == (SOLVED, "fill")
+    assert result.dropped and all(d["teacher_id"] == 1 and d["reason"] == UNKNOWN_TEACHER for d in result.dropped)
+    assert_valid(state)
+
+    changes = diff(state, allocations)
+    # Only teacher 1's periods moved: each change frees one of them or fills a free cell
+    assert all(change["before"] is None or change["before"]["teacher_id"] == 1 for change in changes)
+    assert sum(change["before"] is not None for change in changes) == len(result.dropped)
+    assert all(change["after"] is None or change["after"]["teacher_id"] != 1 for change in changes)
+
+
+def test_repair_drops_periods_no_longer_needed():
+    teacher_data, classroom_data, calendar, allocations = _solved_small()
+    details = classroom_data["1"]["subject_details"]
+    subject = next(name for name, periods in details.items() if periods >= 2)
+    classroom_data["1"] = dict(classroom_data["1"], subject_details={**details, subject: details[subject] - 1})
+    state = build_state(teacher_data, classroom_data, calendar)
+    result = repair(state, allocations)
+    assert (result.status, result.stage) == (SOLVED, "fill")
+    assert [(d["subject"], d["reason"]) for d in result.dropped] == [(subject, OVER_DEMAND)]
+    [change] = diff(state, allocations)
+    assert change["classroom_id"] == 1 and change["before"]["subject"] == subject and change["after"] is None
+
+
+def test_repair_of_unchanged_input_changes_nothing():
+    teacher_data, classroom_data, calendar, allocations = _solved_small()
+    state = build_state(teacher_data, classroom_data, calendar)
+    result = repair(state, allocations)
+    assert (result.status, result.stage, result.dropped) == (SOLVED, "fill", [])
+    assert diff(state, allocations) == []
+
+
+def test_repair_reports_infeasible_input():
+    teacher_data, classroom_data, calendar, allocations = _solved_small()
+    del teacher_data["2"]  # the only English teacher
+    result = repair(build_state(teacher_data, classroom_data, calendar), allocations)
+    assert (result.status, result.stage) == (INFEASIBLE, "all")
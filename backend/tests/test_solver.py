@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from bench import build_state, load_scenario
+from solver import Solver, SOLVED, INFEASIBLE, NODE_LIMIT
+from state import Calendar, EMPTY, MAX_PERIODS_PER_DAY
+
+
+def random_instance(rng):
+    """A tiny (teacher_data, classroom_data, calendar) an exhaustive search can settle."""
+    calendar = Calendar(2, rng.choice([2, 3]), [(0, 0)] if rng.random() < 0.3 else [])
+    subjects = ["A", "B"]
+    teacher_data = {str(t): {"teacher_id": t, "name": f"T{t}", "subject": rng.sample(subjects, rng.choice([1, 2]))}
+                    for t in range(1, rng.choice([1, 2, 3]) + 1)}
+    classroom_data = {str(c): {"classroom_id": c, "classroom": f"C{c}",
+                               "subject_details": {s: rng.randint(1, 3) for s in rng.sample(subjects, rng.choice([1, 2]))}}
+                      for c in range(1, rng.choice([1, 2]) + 1)}
+    return teacher_data, classroom_data, calendar
+
+
+def brute_force(teacher_data, classroom_data, calendar):
+    """True if some timetable meets every hard constraint, by trying every cell assignment."""
+    teachers = [(data["teacher_id"], set(data["subject"])) for data in teacher_data.values()]
+    needed = [dict(data["subject_details"]) for data in classroom_data.values()]
+    cells = [(c, slot) for c in range(len(needed)) for slot in range(calendar.num_slots)
+             if not (calendar.blocked_mask >> slot) & 1]
+    busy, per_day = set(), {}
+
+    def search(i):
+        if not any(n for demand in needed for n in demand.values()):
+            return True
+        if i == len(cells):
+            return False
+        c, slot = cells[i]
+        if sum(needed[c].values()) > sum(1 for other, _ in cells[i:] if other == c):
+            return False
+        if search(i + 1):  # leave the cell free
+            return True
+        day = slot // calendar.periods_per_day
+        for subject, n in needed[c].items():
+            if not n or per_day.get((c, subject, day), 0) >= MAX_PERIODS_PER_DAY:
+                continue
+            for teacher_id, qualified in teachers:
+                if subject not in qualified or (teacher_id, slot) in busy:
+                    continue
+                busy.add((teacher_id, slot))
+                needed[c][subject] -= 1
+                per_day[(c, subject, day)] = per_day.get((c, subject, day), 0) + 1
+                found = search(i + 1)
+                busy.discard((teacher_id, slot))
+                needed[c][subject] += 1
+                per_day[(c, subject, day)] -= 1
+                if found:
+                    return True
+        return False
+
+    return search(0)
+
+
+def assert_valid(state):
+    """Every demanded period placed once, by a qualified free teacher, within the day cap."""
+    num_slots = state.num_slots
+    n_subjects = len(state.subjects)
+    booked, per_day, placed = set(), {}, {}
+    for c in range(len(state.classrooms)):
+        for slot in range(num_slots):
+            s = state.grid_subject[c * num_slots + slot]
+            if s == EMPTY:
+                continue
+            t = state.grid_teacher[c * num_slots + slot]
+            assert not (state.calendar.blocked_mask >> slot) & 1
+            assert (state.qualified[s] >> t) & 1
+            assert (t, slot) not in booked
+            booked.add((t, slot))
+            key = (c, s, slot // state.periods_per_day)
+            per_day[key] = per_day.get(key, 0) + 1
+            assert per_day[key] <= MAX_PERIODS_PER_DAY
+            placed[(c, s)] = placed.get((c, s), 0) + 1
+    for c in range(len(state.classrooms)):
+        for s in range(n_subjects):
+            assert placed.get((c, s), 0) == state.demand[c * n_subjects + s]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_solver_agrees_with_brute_force(seed):
+    teacher_data, classroom_data, calendar = random_instance(random.Random(seed))
+    state = build_state(teacher_data, classroom_data, calendar)
+    status, detail = Solver(state, max_nodes=None).solve()
+    assert status in (SOLVED, INFEASIBLE)
+    assert (status == SOLVED) == brute_force(teacher_data, classroom_data, calendar), detail
+    if status == SOLVED:
+        assert_valid(state)
+
+
+@pytest.mark.parametrize("scenario", ["fixture", "small", "shared", "week6x8"])
+def test_solver_solves_bench_scenarios(scenario):
+    state = build_state(*load_scenario(scenario))
+    solver = Solver(state)
+    status, _ = solver.solve()
+    assert status == SOLVED
+    assert_valid(state)
+
+
+def test_solver_stops_at_node_limit():
+    state = build_state(*load_scenario("small"))
+    status, detail = Solver(state, max_nodes=5).solve()
+    assert status == NODE_LIMIT
+    assert detail.startswith("gave up after 5 decisions")
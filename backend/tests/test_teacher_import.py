@@ -0,0 +1,50 @@
+def _teachers(client):
+    return {t["mailid"]: t for t in client.get("/timetable/teachers").json["teachers"]}
+
+
+def test_import_upserts_by_mailid(client):
+    records = [{"teachername": "Ada", "mailid": "ada@example.com", "subjects": ["Math"]},
+               {"teachername": "Max", "mailid": "max@example.com", "subjects": ["Physics"]}]
+    first = client.post("/timetable/teachers/import", json=records)
+    assert first.status_code == 201
+    assert (first.json["created"], first.json["updated"], first.json["unchanged"]) == (2, 0, 0)
+
+    again = client.post("/timetable/teachers/import", json=records)
+    assert again.status_code == 200
+    assert (again.json["created"], again.json["updated"], again.json["unchanged"]) == (0, 0, 2)
+
+    changed = client.post("/timetable/teachers/import", json=[
+        {"teachername": "Ada L.", "mailid": "ada@example.com", "subjects": ["Math", "Physics"]},
+        {"teachername": "Eve", "mailid": "eve@example.com", "subjects": ["Art"]},
+        {"teachername": "", "mailid": "nobody@example.com"},
+    ])
+    assert (changed.json["created"], changed.json["updated"], changed.json["unchanged"]) == (1, 1, 0)
+    assert changed.json["errors"] == [{"row": 3, "error": "teachername is required"}]
+
+    teachers = _teachers(client)
+    assert set(teachers) == {"ada@example.com", "max@example.com", "eve@example.com"}
+    assert teachers["ada@example.com"]["teachername"] == "Ada L."
+    assert sorted(teachers["ada@example.com"]["subjects"]) == ["Math", "Physics"]
+
+
+def test_import_reads_csv(client):
+    body = "teachername,mailid,subjects\nAda,ada@example.com,Math;Physics\nMax,max@example.com,Art|Music\n"
+    response = client.post("/timetable/teachers/import", data=body, content_type="text/csv")
+    assert response.status_code == 201
+    assert response.json["created"] == 2
+    assert sorted(_teachers(client)["max@example.com"]["subjects"]) == ["Art", "Music"]
+
+
+def test_import_ignores_subject_order(app, client):
+    from app import db
+    from app.models import Subject
+
+    record = {"teachername": "Ada", "mailid": "ada@example.com", "subjects": ["Math", "Physics"]}
+    assert client.post("/timetable/teachers/import", json=[record]).status_code == 201
+    with app.app_context():
+        subject_ids = sorted(subject_id for (subject_id,) in db.session.query(Subject.id))
+
+    response = client.post("/timetable/teachers/import", json=[dict(record, subjects=["Physics", "Math"])])
+    assert (response.json["updated"], response.json["unchanged"]) == (0, 1)
+    with app.app_context():
+        assert sorted(subject_id for (subject_id,) in db.session.query(Subject.id)) == subject_ids
@@ -0,0 +1,57 @@
+def test_schedule_is_derived_from_classroom_slots(school, set_slot):
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    assert set_slot(2, 1, 2, 1).status_code == 200
+    grid = school.get("/timetable/teachers/1/schedule").json["grid"]
+    assert grid[0][0] == {"classroomId": 1, "classroomName": "C1", "subject": "Math"}
+    assert grid[1][2] == {"classroomId": 2, "classroomName": "C2", "subject": "Math"}
+    assert sum(cell is not None for row in grid for cell in row) == 2
+
+
+def test_schedule_etag_follows_bookings_and_renames(school, set_slot):
+    response = school.get("/timetable/teachers/1/schedule")
+    etag = response.headers["ETag"]
+    assert school.get("/timetable/teachers/1/schedule", headers={"If-None-Match": etag}).status_code == 304
+
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    response = school.get("/timetable/teachers/1/schedule", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.json["grid"][0][0]["classroomName"] == "C1"
+
+    school.post("/timetable/add_schedule", json={"1": {"classroom_id": 1, "classroom": "Renamed"}})
+    response = school.get("/timetable/teachers/1/schedule", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json["grid"][0][0]["classroomName"] == "Renamed"
+
+
+def test_schedule_cache_is_per_app(school, set_slot, monkeypatch):
+    from app import create_app, db
+
+    # Teacher 1 reaches schedule version 1 in both apps, with different bookings
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    assert school.get("/timetable/teachers/1/schedule").json["grid"][0][0] is not None
+    monkeypatch.setenv("TIMETABLE_CONFIG", "testing")
+    other = create_app()
+    with other.app_context():
+        db.create_all()
+    client = other.test_client()
+    client.post("/timetable/teachers/import", json=[{"teachername": "Ada", "mailid": "ada@example.com",
+                                                     "subjects": ["Math"]}])
+    client.post("/timetable/add_schedule", json={"1": {"classroom_id": 1, "classroom": "Other",
+                                                       "admin_email": "admin@example.com"}})
+    client.patch("/timetable/classrooms/1/slot", json={"dayIndex": 3, "periodIndex": 3,
+                                                        "assignments": [{"subject": "Math", "teacher_id": 1}]})
+    response = client.get("/timetable/teachers/1/schedule")
+    assert response.headers["ETag"] == school.get("/timetable/teachers/1/schedule").headers["ETag"]
+    grid = response.json["grid"]
+    assert grid[0][0] is None
+    assert grid[3][3]["classroomName"] == "Other"
+
+
+def test_schedule_cache_evicts_oldest_entry(app, school, monkeypatch):
+    from app import routes
+
+    monkeypatch.setattr(routes, "TEACHER_SCHEDULE_CACHE_SIZE", 1)
+    for teacher_id in (1, 2, 1):
+        assert school.get(f"/timetable/teachers/{teacher_id}/schedule").status_code == 200
+    assert list(app.extensions["teacher_schedules"]) == [1]
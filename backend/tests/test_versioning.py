@@ -0,0 +1,42 @@
+def test_classroom_etag_revalidation(school, set_slot):
+    response = school.get("/timetable/classrooms/1")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200 and etag == '"classroom-1-v0"'
+    assert school.get("/timetable/classrooms/1", headers={"If-None-Match": etag}).status_code == 304
+
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    response = school.get("/timetable/classrooms/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"classroom-1-v1"'
+    assert response.json["allocation"][0][0] == [{"subject": "Math", "teacher_id": 1}]
+
+
+def test_slot_edit_returns_version_and_cell_delta(school, set_slot):
+    response = set_slot(1, 0, 0, 1, **{"If-Match": '"classroom-1-v0"'})
+    assert response.status_code == 200
+    assert response.json["version"] == 1
+    assert response.json["changes"] == [{"dayIndex": 0, "periodIndex": 0,
+                                         "assignments": [{"subject": "Math", "teacher_id": 1}]}]
+    assert "allocation" not in response.json
+
+
+def test_slot_edit_on_stale_version_is_rejected(school, set_slot):
+    assert set_slot(1, 0, 0, 1).status_code == 200
+    response = set_slot(1, 0, 1, 1, **{"If-Match": '"classroom-1-v0"'})
+    assert response.status_code == 412
+    assert response.json["version"] == 1
+    assert [(c["dayIndex"], c["periodIndex"]) for c in response.json["changes"]] == [(0, 0)]
+    assert school.get("/timetable/classrooms/1").json["allocation"][0][1] is None
+
+
+def test_changes_since_lists_each_cell_once(school, set_slot):
+    set_slot(1, 0, 0, 1)
+    set_slot(1, 0, 1, 1)
+    set_slot(1, 0, 0, 2, "Physics")
+    response = school.get("/timetable/classrooms/1/changes?since=1")
+    assert response.json["version"] == 3
+    assert response.json["changes"] == [
+        {"dayIndex": 0, "periodIndex": 0, "assignments": [{"subject": "Physics", "teacher_id": 2}]},
+        {"dayIndex": 0, "periodIndex": 1, "assignments": [{"subject": "Math", "teacher_id": 1}]},
+    ]
+    assert school.get("/timetable/classrooms/1/changes?since=4").status_code == 400
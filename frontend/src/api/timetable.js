@@ -21,6 +21,16 @@ async function http(method, path, { params, body } = {}) {
   return res.json();
 }
 
+// Polls a background job until it finishes; resolves with the final job status
+async function waitForJob(jobId, intervalMs = 500) {
+  for (;;) {
+    const job = await http('GET', `/timetable/jobs/${jobId}`);
+    if (job.status === 'succeeded') return job;
+    if (job.status === 'failed') throw new Error(job.error || 'Job failed');
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
+
 export const TimetableAPI = {
   getTeachers: () => http('GET', '/timetable/teachers'),
   listClassrooms: () => http('GET', '/timetable/classrooms'),
@@ -55,7 +65,11 @@ export const TimetableAPI = {
       body: { dayIndex, periodIndex, teacher_id: teacherId, subject },
     }),
   getTeacherSchedule: (teacherId) => http('GET', `/timetable/teachers/${teacherId}/schedule`),
-  autoGenerate: (classroomId) => http('POST', `/timetable/classrooms/${classroomId}/auto_generate`),
+  autoGenerate: async (classroomId, options = {}) => {
+    const { job_id: jobId } = await http('POST', `/timetable/classrooms/${classroomId}/auto_generate`, { body: options });
+    return waitForJob(jobId);
+  },
+  getJob: (jobId) => http('GET', `/timetable/jobs/${jobId}`),
   onboardClassroom: ({ classname, admin, subjects }) =>
     http('POST', '/timetable/classrooms/onboard', { body: { classname, admin, subjects } }),
 };